@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from src.schemas.data import AnalysisType
+from src.services.analysis import DataAnalysisService
+
+COLUMNS = ["valor", "prazo", "id_contrato"]
+
+
+@pytest.mark.parametrize("analysis_type", list(AnalysisType), ids=lambda t: t.value)
+def bench_analyze(benchmark, contracts, analysis_type):
+    """Análise completa sobre um serviço novo (sem os caches internos)"""
+    def setup():
+        return (DataAnalysisService(contracts.df),), {}
+
+    def run(service):
+        return service.analyze(analysis_type, COLUMNS)
+
+    result = benchmark.pedantic(run, setup=setup, rounds=5)
+    _check_result(result, contracts.df, analysis_type)
+
+
+@pytest.mark.parametrize("analysis_type", [AnalysisType.CORRELATION, AnalysisType.DISTRIBUTION], ids=lambda t: t.value)
+def bench_analyze_without_render(benchmark, contracts, analysis_type):
+    """Somente os cálculos, sem gerar a imagem"""
+    def setup():
+        return (DataAnalysisService(contracts.df),), {}
+
+    def run(service):
+        return service.analyze(analysis_type, COLUMNS, render=False)
+
+    result = benchmark.pedantic(run, setup=setup, rounds=5)
+    assert "image" not in result
+    _check_result(result, contracts.df, analysis_type)
+
+
+def _check_result(result, df, analysis_type):
+    """Confere os resultados com o pandas sobre o mesmo DataFrame"""
+    if analysis_type == AnalysisType.DESCRIPTIVE:
+        assert list(result["stats"]) == COLUMNS
+        valor = result["stats"]["valor"]
+        assert valor.count == df["valor"].count()
+        assert valor.mean == pytest.approx(df["valor"].mean())
+        assert valor.max == df["valor"].max()
+    elif analysis_type == AnalysisType.CORRELATION:
+        expected = df[COLUMNS].astype(float).corr()
+        matrix = result["correlation_matrix"]
+        assert list(matrix) == COLUMNS
+        assert matrix["valor"]["prazo"] == pytest.approx(expected.loc["valor", "prazo"], abs=1e-5)
+        assert matrix["prazo"]["prazo"] == pytest.approx(1.0)
+    elif analysis_type == AnalysisType.DISTRIBUTION:
+        stats = result["statistics"]["valor"]
+        assert stats["skewness"] == pytest.approx(df["valor"].skew())
+        assert stats["kurtosis"] == pytest.approx(df["valor"].kurt())
+    else:
+        assert sum(point["quantidade"] for point in result["series"]) == df["data_cadastro"].notna().sum()
+
+
+@pytest.fixture(scope="module")
+def wide_frame(rows):
+    """Dataset largo (muitas colunas numéricas correlacionadas) para a correlação"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    size = min(rows, 50000)
+    values = rng.normal(size=(size, 300)) + rng.normal(size=(size, 1))
+    return pd.DataFrame(values, columns=[f"c{i}" for i in range(values.shape[1])])
+
+
+@pytest.mark.parametrize("parameters", [{"layout": "compact"}, {"layout": "none", "top_k": 20, "order": "cluster"}], ids=["compact", "top_k_cluster"])
+def bench_correlation_wide(benchmark, wide_frame, parameters):
+    service = DataAnalysisService(wide_frame)
+    result = benchmark.pedantic(
+        service.analyze, args=(AnalysisType.CORRELATION,), kwargs={"render": False, "parameters": parameters}, rounds=3
+    )
+    size = wide_frame.shape[1]
+    assert sorted(result["columns"]) == sorted(wide_frame.columns)
+    if parameters["layout"] == "compact":
+        values = np.asarray(result["correlation"]["values"], dtype=float)
+        assert result["correlation"]["size"] == size
+        assert len(values) == size * (size - 1) // 2
+        # Fator comum de variância 1: correlação esperada de 0,5 entre quaisquer colunas
+        assert abs(np.nanmean(values) - 0.5) < 0.02
+    else:
+        assert len(result["pairs"]) == parameters["top_k"]
+        r = [abs(pair["r"]) for pair in result["pairs"]]
+        assert r == sorted(r, reverse=True)
+        first = result["pairs"][0]
+        assert first["r"] == pytest.approx(wide_frame[first["a"]].corr(wide_frame[first["b"]]), abs=1e-4)
+
+
+def bench_correlation_wide_render(benchmark, wide_frame):
+    """Heatmap raster (sem anotações) acima de CORRELATION_ANNOTATE_MAX colunas"""
+    service = DataAnalysisService(wide_frame)
+    result = benchmark.pedantic(
+        service.analyze, args=(AnalysisType.CORRELATION,), kwargs={"parameters": {"layout": "none"}}, rounds=3
+    )
+    assert result["image"].startswith(b"\x89PNG")
@@ -0,0 +1,82 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src.services.contract_analysis import ContractAnalysisService
+
+
+def bench_load_data_cold(benchmark, dataset_file, rows):
+    """Leitura e normalização do arquivo, sem o cache colunar"""
+    def load():
+        service = ContractAnalysisService()
+        service.cache = None
+        service.load_data(dataset_file)
+        return service
+
+    service = benchmark.pedantic(load, rounds=3, warmup_rounds=0)
+    assert len(service.df) == rows
+    assert service.df["data_cadastro"].dtype.kind == "M"
+
+
+def bench_load_data_cached(benchmark, csv_file, contracts):
+    """Recarga a partir do cache colunar (Arrow memory-mapped)"""
+    def load():
+        service = ContractAnalysisService()
+        service.load_data(csv_file)
+        return service
+
+    service = benchmark(load)
+    assert "cache_read" in service.load_timings and "read" not in service.load_timings
+    pd.testing.assert_frame_equal(service.df, contracts.df)
+
+
+@pytest.mark.parametrize("analysis", ["status", "modalidade", "temporal", "responsavel"])
+def bench_contract_analysis(benchmark, contracts, analysis):
+    method = getattr(contracts, f"get_{analysis}_analysis")
+    result = benchmark(method)
+    if analysis == "temporal":
+        assert sum(point["quantidade"] for point in result["data"]) == contracts.df["data_cadastro"].notna().sum()
+    elif analysis == "responsavel":
+        expected = contracts.df["responsavel"].value_counts().head(10)
+        assert [point["value"] for point in result["data"]] == expected.tolist()
+    else:
+        expected = contracts.df[analysis].value_counts()
+        assert sorted(point["value"] for point in result["data"]) == sorted(expected[expected > 0].tolist())
+
+
+def bench_snapshot_build(benchmark, contracts):
+    """Recalcula os agregados do snapshot a partir do DataFrame"""
+    version = contracts.snapshot.version
+    benchmark(contracts.set_data, contracts.df, contracts.content_hash)
+    assert contracts.snapshot.version == version
+
+
+@pytest.mark.parametrize("freq", ["day", "week", "month", "quarter"])
+def bench_temporal_series(benchmark, contracts, freq):
+    result = benchmark(contracts.get_temporal_series, freq, window=3)
+    assert result["frequency"] == freq
+    assert sum(point["quantidade"] for point in result["data"]) == contracts.df["data_cadastro"].notna().sum()
+
+
+def bench_rows_page(benchmark, contracts):
+    """Página filtrada de linhas (paginação por chave) serializada em JSON"""
+    body = json.loads(benchmark(contracts.rows_page, status=["A"], limit=500))
+    active = int((contracts.df["status"] == "A").sum())
+    assert body["total"] == active
+    assert body["count"] == min(500, active)
+    assert {row["status"] for row in body["data"]} <= {"A"}
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv", "arrow"])
+def bench_export_rows(benchmark, contracts, fmt):
+    """Exportação completa em blocos, sem montar a resposta inteira"""
+    body = benchmark(lambda: b"".join(contracts.export_rows(fmt)))
+    if fmt == "ndjson":
+        assert body.count(b"\n") == len(contracts.df)
+    elif fmt == "csv":
+        assert body.count(b"\n") == len(contracts.df) + 1
+    else:
+        import pyarrow as pa
+
+        assert pa.ipc.open_stream(body).read_all().num_rows == len(contracts.df)
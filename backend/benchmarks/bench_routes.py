@@ -0,0 +1,83 @@
+"""Latência de ponta a ponta das rotas, via cliente de teste ASGI"""
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="module")
+def client(csv_file):
+    from src.main import app
+    from src.api.dependencies import get_registry
+
+    info = get_registry().register_file(csv_file, filename=os.path.basename(csv_file))
+    with TestClient(app) as client:
+        client.dataset_id = info.dataset_id
+        client.rows = info.rows
+        yield client
+
+
+@pytest.mark.parametrize("section", ["status", "modalidade", "temporal", "responsavel"])
+def bench_contract_route(benchmark, client, section):
+    response = benchmark(client.get, f"/api/contracts/{section}", params={"dataset_id": client.dataset_id})
+    assert response.status_code == 200
+    assert response.json()["data"]
+    if section == "status":
+        assert sum(point["value"] for point in response.json()["data"]) == client.rows
+
+
+def bench_contract_route_not_modified(benchmark, client):
+    """Revalidação com ETag (resposta 304)"""
+    etag = client.get("/api/contracts/status", params={"dataset_id": client.dataset_id}).headers["etag"]
+    response = benchmark(
+        client.get,
+        "/api/contracts/status",
+        params={"dataset_id": client.dataset_id},
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304
+
+
+def bench_timeseries_route(benchmark, client):
+    response = benchmark(
+        client.get,
+        "/api/contracts/timeseries",
+        params={"freq": "week", "window": 4, "dataset_id": client.dataset_id},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["frequency"] == "week"
+    assert body["data"][-1]["ativos"] <= client.rows
+
+
+@pytest.mark.parametrize("analysis_type", ["descriptive", "correlation", "distribution", "timeseries"])
+def bench_analyze_route(benchmark, client, analysis_type):
+    payload = {
+        "file_name": "contratos",
+        "dataset_id": client.dataset_id,
+        "analysis_type": analysis_type,
+        "columns": ["valor", "prazo"],
+    }
+    response = benchmark(client.post, "/api/analyze", json=payload)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["analysis_type"] == analysis_type
+    if analysis_type == "descriptive":
+        assert body["results"]["stats"]["valor"]["count"] == client.rows
+    elif analysis_type == "correlation":
+        assert body["results"]["correlation_matrix"]["valor"]["valor"] == pytest.approx(1.0)
+    if analysis_type in ("correlation", "distribution"):
+        assert client.get(body["visualization_url"]).status_code == 200
+
+
+def bench_upload_route(benchmark, client, csv_file):
+    with open(csv_file, "rb") as f:
+        content = f.read()
+
+    def upload():
+        return client.post("/api/upload", files={"file": (os.path.basename(csv_file), content, "text/csv")})
+
+    response = benchmark.pedantic(upload, rounds=3)
+    assert response.status_code == 200
+    # Mesmo conteúdo do dataset do cliente: mesmo id, sem recarregar
+    assert response.json()["dataset_id"] == client.dataset_id
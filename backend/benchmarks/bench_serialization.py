@@ -0,0 +1,68 @@
+"""Serialização das respostas de análise: tempo e tamanho do payload por formato.
+
+``baseline`` reproduz o caminho anterior (``jsonable_encoder`` seguido do
+``JSONResponse`` do Starlette); os demais usam ``src.core.responses``. Os
+tamanhos (bruto e com gzip) ficam em ``extra_info`` de cada resultado.
+"""
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.core.responses import FastJSONResponse, arrow_body, dumps, to_columnar
+from src.schemas.data import AnalysisType
+from src.services.analysis import DataAnalysisService
+
+ENCODERS = {
+    "baseline": lambda payload: JSONResponse(jsonable_encoder(payload)).body,
+    "orjson": lambda payload: FastJSONResponse(payload).body,
+    "columnar": lambda payload: dumps(to_columnar(payload)),
+    "arrow": arrow_body,
+}
+
+
+@pytest.fixture(scope="module")
+def payloads(contracts):
+    rng = np.random.default_rng(0)
+    wide = pd.DataFrame(rng.normal(size=(2000, 120)), columns=[f"c{i}" for i in range(120)])
+    correlation = DataAnalysisService(wide).analyze(
+        AnalysisType.CORRELATION, render=False, parameters={"layout": "dict", "top_k": 500}
+    )
+    correlation.pop("timings")
+    return {
+        "timeseries_day": contracts.get_temporal_series("day", window=7),
+        "query_responsavel": contracts.query(group_by="responsavel", sum="valor"),
+        "correlation_120": correlation,
+    }
+
+
+@pytest.mark.parametrize("encoder", list(ENCODERS))
+@pytest.mark.parametrize("payload", ["timeseries_day", "query_responsavel", "correlation_120"])
+def bench_serialize(benchmark, payloads, payload, encoder):
+    body = benchmark(ENCODERS[encoder], payloads[payload])
+    _check_body(body, payloads[payload], encoder)
+    benchmark.extra_info["bytes"] = len(body)
+    benchmark.extra_info["gzip_bytes"] = len(gzip.compress(body, compresslevel=5))
+
+
+def _check_body(body, payload, encoder):
+    """O corpo decodificado tem o mesmo conteúdo do caminho anterior"""
+    expected = json.loads(ENCODERS["baseline"](payload))
+    if encoder == "arrow":
+        import pyarrow as pa
+
+        table = pa.ipc.open_stream(body).read_all()
+        path = table.schema.metadata[b"table"].decode().split(".")
+        records = expected
+        for key in path:
+            records = records[key]
+        assert table.num_rows == len(records)
+        assert table.to_pylist()[0] == records[0]
+    elif encoder == "columnar":
+        assert set(json.loads(body)) == set(expected)
+    else:
+        assert json.loads(body) == expected
@@ -0,0 +1,47 @@
+"""Tempo de inicialização a frio, medido em um interpretador novo a cada rodada"""
+import os
+import subprocess
+import sys
+
+# Meta de inicialização (segundos) para os pods com autoscaling
+STARTUP_TARGET = float(os.getenv("BENCH_STARTUP_TARGET", "1.0"))
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_APP = "import src.main"
+
+# Importa a aplicação, executa o lifespan e espera a readiness (dataset padrão carregado)
+UNTIL_READY = """
+import time
+from fastapi.testclient import TestClient
+from src.main import app
+with TestClient(app) as client:
+    while client.get("/health/ready").status_code != 200:
+        time.sleep(0.01)
+"""
+
+
+def _run(code: str, env: dict) -> None:
+    subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, check=True, capture_output=True)
+
+
+def bench_import_app(benchmark):
+    benchmark.pedantic(_run, args=(IMPORT_APP, dict(os.environ)), rounds=5)
+    # Sem estatísticas com --benchmark-disable (a função roda uma única vez)
+    if benchmark.stats is not None:
+        assert benchmark.stats.stats.mean < STARTUP_TARGET
+
+
+def bench_startup_until_ready(benchmark, csv_file):
+    env = dict(os.environ, WARMUP_DATASET=csv_file)
+    benchmark.pedantic(_run, args=(UNTIL_READY, env), rounds=5)
+
+
+def bench_import_without_heavy_modules():
+    """A importação da aplicação não deve carregar bibliotecas de gráficos nem o SDK da OpenAI"""
+    code = (
+        "import sys, src.main; "
+        "heavy = [m for m in ('matplotlib', 'seaborn', 'scipy', 'openai', 'httpx') if m in sys.modules]; "
+        "assert not heavy, heavy"
+    )
+    _run(code, dict(os.environ))
@@ -0,0 +1,54 @@
+"""Fixtures dos benchmarks: datasets sintéticos gerados uma vez por sessão.
+
+Tamanhos e formatos são configuráveis por variáveis de ambiente:
+
+    BENCH_ROWS=10000,1000000 BENCH_FORMATS=csv,json pytest benchmarks
+"""
+import os
+import tempfile
+
+import pytest
+
+# O ambiente precisa estar pronto antes de importar src.core.config
+_WORKDIR = tempfile.mkdtemp(prefix="contract-bench-")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_WORKDIR, "uploads"))
+os.environ.setdefault("CACHE_DIR", os.path.join(_WORKDIR, "cache"))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from src.utils.synthetic import write_contracts, XLSX_MAX_ROWS  # noqa: E402
+
+ROWS = [int(value) for value in os.getenv("BENCH_ROWS", "10000").split(",")]
+FORMATS = os.getenv("BENCH_FORMATS", "csv,json,xlsx").split(",")
+
+
+def _dataset_path(rows: int, fmt: str) -> str:
+    path = os.path.join(_WORKDIR, "data", f"contratos_{rows}.{fmt}")
+    if not os.path.exists(path):
+        write_contracts(path, rows, fmt=fmt)
+    return path
+
+
+@pytest.fixture(scope="session", params=ROWS, ids=lambda rows: f"{rows}rows")
+def rows(request):
+    return request.param
+
+
+@pytest.fixture(scope="session", params=FORMATS)
+def dataset_file(request, rows):
+    if request.param == "xlsx" and rows > XLSX_MAX_ROWS:
+        pytest.skip("XLSX limitado a 1.048.575 linhas")
+    return _dataset_path(rows, request.param)
+
+
+@pytest.fixture(scope="session")
+def csv_file(rows):
+    return _dataset_path(rows, "csv")
+
+
+@pytest.fixture(scope="session")
+def contracts(csv_file):
+    from src.services.contract_analysis import ContractAnalysisService
+
+    service = ContractAnalysisService()
+    service.load_data(csv_file)
+    return service
@@ -0,0 +1,169 @@
+"""Serviços compartilhados pelas rotas, criados sob demanda.
+
+Nada é construído na importação: o registro de datasets, o chat e os uploads
+em lote nascem na primeira requisição que precisar deles, e o dataset padrão
+é carregado em segundo plano durante a inicialização (ver ``warm_up``). A
+fila de jobs é aberta na inicialização, para retomar os jobs pendentes. Com
+``SHARED_DATASETS``, o registro publica e acompanha os datasets dos demais
+workers do uvicorn pelo manifesto do cache colunar.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from src.core.config import CACHE_ENABLED, SHARED_DATASETS, WARMUP_DATASET
+from src.core.executor import executor
+from src.services.batch_upload import BatchUploadService
+from src.services.chat_service import ChatService
+from src.services.dataset_registry import DatasetNotFoundError, DatasetRegistry
+from src.services.jobs import JobQueue
+from src.services.shared_datasets import SharedDatasetStore
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_registry: Optional[DatasetRegistry] = None
+_chat_service: Optional[ChatService] = None
+_batch_service: Optional[BatchUploadService] = None
+_job_queue: Optional[JobQueue] = None
+_shared_store: Optional[SharedDatasetStore] = None
+
+
+def get_registry() -> DatasetRegistry:
+    global _registry
+    if _registry is None:
+        with _lock:
+            if _registry is None:
+                _registry = DatasetRegistry()
+    return _registry
+
+
+def get_chat_service() -> ChatService:
+    global _chat_service
+    if _chat_service is None:
+        # O registro é criado antes: o _lock não é reentrante
+        registry = get_registry()
+        with _lock:
+            if _chat_service is None:
+                _chat_service = ChatService(registry=registry)
+    return _chat_service
+
+
+def get_batch_service() -> BatchUploadService:
+    global _batch_service
+    if _batch_service is None:
+        registry = get_registry()
+        with _lock:
+            if _batch_service is None:
+                _batch_service = BatchUploadService(registry=registry)
+    return _batch_service
+
+
+def get_job_queue() -> JobQueue:
+    global _job_queue
+    if _job_queue is None:
+        with _lock:
+            if _job_queue is None:
+                _job_queue = JobQueue()
+    return _job_queue
+
+
+def get_shared_store() -> Optional[SharedDatasetStore]:
+    """Manifesto compartilhado entre os workers (None com um único processo)"""
+    global _shared_store
+    if not (SHARED_DATASETS and CACHE_ENABLED):
+        return None
+    if _shared_store is None:
+        registry = get_registry()
+        with _lock:
+            if _shared_store is None:
+                _shared_store = SharedDatasetStore(registry)
+                registry.publisher = _shared_store.publish
+                registry.remover = _shared_store.remove
+    return _shared_store
+
+
+async def close_services() -> None:
+    """Encerra as conexões abertas pelos serviços já criados"""
+    if _shared_store is not None:
+        await _shared_store.stop()
+    if _job_queue is not None:
+        await _job_queue.stop()
+    if _chat_service is not None:
+        await _chat_service.aclose()
+
+
+class WarmupState:
+    """Andamento do carregamento inicial, exposto pela rota de readiness"""
+
+    def __init__(self):
+        self.status = "pending"  # pending, running, ready, skipped, failed
+        self.error: Optional[str] = None
+        self.dataset_id: Optional[str] = None
+        self.duration: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        # Falha no carregamento não bloqueia o tráfego: o serviço segue sem dataset padrão
+        return self.status in ("ready", "skipped", "failed")
+
+    @property
+    def degraded(self) -> bool:
+        return self.status == "failed"
+
+    def as_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "dataset_id": self.dataset_id,
+            "duration": self.duration,
+            "error": self.error,
+        }
+
+
+warmup = WarmupState()
+
+
+def _load_default(file_path: Optional[str]) -> str:
+    """Carrega o dataset padrão: o publicado por outro worker ou o arquivo informado (bloqueante)"""
+    registry = get_registry()
+    store = get_shared_store()
+    if store is None:
+        return registry.register_file(file_path, None, os.path.basename(file_path)).dataset_id
+
+    # Um worker por vez: o primeiro lê o arquivo e publica, os demais anexam a cópia mapeada
+    with store.exclusive("warmup"):
+        store.sync()
+        if registry.default_id is not None:
+            try:
+                with registry.acquire() as entry:
+                    return entry.dataset_id
+            except DatasetNotFoundError as e:
+                logger.warning(f"Dataset publicado indisponível, carregando o arquivo padrão: {str(e)}")
+        if not file_path or not os.path.exists(file_path):
+            raise ValueError("Nenhum dataset padrão disponível")
+        return registry.register_file(file_path, None, os.path.basename(file_path)).dataset_id
+
+
+async def warm_up(file_path: Optional[str] = WARMUP_DATASET) -> None:
+    """Registra o dataset padrão fora do event loop, sem bloquear a inicialização"""
+    store = get_shared_store()
+    published = store is not None and os.path.exists(store.manifest_path)
+    if (not file_path or not os.path.exists(file_path)) and not published:
+        warmup.status = "skipped"
+        logger.info("Nenhum dataset padrão para carregar na inicialização")
+        return
+
+    warmup.status = "running"
+    start = time.perf_counter()
+    try:
+        warmup.dataset_id = await executor.run_in_thread(_load_default, file_path)
+        warmup.status = "ready"
+        logger.info("Arquivo carregado automaticamente na inicialização do serviço")
+    except Exception as e:
+        warmup.status = "failed"
+        warmup.error = str(e)
+        logger.error(f"Erro ao carregar arquivo na inicialização: {str(e)}")
+    finally:
+        warmup.duration = time.perf_counter() - start
@@ -1,32 +1,84 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from contextlib import ExitStack
 from typing import List, Optional
 from pydantic import BaseModel
+import asyncio
 import os
-from tempfile import NamedTemporaryFile
+import json
+import shutil
+import time
 import logging
 
+from src.api.dependencies import get_batch_service, get_chat_service, get_job_queue, get_registry
+from src.core.config import (
+    UPLOAD_DIR, CONTRACT_KEY_COLUMN, ROWS_PAGE_SIZE, ROWS_MAX_PAGE_SIZE, MAX_UPLOAD_BYTES, MAX_STORED_UPLOAD_BYTES
+)
+from src.core.executor import executor
+from src.core.metrics import metrics, observe_stages
+from src.core.responses import negotiate, wants_arrow, wants_columnar
+from src.utils.ingestion import spool_upload, supported_extensions, UploadTooLargeError
+from src.utils.row_export import EXPORT_FORMATS
 from src.schemas.data import DataAnalysisRequest, AnalysisResponse, AnalysisType
-from src.services.analysis import DataAnalysisService
-from src.services.contract_analysis import ContractAnalysisService
-from src.services.chat_service import ChatService
+from src.services.analysis import DataAnalysisService, render_plot
+from src.services.batch_upload import BatchJob, BatchUploadService, batch_extensions
+from src.services.dataset_registry import DatasetRegistry, DatasetNotFoundError
+from src.services.chat_service import ChatService, ChatUnavailableError
+from src.services.jobs import JobQueue, JobNotFoundError, FINISHED, WAIT_POLL_INTERVAL, register_handler
+from src.services.rendering import render_cache, render_key, MEDIA_TYPES
+from src.services.streaming_stats import STREAMING_EXTENSIONS, plan_stream, accumulate_part, combine_parts
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-analysis_service = DataAnalysisService()
-contract_service = ContractAnalysisService()
-chat_service = ChatService(contract_service=contract_service)
 
-UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+metrics.gauge("dataset_memory_bytes", "Memória ocupada pelos datasets carregados", function=lambda: get_registry().memory_usage)
+metrics.gauge("datasets_loaded", "Datasets mantidos em memória", function=lambda: get_registry().loaded_count)
+metrics.gauge("datasets_registered", "Datasets registrados (em memória ou não)", function=lambda: get_registry().registered_count)
+metrics.gauge("jobs_pending", "Jobs em segundo plano na fila ou em execução", function=lambda: get_job_queue().pending)
+metrics.gauge(
+    "executor_pending_tasks",
+    "Tarefas pendentes nos pools de execução",
+    ("pool",),
+    function=lambda: {(pool,): executor.pending(pool) for pool in ("thread", "process")},
+)
+
+UPLOAD_MODES = ("replace", "upsert", "store")
+
+RENDERED_ANALYSES = (AnalysisType.CORRELATION, AnalysisType.DISTRIBUTION)
+
+# Intervalo entre comentários de keepalive no stream de eventos de um job
+JOB_EVENTS_KEEPALIVE = 15.0
+
 class ChatMessage(BaseModel):
     message: str
+    dataset_id: Optional[str] = None
 
 @router.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
-    """Upload de arquivo para análise"""
+async def upload_file(
+    file: UploadFile = File(...),
+    mode: str = Query("replace"),
+    dataset_id: Optional[str] = None,
+    key: str = CONTRACT_KEY_COLUMN,
+    background: bool = False,
+    registry: DatasetRegistry = Depends(get_registry),
+    job_queue: JobQueue = Depends(get_job_queue),
+):
+    """Upload de arquivo para análise.
+
+    ``mode=replace`` (padrão) registra o arquivo como um novo dataset;
+    ``mode=upsert`` aplica o arquivo como delta sobre ``dataset_id`` (ou o
+    dataset padrão), atualizando/inserindo contratos pela coluna ``key``;
+    ``mode=store`` só guarda o arquivo (CSV ou JSON-lines, até
+    MAX_STORED_UPLOAD_BYTES) e devolve o ``file_id`` da análise em streaming.
+    Com ``background=true`` o arquivo é recebido e o carregamento vira um job.
+    """
     try:
+        if mode not in UPLOAD_MODES:
+            raise HTTPException(status_code=400, detail=f"Modo de upload inválido: {mode}. Use um de {list(UPLOAD_MODES)}")
+
         if not file.filename:
             logger.error("Arquivo não fornecido")
             raise HTTPException(status_code=400, detail="Arquivo não fornecido")
@@ -34,114 +86,594 @@ async def upload_file(file: UploadFile = File(...)):
         logger.info(f"Recebendo arquivo: {file.filename}")
         logger.info(f"Tipo do arquivo: {file.content_type}")
         
-        # Lê o conteúdo do arquivo
-        content = await file.read()
-        file_size = len(content)
-        logger.info(f"Tamanho do arquivo: {file_size} bytes")
-        
-        # Verifica se o arquivo está vazio
-        if file_size == 0:
-            logger.error("Arquivo vazio recebido")
-            raise HTTPException(status_code=400, detail="Arquivo vazio")
-        
-        # Reseta o cursor do arquivo para o início
-        await file.seek(0)
-        
         # Verifica extensão
         ext = file.filename.split('.')[-1].lower()
         logger.info(f"Extensão do arquivo: {ext}")
         
-        if ext not in ['csv', 'xlsx', 'xls', 'json']:
+        if mode == "store" and ext not in STREAMING_EXTENSIONS:
+            raise HTTPException(status_code=400, detail=f"mode=store aceita apenas {list(STREAMING_EXTENSIONS)}")
+        if mode != "store" and ext not in supported_extensions():
             logger.error(f"Formato não suportado: {ext}")
+            if ext == "xls":
+                raise HTTPException(status_code=400, detail="Arquivos .xls exigem o python-calamine ou o xlrd instalados")
             raise HTTPException(status_code=400, detail="Formato de arquivo não suportado")
         
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
+        # Copia o conteúdo em blocos para disco, calculando o hash durante a cópia
+        try:
+            max_bytes = MAX_STORED_UPLOAD_BYTES if mode == "store" else MAX_UPLOAD_BYTES
+            spooled = await spool_upload(file, UPLOAD_DIR, max_bytes=max_bytes)
+        except UploadTooLargeError as e:
+            logger.error(f"Arquivo muito grande: {str(e)}")
+            raise HTTPException(status_code=413, detail=str(e))
+        file_size = spooled.size
+        logger.info(f"Tamanho do arquivo: {file_size} bytes")
+        
+        # Verifica se o arquivo está vazio
+        if file_size == 0:
+            os.unlink(spooled.path)
+            logger.error("Arquivo vazio recebido")
+            raise HTTPException(status_code=400, detail="Arquivo vazio")
+        
+        # Nome endereçado pelo conteúdo: uploads distintos nunca se sobrescrevem
+        file_id = f"{spooled.sha256[:16]}_{os.path.basename(file.filename)}"
+        file_path = os.path.join(UPLOAD_DIR, file_id)
         logger.info(f"Salvando arquivo em: {file_path}")
         
         try:
-            # Salva o arquivo
-            with open(file_path, "wb") as buffer:
-                buffer.write(content)
+            # Move o arquivo temporário para o destino final
+            os.replace(spooled.path, file_path)
             logger.info("Arquivo salvo com sucesso")
             
-            # Carrega dados no serviço
-            logger.info("Iniciando carregamento dos dados no serviço")
-            contract_service.load_data(file_path)
-            logger.info("Dados carregados com sucesso")
-            
-            return {
-                "message": "Arquivo carregado com sucesso",
+            if mode == "store":
+                return {
+                    "message": "Arquivo guardado com sucesso",
+                    "file_id": file_id,
+                    "filename": file.filename,
+                    "size": file_size,
+                    "type": file.content_type
+                }
+
+            upload = {
+                "file_path": file_path,
+                "sha256": spooled.sha256,
                 "filename": file.filename,
                 "size": file_size,
-                "type": file.content_type
+                "type": file.content_type,
+                "mode": mode,
+                "dataset_id": dataset_id,
+                "key": key,
             }
+            if background:
+                # Uploads iguais em andamento viram um só job; o resultado não é reaproveitado
+                job = await job_queue.submit(
+                    "upload", upload, f"upload:{mode}:{dataset_id}:{key}:{spooled.sha256}", memoize=False
+                )
+                return _job_response(job)
+            return await _register_upload(registry, **upload)
         except Exception as e:
             logger.error(f"Erro ao processar arquivo: {str(e)}")
             if os.path.exists(file_path):
                 os.unlink(file_path)
+            if isinstance(e, HTTPException):
+                raise
+            if isinstance(e, DatasetNotFoundError):
+                raise HTTPException(status_code=404, detail=str(e))
             raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro no upload: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/analyze", response_model=AnalysisResponse)
-async def analyze_data(request: DataAnalysisRequest):
-    """Realiza análise nos dados carregados"""
+async def _register_upload(
+    registry: DatasetRegistry,
+    file_path: str,
+    sha256: str,
+    filename: str,
+    size: int,
+    type: Optional[str],
+    mode: str,
+    dataset_id: Optional[str],
+    key: str,
+) -> dict:
+    """Registra o arquivo salvo como dataset (ou aplica o delta), fora do event loop"""
+    if mode == "upsert":
+        logger.info(f"Aplicando delta sobre o dataset {dataset_id or registry.default_id}")
+        info = await executor.run_in_thread(
+            registry.upsert_file, dataset_id, file_path, sha256, None, key
+        )
+        # O delta já foi incorporado à nova versão do dataset
+        os.unlink(file_path)
+        with registry.acquire(info.dataset_id) as dataset:
+            changes = dataset.contracts.last_upsert
+        return {
+            "message": "Delta aplicado com sucesso",
+            "dataset_id": info.dataset_id,
+            "base_id": info.base_id,
+            "rows": info.rows,
+            **(changes or {}),
+            "filename": filename,
+            "size": size,
+            "type": type
+        }
+
+    # Registra o dataset
+    logger.info("Iniciando carregamento dos dados no serviço")
+    info = await executor.run_in_thread(
+        registry.register_file, file_path, sha256, filename
+    )
+    logger.info("Dados carregados com sucesso")
+    if info.source_path != file_path and os.path.exists(file_path):
+        # O dataset é recarregado do cache colunar; o upload não é mais usado
+        os.unlink(file_path)
+    
+    return {
+        "message": "Arquivo carregado com sucesso",
+        "dataset_id": info.dataset_id,
+        "filename": filename,
+        "size": size,
+        "type": type
+    }
+
+async def _upload_job(payload: dict) -> dict:
     try:
-        results = analysis_service.analyze(
-            analysis_type=request.analysis_type,
-            columns=request.columns
+        return await _register_upload(get_registry(), **payload)
+    except Exception:
+        if os.path.exists(payload["file_path"]):
+            os.unlink(payload["file_path"])
+        raise
+
+register_handler("upload", _upload_job)
+
+def _job_response(job: dict) -> JSONResponse:
+    """Resposta 202 de um job enfileirado, com o endereço para acompanhá-lo"""
+    return JSONResponse(status_code=202, content={**job, "status_url": f"/api/jobs/{job['job_id']}"})
+
+@router.post("/upload/batch", status_code=202)
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    job_queue: JobQueue = Depends(get_job_queue),
+):
+    """Upload em lote: vários arquivos combinados em um único dataset.
+
+    Aceita csv, json, planilhas (cada aba é uma parte) e zips com esses
+    arquivos. Responde imediatamente com o id do job; o andamento é consultado
+    em ``/jobs/{job_id}`` (campo ``progress``).
+    """
+    work_dir = BatchUploadService.work_dir()
+    try:
+        extensions = batch_extensions()
+        uploads = []
+        for i, file in enumerate(files):
+            if not file.filename:
+                raise HTTPException(status_code=400, detail="Arquivo não fornecido")
+            ext = file.filename.split('.')[-1].lower()
+            if ext not in extensions:
+                raise HTTPException(status_code=400, detail=f"Formato de arquivo não suportado: {file.filename}")
+            try:
+                spooled = await spool_upload(file, work_dir)
+            except UploadTooLargeError as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            if spooled.size == 0:
+                raise HTTPException(status_code=400, detail=f"Arquivo vazio: {file.filename}")
+            file_path = os.path.join(work_dir, f"{i}_{os.path.basename(file.filename)}")
+            os.replace(spooled.path, file_path)
+            uploads.append((file.filename, file_path, spooled.sha256))
+        logger.info(f"Upload em lote recebido: {[name for name, _, _ in uploads]}")
+
+        # Cada lote tem o próprio diretório de trabalho: sem deduplicação
+        return _job_response(await job_queue.submit("batch", BatchJob(work_dir, uploads).payload()))
+    except Exception as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if isinstance(e, HTTPException):
+            raise
+        logger.error(f"Erro no upload em lote: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _batch_job(payload: dict) -> dict:
+    return await get_batch_service().run(BatchJob.from_payload(payload))
+
+register_handler("batch", _batch_job)
+
+async def _run_analysis(request: DataAnalysisRequest, registry: DatasetRegistry) -> AnalysisResponse:
+    """Executa a análise nos pools do executor e guarda a imagem renderizada no cache"""
+    parameters = request.parameters or {}
+    image_format = parameters.get("format", "png")
+    
+    if parameters.get("streaming"):
+        # Modo streaming: arquivo guardado em UPLOAD_DIR lido em blocos, sem carregar em memória
+        file_path = _stored_file(request)
+        DataAnalysisService.check_streaming(request.analysis_type)
+        plan = await executor.run_in_thread(
+            plan_stream, file_path, request.columns, parts=parameters.get("parts", executor.max_processes)
         )
-        
+        # Cada parte é uma tarefa do pool de processos, sujeita ao limite de pendências
+        states = await asyncio.gather(
+            *(executor.run_in_process(accumulate_part, plan, i) for i in range(len(plan.ranges)))
+        )
+        results = DataAnalysisService.streaming_results(combine_parts(plan, states), request.analysis_type)
         return AnalysisResponse(
             file_name=request.file_name,
             analysis_type=request.analysis_type,
-            results=results,
-            visualization_url=results.get("visualization")
+            results=results
+        )
+    
+    if image_format not in MEDIA_TYPES:
+        raise ValueError(f"Formato de imagem não suportado: {image_format}")
+    with registry.acquire(request.dataset_id) as dataset:
+        key = render_key(dataset.dataset_id, request.analysis_type.value, request.columns, parameters)
+        # Estatísticas em thread, sobre o serviço (e os caches) do próprio dataset;
+        # só a renderização vai para o pool de processos, e só se ainda não estiver no cache
+        plot = request.analysis_type in RENDERED_ANALYSES and key not in render_cache
+        results = await executor.run_in_thread(
+            dataset.analysis.analyze,
+            analysis_type=request.analysis_type,
+            columns=request.columns,
+            render=False,
+            image_format=image_format,
+            parameters=parameters,
+            plot=plot,
         )
+
+    timings = results.pop("timings", {})
+    spec = results.pop("plot", None)
+    if spec is not None:
+        # O processo recebe só a matriz ou os histogramas, não o DataFrame
+        start = time.perf_counter()
+        image = await executor.run_in_process(render_plot, spec, image_format)
+        timings["render"] = time.perf_counter() - start
+        render_cache.put(key, image, MEDIA_TYPES[image_format])
+    observe_stages(timings, f"analysis.{request.analysis_type.value}.")
+    visualization_url = f"/api/visualizations/{key}" if key in render_cache else None
+    
+    return AnalysisResponse(
+        file_name=request.file_name,
+        analysis_type=request.analysis_type,
+        results=results,
+        visualization_url=visualization_url
+    )
+
+def _stored_file(request: DataAnalysisRequest) -> str:
+    """Caminho do arquivo do modo streaming: ``file_id`` devolvido por ``mode=store`` (ou ``file_name``)"""
+    file_path = os.path.join(UPLOAD_DIR, os.path.basename(request.file_id or request.file_name))
+    if not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail=f"Arquivo não encontrado: {request.file_id or request.file_name}")
+    return file_path
+
+def _analysis_key(request: DataAnalysisRequest, registry: DatasetRegistry) -> str:
+    """Chave de deduplicação: dataset (ou arquivo), tipo, colunas e parâmetros"""
+    parameters = request.parameters or {}
+    if parameters.get("streaming"):
+        source = f"file:{os.path.basename(request.file_id or request.file_name)}"
+    else:
+        source = request.dataset_id or registry.default_id
+        if source is None:
+            raise ValueError("Dados não carregados")
+    return f"analyze:{render_key(source, request.analysis_type.value, request.columns, parameters)}"
+
+async def _analysis_job(payload: dict) -> dict:
+    response = await _run_analysis(DataAnalysisRequest(**payload), get_registry())
+    return response.model_dump(mode="json")
+
+register_handler("analyze", _analysis_job)
+
+def _analysis_body(response: AnalysisResponse) -> dict:
+    """Campos da resposta sem a cópia recursiva do ``model_dump`` (serializados direto por ``negotiate``)"""
+    return {
+        "file_name": response.file_name,
+        "analysis_type": response.analysis_type.value,
+        "results": response.results,
+        "visualization_url": response.visualization_url,
+    }
+
+@router.post("/analyze", response_model=AnalysisResponse)
+async def analyze_data(
+    request: DataAnalysisRequest,
+    http_request: Request,
+    background: bool = False,
+    registry: DatasetRegistry = Depends(get_registry),
+    job_queue: JobQueue = Depends(get_job_queue),
+):
+    """Realiza análise nos dados carregados.
+
+    Com ``background=true`` a análise vira um job (202 com o ``job_id``);
+    pedidos idênticos compartilham o mesmo job e o resultado fica memorizado.
+    A resposta aceita ``?columnar=true`` e ``Accept: application/vnd.apache.arrow.stream``.
+    """
+    try:
+        if background:
+            key = _analysis_key(request, registry)
+            # Fixa o dataset: o job não muda de dados se o dataset padrão mudar
+            payload = request.model_dump(mode="json")
+            if not (request.parameters or {}).get("streaming"):
+                payload["dataset_id"] = request.dataset_id or registry.default_id
+            return _job_response(await job_queue.submit("analyze", payload, key))
+        return negotiate(http_request, _analysis_body(await _run_analysis(request, registry)))
+    except HTTPException:
+        raise
+    except DatasetNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/visualizations/{key}")
+async def get_visualization(
+    key: str,
+    request: Request,
+    registry: DatasetRegistry = Depends(get_registry),
+    job_queue: JobQueue = Depends(get_job_queue),
+):
+    """Imagem renderizada de uma análise, endereçada pela chave da renderização.
+
+    Resultados memorizados de jobs apontam para cá por até ``JOB_RESULT_TTL``;
+    se a imagem já saiu do cache, a análise do job é refeita para renderizá-la.
+    """
+    item = render_cache.get(key)
+    if item is None:
+        payload = await job_queue.latest_payload(f"analyze:{key}")
+        if payload is not None:
+            try:
+                await _run_analysis(DataAnalysisRequest(**payload), registry)
+            except HTTPException:
+                raise
+            except Exception as e:
+                logger.warning(f"Não foi possível renderizar de novo a visualização {key}: {str(e)}")
+            item = render_cache.get(key)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Visualização não encontrada")
+    data, media_type = item
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=media_type, headers=headers)
+
+@router.get("/datasets")
+async def list_datasets(registry: DatasetRegistry = Depends(get_registry)):
+    """Lista os datasets registrados"""
+    return {"data": registry.list_datasets(), "default": registry.default_id}
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match com comparação fraca (a compressão torna a ETag fraca)"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+def _snapshot_response(request: Request, section: str, dataset_id: Optional[str], registry: DatasetRegistry) -> Response:
+    """Responde a partir do snapshot de agregados, com suporte a ETag/304"""
+    try:
+        with registry.acquire(dataset_id) as dataset:
+            snapshot = dataset.contracts.get_snapshot()
+    except DatasetNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    # Cada representação (JSON, colunar, Arrow) tem a sua ETag
+    layout = "arrow" if wants_arrow(request) else "columnar" if wants_columnar(request) else None
+    etag = f'"{snapshot.version}-{layout}"' if layout else snapshot.etag
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    if layout:
+        return negotiate(request, snapshot.section(section), headers)
+    return Response(content=snapshot.body(section), media_type="application/json", headers=headers)
+
 @router.get("/contracts/status")
-async def get_contract_status():
+async def get_contract_status(request: Request, dataset_id: Optional[str] = None, registry: DatasetRegistry = Depends(get_registry)):
     """Análise de status dos contratos"""
     try:
         logger.info("Iniciando análise de status dos contratos")
-        return contract_service.get_status_analysis()
+        return _snapshot_response(request, "status", dataset_id, registry)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro na análise de status: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/contracts/modalidade")
-async def get_contract_modalidade():
+async def get_contract_modalidade(request: Request, dataset_id: Optional[str] = None, registry: DatasetRegistry = Depends(get_registry)):
     """Análise de modalidades dos contratos"""
     try:
         logger.info("Iniciando análise de modalidades")
-        return contract_service.get_modalidade_analysis()
+        return _snapshot_response(request, "modalidade", dataset_id, registry)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro na análise de modalidades: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/contracts/temporal")
-async def get_contract_temporal():
+async def get_contract_temporal(request: Request, dataset_id: Optional[str] = None, registry: DatasetRegistry = Depends(get_registry)):
     """Análise temporal dos contratos"""
     try:
         logger.info("Iniciando análise temporal")
-        return contract_service.get_temporal_analysis()
+        return _snapshot_response(request, "temporal", dataset_id, registry)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro na análise temporal: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/contracts/responsavel")
-async def get_contract_responsavel():
+async def get_contract_responsavel(request: Request, dataset_id: Optional[str] = None, registry: DatasetRegistry = Depends(get_registry)):
     """Análise por responsável"""
     try:
         logger.info("Iniciando análise por responsável")
-        return contract_service.get_responsavel_analysis()
+        return _snapshot_response(request, "responsavel", dataset_id, registry)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro na análise por responsável: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/contracts/timeseries")
+async def get_contract_timeseries(
+    request: Request,
+    freq: str = "month",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    window: Optional[int] = None,
+    dataset_id: Optional[str] = None,
+    registry: DatasetRegistry = Depends(get_registry),
+):
+    """Série temporal dos contratos com frequência, intervalo e média móvel configuráveis"""
+    try:
+        logger.info(f"Iniciando série temporal ({freq})")
+        with registry.acquire(dataset_id) as dataset:
+            series = await executor.run_in_thread(dataset.contracts.get_temporal_series, freq, start, end, window)
+        return negotiate(request, series)
+    except HTTPException:
+        raise
+    except DatasetNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro na série temporal: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/contracts/query")
+async def query_contracts(
+    request: Request,
+    status: Optional[List[str]] = Query(None),
+    modalidade: Optional[List[str]] = Query(None),
+    responsavel: Optional[List[str]] = Query(None),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    date_field: str = "cadastro",
+    group_by: Optional[str] = None,
+    sum: Optional[str] = None,
+    dataset_id: Optional[str] = None,
+    registry: DatasetRegistry = Depends(get_registry),
+):
+    """Contratos filtrados por status, modalidade, responsável e período, agrupados por uma dimensão"""
+    try:
+        with registry.acquire(dataset_id) as dataset:
+            result = await executor.run_in_thread(
+                dataset.contracts.query,
+                status=status,
+                modalidade=modalidade,
+                responsavel=responsavel,
+                start=start,
+                end=end,
+                date_field=date_field,
+                group_by=group_by,
+                sum=sum,
+            )
+        return negotiate(request, result)
+    except HTTPException:
+        raise
+    except DatasetNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro na consulta de contratos: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/contracts/rows")
+async def get_contract_rows(
+    status: Optional[List[str]] = Query(None),
+    modalidade: Optional[List[str]] = Query(None),
+    responsavel: Optional[List[str]] = Query(None),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    date_field: str = "cadastro",
+    columns: Optional[List[str]] = Query(None),
+    after: Optional[str] = None,
+    limit: int = Query(ROWS_PAGE_SIZE, ge=1, le=ROWS_MAX_PAGE_SIZE),
+    format: str = "json",
+    dataset_id: Optional[str] = None,
+    registry: DatasetRegistry = Depends(get_registry),
+):
+    """Linhas dos contratos, filtradas e projetadas.
+
+    ``format=json`` (padrão) devolve uma página de até ``limit`` linhas na
+    ordem da chave, com o cursor ``next_after`` para a próxima; ``ndjson``,
+    ``csv`` e ``arrow`` exportam todas as linhas em streaming, em blocos.
+    """
+    filters = dict(
+        status=status, modalidade=modalidade, responsavel=responsavel,
+        start=start, end=end, date_field=date_field, columns=columns, after=after,
+    )
+    # O dataset fica reservado até o fim da resposta, inclusive durante o streaming
+    stack = ExitStack()
+    try:
+        if format != "json" and format not in EXPORT_FORMATS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Formato inválido: {format}. Use um de {['json'] + list(EXPORT_FORMATS)}"
+            )
+        dataset = stack.enter_context(registry.acquire(dataset_id))
+        if format == "json":
+            body = await executor.run_in_thread(dataset.contracts.rows_page, limit=limit, **filters)
+            stack.close()
+            return Response(content=body, media_type="application/json")
+
+        chunks = await executor.run_in_thread(dataset.contracts.export_rows, format, **filters)
+    except HTTPException:
+        stack.close()
+        raise
+    except DatasetNotFoundError as e:
+        stack.close()
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        stack.close()
+        logger.error(f"Erro na listagem de contratos: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def stream():
+        try:
+            yield from chunks
+        finally:
+            stack.close()
+
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        stream(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="contratos.{extension}"'}
+    )
+
+@router.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60),
+    job_queue: JobQueue = Depends(get_job_queue),
+):
+    """Estado e resultado de um job; ``wait`` segura a resposta até o job terminar (long polling)"""
+    try:
+        return await job_queue.wait_finished(job_id, wait)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, job_queue: JobQueue = Depends(get_job_queue)):
+    """Mudanças de estado e de andamento de um job por Server-Sent Events, até sua conclusão"""
+    try:
+        job = await job_queue.get(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    async def events():
+        current = job
+        while True:
+            yield f"event: status\ndata: {json.dumps(current, ensure_ascii=False)}\n\n"
+            if current["status"] in FINISHED:
+                yield "event: done\ndata: {}\n\n"
+                return
+            state = (current["status"], current["progress"])
+            idle = 0.0
+            while (current["status"], current["progress"]) == state:
+                # Espera curta: o job pode estar em outro worker, sem aviso neste processo
+                current = await job_queue.wait(job_id, WAIT_POLL_INTERVAL)
+                idle += WAIT_POLL_INTERVAL
+                if idle >= JOB_EVENTS_KEEPALIVE:
+                    idle = 0.0
+                    yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/test")
 async def test_connection():
     """Rota de teste para verificar se o backend está funcionando"""
@@ -149,16 +681,42 @@ async def test_connection():
     return {"status": "ok", "message": "Backend está funcionando"}
 
 @router.post("/chat")
-async def chat(message: ChatMessage):
+async def chat(message: ChatMessage, chat_service: ChatService = Depends(get_chat_service)):
     """Processa uma mensagem do chat usando IA"""
     try:
         logger.info(f"Processando mensagem do chat: {message.message}")
-        response = chat_service.process_message(message.message)
+        response = await chat_service.process_message(message.message, message.dataset_id)
         
         if response is None:
             raise HTTPException(status_code=500, detail="Erro ao processar mensagem")
         
         return {"response": response}
+    except HTTPException:
+        raise
+    except ChatUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Erro no chat: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/chat/stream")
+async def chat_stream(message: ChatMessage, chat_service: ChatService = Depends(get_chat_service)):
+    """Processa uma mensagem do chat, enviando a resposta por Server-Sent Events"""
+    if not chat_service.available:
+        raise HTTPException(status_code=503, detail="Chat indisponível: OPENAI_API_KEY não configurada")
+    logger.info(f"Processando mensagem do chat (streaming): {message.message}")
+
+    async def events():
+        try:
+            async for token in chat_service.stream_message(message.message, message.dataset_id):
+                yield f"data: {json.dumps({'token': token}, ensure_ascii=False)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            logger.error(f"Erro no chat (streaming): {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)}, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
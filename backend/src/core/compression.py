@@ -0,0 +1,141 @@
+import gzip
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from src.core.config import COMPRESSION_ENABLED, COMPRESSION_MIN_BYTES, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele só o gzip é oferecido
+    brotli = None
+
+# Tipos de conteúdo que valem a compressão (imagens PNG já são comprimidas)
+COMPRESSIBLE_TYPES = (
+    b"application/json",
+    b"application/x-ndjson",
+    b"application/vnd.apache.arrow",
+    b"text/",
+    b"image/svg+xml",
+)
+
+# Acima deste tamanho a compressão sai do event loop
+THREAD_THRESHOLD = 256 * 1024
+
+
+def _accepted(scope) -> Optional[str]:
+    """Codificação escolhida pelo Accept-Encoding: brotli, se instalado, ou gzip"""
+    for name, value in scope.get("headers", ()):
+        if name == b"accept-encoding":
+            tokens = {}
+            for item in value.decode("latin-1").lower().split(","):
+                coding, _, params = item.strip().partition(";")
+                quality = params.strip().removeprefix("q=")
+                try:
+                    tokens[coding.strip()] = float(quality) if quality else 1.0
+                except ValueError:
+                    tokens[coding.strip()] = 0.0
+            if brotli is not None and tokens.get("br", 0) > 0:
+                return "br"
+            if tokens.get("gzip", 0) > 0:
+                return "gzip"
+            return None
+    return None
+
+
+def _weak(etag: bytes) -> bytes:
+    """ETag fraca: a representação comprimida não é idêntica byte a byte à original"""
+    return etag if etag.startswith(b"W/") else b"W/" + etag
+
+
+def _compress(body: bytes, encoding: str, gzip_level: int, brotli_quality: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """Middleware ASGI: comprime com gzip ou brotli as respostas a partir de ``minimum_size`` bytes.
+
+    Só respostas de corpo único são comprimidas; respostas em streaming
+    (exportações, Server-Sent Events) passam intactas para não perderem a
+    entrega incremental. A ETag das respostas comprimidas (e dos 304 para
+    quem aceita compressão) vira fraca, para que gzip, brotli e a versão
+    sem compressão não compartilhem uma ETag forte.
+    """
+
+    def __init__(
+        self,
+        app,
+        enabled: bool = COMPRESSION_ENABLED,
+        minimum_size: int = COMPRESSION_MIN_BYTES,
+        gzip_level: int = COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = COMPRESSION_BROTLI_QUALITY,
+    ):
+        self.app = app
+        self.enabled = enabled
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        encoding = _accepted(scope) if scope["type"] == "http" and self.enabled else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"start": None, "passthrough": False}
+
+        async def send_wrapper(message):
+            if state["passthrough"]:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                state["start"] = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            start = state["start"]
+            body = message.get("body", b"")
+            state["passthrough"] = True
+            if message.get("more_body", False) or not self._compressible(start, body):
+                if start["status"] == 304:
+                    start = {**start, "headers": [
+                        (name, _weak(value) if name == b"etag" else value) for name, value in start["headers"]
+                    ]}
+                await send(start)
+                await send(message)
+                return
+
+            if len(body) > THREAD_THRESHOLD:
+                compressed = await run_in_threadpool(_compress, body, encoding, self.gzip_level, self.brotli_quality)
+            else:
+                compressed = _compress(body, encoding, self.gzip_level, self.brotli_quality)
+            headers = [
+                (name, _weak(value) if name == b"etag" else value)
+                for name, value in start["headers"]
+                if name not in (b"content-length", b"vary")
+            ]
+            vary = [value for name, value in start["headers"] if name == b"vary"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+                (b"vary", b", ".join(vary + [b"Accept-Encoding"])),
+            ]
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compressible(self, start: dict, body: bytes) -> bool:
+        if len(body) < self.minimum_size:
+            return False
+        content_type = b""
+        for name, value in start["headers"]:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value.lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES)
@@ -0,0 +1,99 @@
+import os
+from dotenv import load_dotenv
+
+# Carrega as variáveis de ambiente do arquivo .env
+load_dotenv()
+
+# Diretório onde os arquivos enviados são armazenados
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+
+# Dataset carregado em segundo plano na inicialização (vazio para desativar)
+WARMUP_DATASET = os.getenv("WARMUP_DATASET", os.path.join(UPLOAD_DIR, "Contratos.xlsx"))
+
+# Cache colunar (Arrow/Feather) dos arquivos já normalizados
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(UPLOAD_DIR, ".cache"))
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Camada de execução: limites de concorrência e profundidade de fila
+MAX_THREAD_WORKERS = int(os.getenv("MAX_THREAD_WORKERS", "8"))
+MAX_PROCESS_WORKERS = int(os.getenv("MAX_PROCESS_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXECUTOR_QUEUE_DEPTH = int(os.getenv("EXECUTOR_QUEUE_DEPTH", "32"))
+
+# Ingestão de uploads em streaming
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "100000"))
+
+# Arquivos guardados para a análise em streaming (upload com mode=store), sem
+# carregar em memória: limite próprio e máximo de partes paralelas por análise
+MAX_STORED_UPLOAD_BYTES = int(os.getenv("MAX_STORED_UPLOAD_BYTES", str(20 * 1024 * 1024 * 1024)))
+MAX_STREAM_PARTS = int(os.getenv("MAX_STREAM_PARTS", "16"))
+
+# Leitura de planilhas: "auto" usa o calamine quando instalado, senão o openpyxl
+EXCEL_ENGINE = os.getenv("EXCEL_ENGINE", "auto")
+
+# Upload em lote (vários arquivos ou zip): limites
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "200"))
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", str(1024 * 1024 * 1024)))
+
+# Registro de datasets: orçamento de memória para os DataFrames mantidos em RAM
+DATASET_MEMORY_BUDGET = int(os.getenv("DATASET_MEMORY_BUDGET", str(1024 * 1024 * 1024)))
+
+# Vários workers do uvicorn: datasets publicados num manifesto do cache colunar
+# e lidos por memory-map em todos os processos, que verificam o manifesto a cada
+# SHARED_POLL_INTERVAL segundos
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+SHARED_DATASETS = os.getenv("SHARED_DATASETS", "true" if WEB_WORKERS > 1 else "false").lower() in ("1", "true", "yes")
+SHARED_POLL_INTERVAL = float(os.getenv("SHARED_POLL_INTERVAL", "1.0"))
+
+# Coluna que identifica cada contrato nas cargas incrementais (append/upsert)
+CONTRACT_KEY_COLUMN = os.getenv("CONTRACT_KEY_COLUMN", "id_contrato")
+
+# Consultas filtradas sobre os contratos: resultados em cache por dataset
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "512"))
+
+# Listagem de linhas: tamanho de página (paginação por chave) e blocos da exportação
+ROWS_PAGE_SIZE = int(os.getenv("ROWS_PAGE_SIZE", "100"))
+ROWS_MAX_PAGE_SIZE = int(os.getenv("ROWS_MAX_PAGE_SIZE", "1000"))
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "10000"))
+
+# Correlação: blocos de linhas do cálculo, limites de formato da resposta e do heatmap
+CORRELATION_CHUNK_ROWS = int(os.getenv("CORRELATION_CHUNK_ROWS", "65536"))
+CORRELATION_DICT_MAX = int(os.getenv("CORRELATION_DICT_MAX", "50"))
+CORRELATION_MAX_PAIRS = int(os.getenv("CORRELATION_MAX_PAIRS", "1000"))
+CORRELATION_ANNOTATE_MAX = int(os.getenv("CORRELATION_ANNOTATE_MAX", "20"))
+
+# Fila de jobs em segundo plano (SQLite): workers e validade dos resultados memorizados
+JOBS_DB = os.getenv("JOBS_DB", os.path.join(UPLOAD_DIR, ".jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+# Releitura periódica da fila, para os jobs enviados por outros processos
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+# Reserva de um job em execução, renovada pelo processo dono; vencida, o job volta para a fila
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "30"))
+
+# Compressão das respostas (gzip, ou brotli se instalado) a partir de COMPRESSION_MIN_BYTES
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Cache de visualizações renderizadas (PNG/SVG em CACHE_DIR/renders, compartilhado pelos workers)
+RENDER_CACHE_BYTES = int(os.getenv("RENDER_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+# Chat: orçamento de tokens do contexto e cache de respostas
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "1500"))
+CHAT_CONTEXT_TOP_N = int(os.getenv("CHAT_CONTEXT_TOP_N", "8"))
+CHAT_ANSWER_CACHE_SIZE = int(os.getenv("CHAT_ANSWER_CACHE_SIZE", "256"))
+
+# Cliente OpenAI (OPENAI_BASE_URL permite apontar para um servidor compatível local)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+
+# Profiling sob demanda (cabeçalho X-Profile ou ?profile=); desligado por padrão
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN") or None
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(UPLOAD_DIR, ".profiles"))
@@ -0,0 +1,97 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from src.core.config import MAX_THREAD_WORKERS, MAX_PROCESS_WORKERS, EXECUTOR_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+
+class ServerBusyError(HTTPException):
+    """Fila de execução saturada; o cliente deve tentar novamente depois"""
+
+    def __init__(self, pool: str):
+        super().__init__(
+            status_code=429,
+            detail=f"Servidor ocupado ({pool}), tente novamente em instantes",
+            headers={"Retry-After": "1"},
+        )
+
+
+class ExecutionLayer:
+    """Executa trabalho bloqueante fora do event loop.
+
+    Operações de I/O e chamadas bloqueantes (leitura de arquivos, cliente da
+    OpenAI) vão para um pool de threads; análises e renderização, que são
+    CPU-bound, vão para um pool de processos. Cada pool aceita no máximo
+    ``max_workers + queue_depth`` tarefas pendentes; acima disso a requisição é
+    recusada com 429 em vez de enfileirar indefinidamente.
+    """
+
+    def __init__(
+        self,
+        max_threads: int = MAX_THREAD_WORKERS,
+        max_processes: int = MAX_PROCESS_WORKERS,
+        queue_depth: int = EXECUTOR_QUEUE_DEPTH,
+    ):
+        self.max_threads = max_threads
+        self.max_processes = max_processes
+        self.queue_depth = queue_depth
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[str, int] = {"thread": 0, "process": 0}
+
+    @property
+    def threads(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="analisai")
+        return self._threads
+
+    @property
+    def processes(self) -> ProcessPoolExecutor:
+        if self._processes is None:
+            # spawn evita herdar locks de threads e o estado global do matplotlib
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.max_processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._processes
+
+    def pending(self, pool: str) -> int:
+        return self._pending[pool]
+
+    async def run_in_thread(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Executa uma função bloqueante no pool de threads"""
+        return await self._submit("thread", self.threads, self.max_threads, func, *args, **kwargs)
+
+    async def run_in_process(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Executa uma função CPU-bound (e seus argumentos picklable) no pool de processos"""
+        return await self._submit("process", self.processes, self.max_processes, func, *args, **kwargs)
+
+    async def _submit(self, pool: str, executor: Executor, workers: int, func: Callable[..., Any], *args, **kwargs) -> Any:
+        if self._pending[pool] >= workers + self.queue_depth:
+            logger.warning(f"Pool de {pool} saturado ({self._pending[pool]} tarefas pendentes)")
+            raise ServerBusyError(pool)
+
+        self._pending[pool] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+        finally:
+            self._pending[pool] -= 1
+
+    def shutdown(self) -> None:
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+
+
+executor = ExecutionLayer()
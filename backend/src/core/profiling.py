@@ -0,0 +1,99 @@
+import asyncio
+import cProfile
+import logging
+import os
+import re
+import time
+import uuid
+from typing import Optional
+from urllib.parse import parse_qs
+
+from src.core.config import PROFILING_ENABLED, PROFILING_TOKEN, PROFILE_DIR
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+# Nomes aceitos em /debug/profiles/{name}
+PROFILE_NAME = re.compile(r"^[\w.-]+\.(prof|html)$")
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:  # pyinstrument é opcional; sem ele usa-se o cProfile
+    SamplingProfiler = None
+
+
+def _requested(scope) -> Optional[str]:
+    """Valor do gatilho de profiling (cabeçalho X-Profile ou ?profile=...), se houver"""
+    for name, value in scope.get("headers", ()):
+        if name == PROFILE_HEADER:
+            return value.decode("latin-1")
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    values = query.get("profile")
+    return values[0] if values else None
+
+
+class ProfilingMiddleware:
+    """Captura opcional de um perfil de execução por requisição.
+
+    Ativado com PROFILING_ENABLED; a requisição pede o perfil com o
+    cabeçalho ``X-Profile`` ou o parâmetro ``?profile=``, cujo valor deve ser
+    PROFILING_TOKEN quando configurado. Usa o pyinstrument (amostragem, com
+    suporte a async) se instalado, senão o cProfile. O perfil é gravado em
+    PROFILE_DIR e o nome do arquivo volta no cabeçalho ``X-Profile-File``.
+
+    Só a thread do event loop é perfilada: trabalho enviado aos pools de
+    threads e processos aparece como espera. O pyinstrument (modo async)
+    atribui a cada perfil só a requisição que o pediu. O cProfile mede a
+    thread inteira: as requisições perfiladas são executadas uma por vez, mas
+    requisições comuns simultâneas ainda entram no relatório. Com ele, o
+    perfil só é fiel sob carga de uma requisição.
+    """
+
+    def __init__(self, app, enabled: bool = PROFILING_ENABLED, token: Optional[str] = PROFILING_TOKEN, profile_dir: str = PROFILE_DIR):
+        self.app = app
+        self.enabled = enabled
+        self.token = token
+        self.profile_dir = profile_dir
+        # cProfile: um perfil por vez na thread do event loop
+        self._cprofile_lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+        requested = _requested(scope)
+        if not requested or (self.token and requested != self.token):
+            await self.app(scope, receive, send)
+            return
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        extension = "html" if SamplingProfiler is not None else "prof"
+        slug = re.sub(r"[^\w]+", "_", scope["path"]).strip("_") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{uuid.uuid4().hex[:8]}.{extension}"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-file", name.encode())]
+            await send(message)
+
+        path = os.path.join(self.profile_dir, name)
+        if SamplingProfiler is not None:
+            profiler = SamplingProfiler(async_mode="enabled")
+            profiler.start()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.stop()
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+        else:
+            async with self._cprofile_lock:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    profiler.disable()
+                    profiler.dump_stats(path)
+        logger.info(f"Perfil da requisição {scope['method']} {scope['path']} gravado em {path}")
@@ -0,0 +1,188 @@
+"""Serialização das respostas da API.
+
+``FastJSONResponse`` serializa com o orjson (opcional; sem ele, o ``json``
+da biblioteca padrão), que entende arrays e escalares do NumPy e datas do
+pandas sem a conversão recursiva do ``jsonable_encoder``. As rotas de
+análise usam ``negotiate`` para oferecer, além do JSON em registros:
+
+- ``?columnar=true``: listas de registros viram arrays paralelos
+  (``{"name": [...], "value": [...]}``), sem repetir as chaves a cada linha;
+- ``Accept: application/vnd.apache.arrow.stream``: a maior tabela da
+  resposta em Arrow IPC, com os demais campos em JSON nos metadados do
+  esquema (chave ``meta``) e o caminho da tabela na chave ``table``. Além
+  das listas de registros, valem como tabela os dicionários indexados por
+  coluna (matriz de correlação, estatísticas descritivas): uma linha por
+  chave, com o nome na coluna ``column``.
+"""
+import io
+import json
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; sem ele usa-se o json da biblioteca padrão
+    orjson = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+TRUE_VALUES = ("1", "true", "yes")
+
+
+def _default(obj: Any) -> Any:
+    """Tipos que o serializador não conhece: pandas, NumPy e modelos Pydantic"""
+    if obj is pd.NaT or obj is pd.NA:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return obj.tolist()
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict(orient="records")
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, pd.Period):
+        return str(obj)
+    raise TypeError(f"Tipo não serializável em JSON: {type(obj).__name__}")
+
+
+def _finite(obj: Any) -> Any:
+    """NaN e infinitos viram null, como no orjson (o JSON não os representa)"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+def dumps(content: Any) -> bytes:
+    """JSON compacto em UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    text = json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":"), allow_nan=True)
+    if "NaN" in text or "Infinity" in text:
+        text = json.dumps(_finite(json.loads(text)), ensure_ascii=False, separators=(",", ":"))
+    return text.encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serializada por ``dumps`` (orjson quando disponível)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _is_records(value: Any) -> bool:
+    return isinstance(value, list) and len(value) > 0 and all(isinstance(item, dict) for item in value)
+
+
+def _columns(records: List[dict]) -> Dict[str, list]:
+    """Registros em arrays paralelos, na ordem em que as chaves aparecem"""
+    keys = list(dict.fromkeys(key for record in records for key in record))
+    return {key: [record.get(key) for record in records] for key in keys}
+
+
+def to_columnar(content: Any) -> Any:
+    """Troca, em qualquer nível, listas de registros por arrays paralelos"""
+    if isinstance(content, BaseModel):
+        content = content.model_dump()
+    if _is_records(content):
+        return _columns(content)
+    if isinstance(content, dict):
+        return {key: to_columnar(value) for key, value in content.items()}
+    return content
+
+
+def _row(value: Any) -> Optional[dict]:
+    """Linha de uma tabela indexada: dicionário (ou modelo) só com valores escalares"""
+    if isinstance(value, BaseModel):
+        value = value.model_dump()
+    if not isinstance(value, dict) or any(isinstance(item, (dict, list, BaseModel)) for item in value.values()):
+        return None
+    return value
+
+
+def _keyed_records(content: Any) -> Optional[List[dict]]:
+    """``{nome: {campo: valor}}`` em registros ``{"column": nome, campo: valor}``"""
+    if not isinstance(content, dict) or not content:
+        return None
+    records = []
+    for key, value in content.items():
+        row = _row(value)
+        if row is None:
+            return None
+        records.append({"column": key, **row})
+    return records
+
+
+def _largest_table(content: Any, path: Tuple[str, ...] = ()) -> Optional[Tuple[Tuple[str, ...], List[dict]]]:
+    """Caminho e registros da maior tabela da resposta (lista de registros ou dicionário indexado)"""
+    if _is_records(content):
+        return path, content
+    keyed = _keyed_records(content)
+    if keyed is not None and path:
+        return path, keyed
+    best = None
+    if isinstance(content, dict):
+        for key, value in content.items():
+            found = _largest_table(value, path + (str(key),))
+            if found is not None and (best is None or len(found[1]) > len(best[1])):
+                best = found
+    return best
+
+
+def _without(content: dict, path: Tuple[str, ...]) -> dict:
+    """Cópia rasa da resposta sem a tabela em ``path``"""
+    head, rest = path[0], path[1:]
+    if not rest:
+        return {key: value for key, value in content.items() if str(key) != head}
+    return {key: _without(value, rest) if str(key) == head else value for key, value in content.items()}
+
+
+def arrow_body(content: Any) -> bytes:
+    """Maior tabela da resposta em Arrow IPC (formato de streaming)"""
+    import pyarrow as pa
+
+    if isinstance(content, BaseModel):
+        content = content.model_dump()
+    found = _largest_table(content)
+    if found is None:
+        raise HTTPException(status_code=406, detail="Resposta sem dados tabulares para o formato Arrow")
+    path, records = found
+    table = pa.Table.from_pandas(pd.DataFrame.from_records(records), preserve_index=False)
+    meta = _without(content, path) if path else {}
+    table = table.replace_schema_metadata({"table": ".".join(path), "meta": dumps(meta)})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def wants_arrow(request: Request) -> bool:
+    return ARROW_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def wants_columnar(request: Request) -> bool:
+    return request.query_params.get("columnar", "").lower() in TRUE_VALUES
+
+
+def negotiate(request: Request, content: Any, headers: Optional[dict] = None) -> Response:
+    """Resposta no formato pedido: Arrow, JSON colunar ou JSON em registros"""
+    headers = {**(headers or {}), "Vary": "Accept"}
+    if wants_arrow(request):
+        return Response(content=arrow_body(content), media_type=ARROW_MEDIA_TYPE, headers=headers)
+    if wants_columnar(request):
+        content = to_columnar(content)
+    return FastJSONResponse(content, headers=headers)
@@ -1,12 +1,40 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, Response
+from src.api.dependencies import close_services, get_job_queue, get_registry, get_shared_store, warm_up, warmup
 from src.api.routes import router
+from src.core.compression import CompressionMiddleware
+from src.core.config import PROFILING_ENABLED, PROFILE_DIR, WEB_WORKERS
+from src.core.executor import executor
+from src.core.metrics import metrics, CONTENT_TYPE, MetricsMiddleware
+from src.core.profiling import ProfilingMiddleware, PROFILE_NAME
+from src.core.responses import FastJSONResponse
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicia o carregamento do dataset padrão e a fila de jobs em segundo plano e libera os recursos no fim"""
+    # Com vários workers, acompanha os datasets publicados pelos demais processos
+    shared_store = get_shared_store()
+    if shared_store is not None:
+        shared_store.start()
+    warmup_task = asyncio.create_task(warm_up())
+    get_job_queue().start()
+    yield
+    warmup_task.cancel()
+    # Encerra a fila de jobs, as conexões com a OpenAI e os pools de threads e processos
+    await close_services()
+    executor.shutdown()
 
 app = FastAPI(
     title="AnalisAI API",
     description="API para análise de dados com recursos de IA",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configuração CORS
@@ -16,16 +44,54 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-File"],
 )
 
+# Compressão, perfil sob demanda e métricas por rota (o último adicionado é o mais externo)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 @app.get("/")
 async def root():
     """Redireciona para a documentação da API"""
     return RedirectResponse(url="/docs")
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Métricas no formato texto do Prometheus"""
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+if PROFILING_ENABLED:
+    @app.get("/debug/profiles/{name}", include_in_schema=False)
+    async def get_profile(name: str):
+        """Arquivo de perfil gravado pelo ProfilingMiddleware"""
+        path = os.path.join(PROFILE_DIR, name)
+        if not PROFILE_NAME.match(name) or not os.path.exists(path):
+            raise HTTPException(status_code=404, detail="Perfil não encontrado")
+        return FileResponse(path)
+
+@app.get("/health/live", include_in_schema=False)
+async def liveness():
+    """O processo está de pé e atendendo requisições"""
+    return {"status": "ok"}
+
+@app.get("/health/ready", include_in_schema=False)
+async def readiness():
+    """Pronto para receber tráfego: carregamento inicial concluído.
+
+    Se o dataset padrão não pôde ser carregado, o serviço fica pronto mas
+    ``degraded`` (com o erro em ``warmup.error``): uploads continuam aceitos.
+    """
+    body = {"warmup": warmup.as_dict(), "datasets": get_registry().registered_count}
+    if not warmup.ready:
+        return JSONResponse(status_code=503, content={"status": "starting", **body})
+    return {"status": "degraded" if warmup.degraded else "ready", **body}
+
 # Rotas
 app.include_router(router, prefix="/api", tags=["analysis"])
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("src.main:app", host="0.0.0.0", port=8000, reload=True)
+    # O reload automático só funciona com um único processo
+    uvicorn.run("src.main:app", host="0.0.0.0", port=8000, reload=WEB_WORKERS == 1, workers=WEB_WORKERS)
@@ -1,7 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import List, Optional, Dict, Any
 from enum import Enum
 
+from src.core.config import MAX_STREAM_PARTS
+
 class FileType(str, Enum):
     CSV = "csv"
     EXCEL = "xlsx"
@@ -15,10 +17,24 @@ class AnalysisType(str, Enum):
 
 class DataAnalysisRequest(BaseModel):
     file_name: str
+    # Arquivo guardado por POST /upload?mode=store (modo streaming)
+    file_id: Optional[str] = None
+    dataset_id: Optional[str] = None
     analysis_type: AnalysisType
     columns: Optional[List[str]] = None
     parameters: Optional[Dict[str, Any]] = None
 
+    @field_validator("parameters")
+    @classmethod
+    def check_parts(cls, parameters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """``parts`` (modo streaming) precisa ser um inteiro entre 1 e MAX_STREAM_PARTS"""
+        parts = (parameters or {}).get("parts")
+        if parts is not None and (
+            isinstance(parts, bool) or not isinstance(parts, int) or not 1 <= parts <= MAX_STREAM_PARTS
+        ):
+            raise ValueError(f"parts deve ser um inteiro entre 1 e {MAX_STREAM_PARTS}")
+        return parameters
+
 class DescriptiveStats(BaseModel):
     count: float
     mean: Optional[float] = None
@@ -1,134 +1,332 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, List, Optional
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import BytesIO
-import base64
 
+from src.core.config import CORRELATION_ANNOTATE_MAX
+from src.core.metrics import StageTimings
 from src.schemas.data import AnalysisType, DescriptiveStats
+from src.services.correlation import correlation_matrix, correlation_payload
+from src.services.rendering import new_figure, figure_to_bytes
+from src.services.stats_engine import NumericSummary, summarize
+from src.services.streaming_stats import StreamingStats
+from src.services.timeseries import TimeSeriesEngine
+from src.utils.ingestion import read_tabular
+
+# Gráfico de distribuição: máximo de barras do histograma e de pontos fora dos bigodes
+HIST_MAX_BINS = 200
+MAX_FLIERS = 2000
 
 class DataAnalysisService:
-    def __init__(self):
-        self.data: Optional[pd.DataFrame] = None
-        
+    def __init__(self, data: Optional[pd.DataFrame] = None):
+        self.data: Optional[pd.DataFrame] = data
+        self._numeric: Optional[List[str]] = None
+        self._summary: Optional[NumericSummary] = None
+        self._timeseries: Dict[tuple, TimeSeriesEngine] = {}
+
     def load_data(self, file_path: str) -> None:
         """Carrega dados de diferentes formatos"""
-        if file_path.endswith('.csv'):
-            self.data = pd.read_csv(file_path)
-        elif file_path.endswith('.xlsx'):
-            self.data = pd.read_excel(file_path)
-        elif file_path.endswith('.json'):
-            self.data = pd.read_json(file_path)
-        else:
-            raise ValueError("Formato de arquivo não suportado")
+        self.data = read_tabular(file_path)
+        self._numeric = None
+        self._summary = None
+        self._timeseries = {}
+
+    def _numeric_columns(self, columns: Optional[List[str]] = None) -> List[str]:
+        """Colunas numéricas (opcionalmente restritas a ``columns``)"""
+        if self._numeric is None:
+            self._numeric = self.data.select_dtypes(include=[np.number]).columns.tolist()
+        if columns:
+            numeric = set(self._numeric)
+            return [col for col in columns if col in numeric]
+        return self._numeric
+
+    def numeric_summary(self, columns: Optional[List[str]] = None) -> NumericSummary:
+        """Resumo estatístico de todas as colunas numéricas, calculado uma vez.
+
+        É compartilhado entre as análises descritiva e de distribuição, que
+        apenas selecionam as colunas de interesse.
+        """
+        if self._summary is None:
+            self._summary = summarize(self.data, self._numeric_columns())
+        if columns is None:
+            return self._summary
+        return self._summary.select(columns)
 
     def get_descriptive_stats(self, columns: Optional[List[str]] = None) -> Dict[str, DescriptiveStats]:
         """Calcula estatísticas descritivas das colunas numéricas"""
         if self.data is None:
             raise ValueError("Dados não carregados")
 
-        if columns:
-            numeric_cols = [col for col in columns if col in self.data.select_dtypes(include=[np.number]).columns]
-        else:
-            numeric_cols = self.data.select_dtypes(include=[np.number]).columns
-
-        stats = {}
-        for col in numeric_cols:
-            desc = self.data[col].describe()
-            stats[col] = DescriptiveStats(
-                count=desc['count'],
-                mean=desc['mean'],
-                std=desc['std'],
-                min=desc['min'],
-                q1=desc['25%'],
-                median=desc['50%'],
-                q3=desc['75%'],
-                max=desc['max']
-            )
-        return stats
+        numeric_cols = self._numeric_columns(columns)
+        return self.numeric_summary(numeric_cols).descriptive_stats()
+
+    def get_correlation_analysis(
+        self,
+        columns: Optional[List[str]] = None,
+        render: bool = True,
+        image_format: str = "png",
+        timings: Optional[StageTimings] = None,
+        parameters: Optional[Dict[str, Any]] = None,
+        plot: bool = False,
+    ) -> Dict[str, Any]:
+        """Calcula matriz de correlação.
 
-    def get_correlation_analysis(self, columns: Optional[List[str]] = None) -> Dict[str, Any]:
-        """Calcula matriz de correlação"""
+        ``parameters`` aceita ``layout`` (auto, dict, compact, none), ``order``
+        (original, cluster), ``top_k`` e ``threshold`` para os pares mais
+        correlacionados; ver ``correlation_payload``.
+        """
         if self.data is None:
             raise ValueError("Dados não carregados")
+        timings = timings or StageTimings()
+        parameters = parameters or {}
 
-        if columns:
-            numeric_cols = [col for col in columns if col in self.data.select_dtypes(include=[np.number]).columns]
-        else:
-            numeric_cols = self.data.select_dtypes(include=[np.number]).columns
-
-        corr_matrix = self.data[numeric_cols].corr()
-        
-        # Gera visualização
-        plt.figure(figsize=(10, 8))
-        sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', center=0)
-        plt.title('Matriz de Correlação')
-        
-        # Converte plot para base64
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', bbox_inches='tight')
-        plt.close()
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
+        with timings.stage("compute"):
+            numeric_cols = self._numeric_columns(columns)
+            matrix = correlation_matrix(self.data, numeric_cols)
+        with timings.stage("format"):
+            threshold = parameters.get("threshold")
+            results = correlation_payload(
+                matrix,
+                numeric_cols,
+                layout=parameters.get("layout", "auto"),
+                order=parameters.get("order", "original"),
+                top_k=int(parameters["top_k"]) if parameters.get("top_k") else None,
+                threshold=float(threshold) if threshold is not None else None,
+            )
 
-        return {
-            "correlation_matrix": corr_matrix.to_dict(),
-            "visualization": f"data:image/png;base64,{image_base64}"
-        }
+        if (render or plot) and len(numeric_cols) > 0:
+            ordered = results["columns"]
+            if ordered != numeric_cols:
+                positions = [numeric_cols.index(col) for col in ordered]
+                matrix = matrix[np.ix_(positions, positions)]
+            spec = {"kind": "heatmap", "matrix": matrix, "columns": ordered}
+            if plot:
+                results["plot"] = spec
+            else:
+                with timings.stage("render"):
+                    results["image"] = render_plot(spec, image_format)
+
+        return results
 
-    def get_distribution_analysis(self, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    def get_distribution_analysis(
+        self,
+        columns: Optional[List[str]] = None,
+        render: bool = True,
+        image_format: str = "png",
+        timings: Optional[StageTimings] = None,
+        plot: bool = False,
+    ) -> Dict[str, Any]:
         """Analisa a distribuição das colunas"""
         if self.data is None:
             raise ValueError("Dados não carregados")
+        timings = timings or StageTimings()
 
         if columns:
-            numeric_cols = [col for col in columns if col in self.data.select_dtypes(include=[np.number]).columns]
+            numeric_cols = self._numeric_columns(columns)
         else:
-            numeric_cols = self.data.select_dtypes(include=[np.number]).columns[:5]  # Limita a 5 colunas
-
-        # Gera visualização
-        fig, axes = plt.subplots(len(numeric_cols), 2, figsize=(15, 5*len(numeric_cols)))
-        fig.suptitle('Análise de Distribuição')
-
-        results = {}
-        for i, col in enumerate(numeric_cols):
-            # Histograma
-            sns.histplot(data=self.data, x=col, ax=axes[i, 0])
-            axes[i, 0].set_title(f'Histograma - {col}')
-            
-            # Box plot
-            sns.boxplot(data=self.data, y=col, ax=axes[i, 1])
-            axes[i, 1].set_title(f'Box Plot - {col}')
-
-            # Estatísticas
-            results[col] = {
-                "skewness": float(self.data[col].skew()),
-                "kurtosis": float(self.data[col].kurtosis()),
-                "outliers_count": len(self.data[self.data[col].abs() > self.data[col].std() * 3])
-            }
-
-        # Converte plot para base64
-        buffer = BytesIO()
-        plt.savefig(buffer, format='png', bbox_inches='tight')
-        plt.close()
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode()
+            numeric_cols = self._numeric_columns()[:5]  # Limita a 5 colunas
+
+        # Estatísticas
+        with timings.stage("compute"):
+            analysis = {"statistics": self.numeric_summary(numeric_cols).distribution_stats()}
+        if (render or plot) and len(numeric_cols) > 0:
+            with timings.stage("plot_data"):
+                summary = self.numeric_summary(numeric_cols)
+                spec = {
+                    "kind": "distribution",
+                    "columns": {
+                        col: _distribution_plot(
+                            self.data[col].to_numpy(dtype=np.float64, na_value=np.nan),
+                            summary.q1[i], summary.median[i], summary.q3[i],
+                        )
+                        for i, col in enumerate(numeric_cols)
+                    },
+                }
+            if plot:
+                analysis["plot"] = spec
+            else:
+                with timings.stage("render"):
+                    analysis["image"] = render_plot(spec, image_format)
+
+        return analysis
+
+    def get_timeseries_analysis(self, columns: Optional[List[str]] = None, parameters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Série temporal por período, com média móvel, ativos acumulados e somas de colunas"""
+        if self.data is None:
+            raise ValueError("Dados não carregados")
+
+        parameters = parameters or {}
+        date_columns = self.data.select_dtypes(include=["datetime64"]).columns.tolist()
+        date_column = parameters.get("date_column") or (
+            "data_cadastro" if "data_cadastro" in self.data.columns else next(iter(date_columns), None)
+        )
+        if date_column is None or date_column not in self.data.columns:
+            raise ValueError("Nenhuma coluna de data encontrada para a série temporal")
+        end_column = parameters.get("end_column") or (
+            "data_encerramento" if "data_encerramento" in self.data.columns else None
+        )
 
+        # Índices de datas ordenados ficam em cache por par de colunas
+        key = (date_column, end_column)
+        engine = self._timeseries.get(key)
+        if engine is None:
+            engine = TimeSeriesEngine(self.data[date_column], self.data[end_column] if end_column else None)
+            self._timeseries[key] = engine
+
+        freq = parameters.get("freq", "month")
+        value_columns = self._numeric_columns(columns) if columns else []
         return {
-            "statistics": results,
-            "visualization": f"data:image/png;base64,{image_base64}"
+            "date_column": date_column,
+            "frequency": freq,
+            "series": engine.series(
+                freq,
+                start=parameters.get("start"),
+                end=parameters.get("end"),
+                window=parameters.get("window"),
+                cumulative=end_column is not None,
+                values={col: self.data[col] for col in value_columns},
+            ),
         }
 
-    def analyze(self, analysis_type: AnalysisType, columns: Optional[List[str]] = None) -> Dict[str, Any]:
-        """Ponto de entrada principal para análises"""
+    @staticmethod
+    def check_streaming(analysis_type: AnalysisType) -> None:
+        """Recusa, antes de ler o arquivo, os tipos sem versão em streaming"""
+        if analysis_type == AnalysisType.TIMESERIES:
+            raise ValueError("Tipo de análise não suportado no modo streaming")
+
+    @staticmethod
+    def streaming_results(state: StreamingStats, analysis_type: AnalysisType) -> Dict[str, Any]:
+        """Resultados da análise a partir do estado combinado das partes do arquivo"""
+        DataAnalysisService.check_streaming(analysis_type)
+        if analysis_type == AnalysisType.DESCRIPTIVE:
+            results = {"stats": state.summary().descriptive_stats()}
+        elif analysis_type == AnalysisType.CORRELATION:
+            results = {"correlation_matrix": state.correlation().to_dict()}
+        elif analysis_type == AnalysisType.DISTRIBUTION:
+            results = {"statistics": state.summary().distribution_stats()}
+        else:
+            raise ValueError("Tipo de análise não suportado")
+        results["error_bounds"] = state.error_bounds()
+        return results
+
+    def analyze(
+        self,
+        analysis_type: AnalysisType,
+        columns: Optional[List[str]] = None,
+        render: bool = True,
+        image_format: str = "png",
+        parameters: Optional[Dict[str, Any]] = None,
+        plot: bool = False,
+    ) -> Dict[str, Any]:
+        """Ponto de entrada principal para análises.
+
+        Quando ``render`` é verdadeiro, a imagem gerada volta em bytes na chave
+        ``image`` para ser guardada no cache de visualizações. Com ``plot``, a
+        imagem não é gerada: os dados já reduzidos do gráfico (matriz,
+        histogramas) voltam na chave ``plot``, para ``render_plot`` em outro
+        processo. Os tempos de cálculo e renderização voltam na chave ``timings``.
+        """
+        timings = StageTimings()
         if analysis_type == AnalysisType.DESCRIPTIVE:
-            return {"stats": self.get_descriptive_stats(columns)}
+            with timings.stage("compute"):
+                results = {"stats": self.get_descriptive_stats(columns)}
         elif analysis_type == AnalysisType.CORRELATION:
-            return self.get_correlation_analysis(columns)
+            results = self.get_correlation_analysis(columns, render, image_format, timings, parameters, plot)
         elif analysis_type == AnalysisType.DISTRIBUTION:
-            return self.get_distribution_analysis(columns)
+            results = self.get_distribution_analysis(columns, render, image_format, timings, plot)
         elif analysis_type == AnalysisType.TIMESERIES:
-            raise NotImplementedError("Análise de séries temporais ainda não implementada")
+            with timings.stage("compute"):
+                results = self.get_timeseries_analysis(columns, parameters)
         else:
             raise ValueError("Tipo de análise não suportado")
+        results["timings"] = timings.durations
+        return results
+
+
+def _distribution_plot(values: np.ndarray, q1: float, median: float, q3: float) -> Dict[str, Any]:
+    """Histograma e estatísticas do box plot de uma coluna, no formato do ``Axes.bxp``"""
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return {"counts": np.zeros(0), "edges": np.zeros(1), "box": None}
+    edges = np.histogram_bin_edges(values, bins="auto")
+    if len(edges) > HIST_MAX_BINS + 1:
+        edges = np.linspace(edges[0], edges[-1], HIST_MAX_BINS + 1)
+    counts, edges = np.histogram(values, bins=edges)
+
+    # Bigodes em 1,5 IQR, limitados aos valores observados (como no matplotlib)
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    fliers = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+    if len(fliers) > MAX_FLIERS:
+        # Os extremos sempre aparecem; o restante é uma amostra regular
+        ordered = np.sort(fliers)
+        fliers = ordered[np.linspace(0, len(ordered) - 1, MAX_FLIERS).astype(np.intp)]
+    box = {
+        "med": median,
+        "q1": q1,
+        "q3": q3,
+        "whislo": float(inside.min()) if len(inside) else q1,
+        "whishi": float(inside.max()) if len(inside) else q3,
+        "fliers": fliers,
+    }
+    return {"counts": counts, "edges": edges, "box": box}
+
+
+def render_plot(spec: Dict[str, Any], image_format: str = "png") -> bytes:
+    """Renderiza um gráfico a partir dos dados reduzidos de ``analyze(plot=True)``.
+
+    Recebe só a matriz ou os histogramas, nunca o DataFrame: pode ser enviada
+    ao pool de processos sem serializar os dados do dataset.
+    """
+    if spec["kind"] == "heatmap":
+        return _render_heatmap(spec["matrix"], spec["columns"], image_format)
+    if spec["kind"] == "distribution":
+        return _render_distribution(spec["columns"], image_format)
+    raise ValueError(f"Tipo de gráfico desconhecido: {spec['kind']}")
+
+
+def _render_distribution(columns: Dict[str, Dict[str, Any]], image_format: str) -> bytes:
+    """Histograma e box plot de cada coluna"""
+    fig = new_figure((15, 5*len(columns)))
+    axes = fig.subplots(len(columns), 2, squeeze=False)
+    fig.suptitle('Análise de Distribuição')
+    for i, (col, data) in enumerate(columns.items()):
+        # Histograma
+        axes[i, 0].stairs(data["counts"], data["edges"], fill=True, alpha=0.75, edgecolor="white")
+        axes[i, 0].set_xlabel(col)
+        axes[i, 0].set_ylabel('Count')
+        axes[i, 0].set_title(f'Histograma - {col}')
+
+        # Box plot
+        if data["box"] is not None:
+            axes[i, 1].bxp([data["box"]], showfliers=True, patch_artist=True)
+            axes[i, 1].set_xticks([])
+        axes[i, 1].set_ylabel(col)
+        axes[i, 1].set_title(f'Box Plot - {col}')
+    return figure_to_bytes(fig, image_format)
+
+
+def _render_heatmap(matrix: np.ndarray, columns: List[str], image_format: str) -> bytes:
+    """Heatmap da correlação.
+
+    Anotado (seaborn) até CORRELATION_ANNOTATE_MAX colunas; acima disso, uma
+    única imagem raster sem anotações.
+    """
+    fig = new_figure((10, 8))
+    ax = fig.subplots()
+    if len(columns) <= CORRELATION_ANNOTATE_MAX:
+        import seaborn as sns
+
+        corr = pd.DataFrame(matrix, index=columns, columns=columns)
+        sns.heatmap(corr, annot=True, cmap='coolwarm', center=0, ax=ax)
+    else:
+        # Uma imagem em vez de N² retângulos; no SVG ela é embutida como bitmap
+        image = ax.imshow(matrix, cmap='coolwarm', vmin=-1, vmax=1, interpolation='nearest', rasterized=True)
+        fig.colorbar(image, ax=ax)
+        if len(columns) <= 4 * CORRELATION_ANNOTATE_MAX:
+            ax.set_xticks(range(len(columns)), labels=columns, rotation=90, fontsize=6)
+            ax.set_yticks(range(len(columns)), labels=columns, fontsize=6)
+        else:
+            ax.set_xticks([])
+            ax.set_yticks([])
+    ax.set_title('Matriz de Correlação')
+    return figure_to_bytes(fig, image_format)
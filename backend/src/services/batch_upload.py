@@ -0,0 +1,264 @@
+"""Upload em lote: vários arquivos (ou arquivos zip) viram um único dataset.
+
+Cada arquivo é dividido em partes (uma por planilha nos arquivos Excel), as
+partes são lidas em paralelo no pool de processos e validadas uma a uma, e o
+resultado é concatenado e registrado como um dataset. O lote é um job
+``batch`` da fila persistente (``JobQueue``): o andamento de cada parte é
+gravado com ``report_progress`` e consultado em ``/jobs/{job_id}``, em
+qualquer worker do uvicorn.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+import zipfile
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from src.core.config import UPLOAD_DIR, MAX_BATCH_FILES, MAX_BATCH_BYTES
+from src.core.executor import executor, ServerBusyError
+from src.core.metrics import StageTimings
+from src.services.contract_analysis import missing_contract_columns
+from src.services.dataset_registry import DatasetRegistry
+from src.services.jobs import report_progress
+from src.utils.columnar_cache import read_frame, write_frame
+from src.utils.ingestion import concat_compact, list_sheets, read_sheet, read_tabular, supported_extensions
+
+logger = logging.getLogger(__name__)
+
+EXCEL_EXTENSIONS = ("xlsx", "xls")
+
+
+def batch_extensions() -> Tuple[str, ...]:
+    """Extensões aceitas no upload em lote: as de dados mais zip"""
+    return supported_extensions() + ("zip",)
+
+
+class SchemaMismatchError(ValueError):
+    """Parte sem as colunas de contratos; é ignorada em vez de falhar o lote"""
+
+
+def _parse_part(path: str, sheet: Optional[str], out_path: str) -> int:
+    """Lê e valida uma parte (executado no pool de processos).
+
+    A parte é gravada em Arrow em ``out_path`` e só o número de linhas volta
+    pelo pool: o processo principal lê o arquivo via memory-map, sem
+    serializar o DataFrame entre os processos.
+    """
+    df = read_sheet(path, sheet) if sheet is not None else read_tabular(path)
+    missing = missing_contract_columns(df.columns)
+    if missing:
+        raise SchemaMismatchError(f"Colunas obrigatórias ausentes: {missing}")
+    write_frame(df, out_path)
+    return len(df)
+
+
+@dataclass
+class BatchPart:
+    """Um arquivo, membro de zip ou planilha a ser lido"""
+    file: str
+    path: str
+    sheet: Optional[str] = None
+    status: str = "pending"  # pending, done, skipped, failed
+    rows: int = 0
+    error: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "file": self.file,
+            "sheet": self.sheet,
+            "status": self.status,
+            "rows": self.rows,
+            "error": self.error,
+        }
+
+
+@dataclass
+class BatchJob:
+    """Andamento de um upload em lote"""
+    work_dir: str
+    uploads: List[Tuple[str, str, str]]  # (nome enviado, caminho, sha256)
+    status: str = "queued"  # queued, expanding, parsing, merging, done, failed
+    parts: List[BatchPart] = field(default_factory=list)
+    dataset_id: Optional[str] = None
+    rows: int = 0
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+    timings: dict = field(default_factory=dict)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed")
+
+    @property
+    def content_hash(self) -> str:
+        """Hash do lote: o conteúdo de cada arquivo, na ordem do envio"""
+        joined = ":".join(sha256 for _, _, sha256 in self.uploads)
+        return hashlib.sha256(f"batch:{joined}".encode()).hexdigest()
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "BatchJob":
+        return cls(work_dir=payload["work_dir"], uploads=[tuple(item) for item in payload["uploads"]])
+
+    def payload(self) -> dict:
+        """Dados de envio do job ``batch`` (JSON)"""
+        return {"work_dir": self.work_dir, "uploads": [list(item) for item in self.uploads]}
+
+    def as_dict(self) -> dict:
+        completed = sum(1 for part in self.parts if part.status != "pending")
+        return {
+            "status": self.status,
+            "files": [name for name, _, _ in self.uploads],
+            "progress": {"parts": len(self.parts), "completed": completed},
+            "parts": [part.as_dict() for part in self.parts],
+            "dataset_id": self.dataset_id,
+            "rows": self.rows,
+            "error": self.error,
+            "created": self.created,
+            "finished": self.finished,
+            "timings": self.timings,
+        }
+
+
+class BatchUploadService:
+    """Executa uploads em lote (chamado pelo handler dos jobs ``batch``)"""
+
+    def __init__(self, registry: DatasetRegistry):
+        self.registry = registry
+
+    @staticmethod
+    def work_dir() -> str:
+        """Diretório de trabalho de um novo job (arquivos enviados e extraídos)"""
+        path = os.path.join(UPLOAD_DIR, ".batch", uuid.uuid4().hex)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    async def run(self, job: BatchJob) -> dict:
+        """Processa o lote; devolve o andamento final (com o ``dataset_id``)"""
+        timings = StageTimings()
+        try:
+            self._set_status(job, "expanding")
+            with timings.stage("expand"):
+                job.parts = await executor.run_in_thread(self._expand, job)
+            if not job.parts:
+                raise ValueError("Nenhum arquivo de dados encontrado no lote")
+
+            self._set_status(job, "parsing")
+            with timings.stage("parse"):
+                semaphore = asyncio.Semaphore(executor.max_processes)
+                frames = await asyncio.gather(*(self._parse(job, part, semaphore) for part in job.parts))
+            failed = [part for part in job.parts if part.status == "failed"]
+            if failed:
+                raise ValueError(f"{len(failed)} parte(s) não puderam ser lidas: {failed[0].file}: {failed[0].error}")
+            frames = [frame for frame in frames if frame is not None]
+            if not frames:
+                raise ValueError("Nenhuma parte do lote possui as colunas de contratos")
+
+            self._set_status(job, "merging")
+            with timings.stage("merge"):
+                info = await executor.run_in_thread(self._merge, job, frames)
+            job.dataset_id = info.dataset_id
+            job.rows = info.rows
+            job.status = "done"
+            logger.info(f"Upload em lote concluído: dataset {info.dataset_id} ({info.rows} linhas)")
+            return job.as_dict()
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"Erro no upload em lote: {str(e)}")
+            raise
+        finally:
+            job.timings = timings.record("batch.")
+            job.finished = time.time()
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+            report_progress(job.as_dict())
+
+    @staticmethod
+    def _set_status(job: BatchJob, status: str) -> None:
+        job.status = status
+        report_progress(job.as_dict())
+
+    async def _parse(self, job: BatchJob, part: BatchPart, semaphore: asyncio.Semaphore) -> Optional[pd.DataFrame]:
+        out_path = os.path.join(job.work_dir, f"part-{uuid.uuid4().hex}.arrow")
+        async with semaphore:
+            while True:
+                try:
+                    await executor.run_in_process(_parse_part, part.path, part.sheet, out_path)
+                    df = await executor.run_in_thread(read_frame, out_path)
+                    break
+                except ServerBusyError:
+                    # Pool ocupado por outras requisições: aguarda a vez
+                    await asyncio.sleep(0.5)
+                except SchemaMismatchError as e:
+                    part.status = "skipped"
+                    part.error = str(e)
+                    df = None
+                    break
+                except Exception as e:
+                    part.status = "failed"
+                    part.error = str(e)
+                    df = None
+                    break
+        if df is not None:
+            part.status = "done"
+            part.rows = len(df)
+        report_progress(job.as_dict())
+        return df
+
+    def _expand(self, job: BatchJob) -> List[BatchPart]:
+        """Extrai os zips e divide as planilhas em partes (bloqueante)"""
+        files: List[Tuple[str, str]] = []
+        for name, path, _ in job.uploads:
+            if name.rsplit(".", 1)[-1].lower() == "zip":
+                files.extend(self._extract_zip(name, path, job.work_dir))
+            else:
+                files.append((name, path))
+        if len(files) > MAX_BATCH_FILES:
+            raise ValueError(f"O lote excede o limite de {MAX_BATCH_FILES} arquivos")
+
+        parts: List[BatchPart] = []
+        for name, path in files:
+            if path.rsplit(".", 1)[-1].lower() in EXCEL_EXTENSIONS:
+                parts.extend(BatchPart(file=name, path=path, sheet=sheet) for sheet in list_sheets(path))
+            else:
+                parts.append(BatchPart(file=name, path=path))
+        return parts
+
+    @staticmethod
+    def _extract_zip(name: str, path: str, work_dir: str) -> List[Tuple[str, str]]:
+        extensions = supported_extensions()
+        files: List[Tuple[str, str]] = []
+        with zipfile.ZipFile(path) as archive:
+            members = [
+                member for member in archive.infolist()
+                if not member.is_dir()
+                and not os.path.basename(member.filename).startswith((".", "~$"))
+                and "__MACOSX" not in member.filename
+                and member.filename.rsplit(".", 1)[-1].lower() in extensions
+            ]
+            if len(members) > MAX_BATCH_FILES:
+                raise ValueError(f"{name} excede o limite de {MAX_BATCH_FILES} arquivos")
+            if sum(member.file_size for member in members) > MAX_BATCH_BYTES:
+                raise ValueError(f"{name} excede o limite de {MAX_BATCH_BYTES} bytes descompactados")
+            for i, member in enumerate(members):
+                # Só o nome base: caminhos do zip nunca saem do diretório do job
+                target = os.path.join(work_dir, f"z{i}_{os.path.basename(member.filename)}")
+                with archive.open(member) as source, open(target, "wb") as dest:
+                    shutil.copyfileobj(source, dest)
+                files.append((f"{name}/{member.filename}", target))
+        return files
+
+    def _merge(self, job: BatchJob, frames: List[pd.DataFrame]):
+        """Alinha as colunas das partes, concatena e registra o dataset (bloqueante)"""
+        columns = list(dict.fromkeys(col for frame in frames for col in frame.columns))
+        frames = [frame if list(frame.columns) == columns else frame.reindex(columns=columns) for frame in frames]
+        df = concat_compact(frames)
+        names = [name for name, _, _ in job.uploads]
+        filename = names[0] if len(names) == 1 else f"{names[0]} (+{len(names) - 1})"
+        return self.registry.register_frame(df, job.content_hash, filename)
@@ -0,0 +1,65 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from src.core.config import CHAT_CONTEXT_TOKENS, CHAT_CONTEXT_TOP_N
+
+# Aproximação usual para texto em português: ~4 caracteres por token
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _table(title: str, header: str, rows: List[tuple]) -> str:
+    lines = [f"# {title}", header]
+    lines.extend(f"{name};{value}" for name, value in rows)
+    return "\n".join(lines)
+
+
+def _top_n(items: List[dict], top_n: int, total: Optional[int] = None) -> List[tuple]:
+    """Mantém os ``top_n`` maiores e agrupa o restante em "Outros" """
+    rows = [(item["name"], item["value"]) for item in items[:top_n]]
+    shown = sum(value for _, value in rows)
+    rest = (total if total is not None else sum(item["value"] for item in items)) - shown
+    if rest > 0:
+        rows.append(("Outros", rest))
+    return rows
+
+
+def _coarsen(temporal: List[dict], level: str) -> List[tuple]:
+    """Agrupa a série mensal (YYYY-MM) por trimestre ou ano"""
+    if level == "month":
+        return [(item["date"], item["quantidade"]) for item in temporal]
+    grouped: "OrderedDict[str, int]" = OrderedDict()
+    for item in temporal:
+        year, month = item["date"].split("-")
+        label = year if level == "year" else f"{year}Q{(int(month) - 1) // 3 + 1}"
+        grouped[label] = grouped.get(label, 0) + item["quantidade"]
+    return list(grouped.items())
+
+
+def build_context(sections: Dict[str, dict], total: int, max_tokens: int = CHAT_CONTEXT_TOKENS,
+                  top_n: int = CHAT_CONTEXT_TOP_N) -> str:
+    """Serializa os agregados em tabelas compactas (CSV com ';') dentro do orçamento.
+
+    Se o texto passar de ``max_tokens``, a série temporal é agregada por
+    trimestre e depois por ano, e as listas são reduzidas aos maiores itens.
+    """
+    attempts = [(level, n) for n in (top_n, max(3, top_n // 2)) for level in ("month", "quarter", "year")]
+    context = ""
+    for level, n in attempts:
+        context = "\n\n".join([
+            f"Total de contratos: {total}",
+            _table("Status", "status;quantidade", _top_n(sections["status"]["data"], n)),
+            _table("Modalidades", "modalidade;quantidade", _top_n(sections["modalidade"]["data"], n)),
+            _table(
+                "Contratos cadastrados por período",
+                "periodo;quantidade",
+                _coarsen(sections["temporal"]["data"], level),
+            ),
+            _table("Responsáveis", "responsavel;quantidade", _top_n(sections["responsavel"]["data"], n, total)),
+        ])
+        if estimate_tokens(context) <= max_tokens:
+            break
+    return context
@@ -1,69 +1,216 @@
+import asyncio
 import os
-from openai import OpenAI
+import random
 import logging
-from typing import Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Optional, Tuple
 from dotenv import load_dotenv
 
+from src.core.config import (
+    CHAT_ANSWER_CACHE_SIZE,
+    OPENAI_BASE_URL,
+    OPENAI_MODEL,
+    OPENAI_TIMEOUT,
+    OPENAI_MAX_RETRIES,
+    OPENAI_MAX_CONNECTIONS,
+)
+from src.core.executor import executor
+from src.core.metrics import observe_stages, timed
+from src.services.chat_context import build_context, estimate_tokens
+
 logger = logging.getLogger(__name__)
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
 
+# Contextos mantidos em memória (um por versão de dados)
+MAX_CACHED_CONTEXTS = 32
+
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+
+
+class ChatUnavailableError(RuntimeError):
+    """Chat sem credenciais da OpenAI configuradas"""
+
+
+def _retryable_errors() -> tuple:
+    """Falhas transitórias que valem nova tentativa"""
+    from openai import APIConnectionError, APITimeoutError, RateLimitError, InternalServerError
+
+    return (APIConnectionError, APITimeoutError, RateLimitError, InternalServerError)
+
+
 class ChatService:
-    def __init__(self, contract_service=None):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY não encontrada nas variáveis de ambiente")
-            
-        self.client = OpenAI(api_key=api_key)
-        self.contract_service = contract_service
+    def __init__(self, registry=None):
+        # Sem chave o serviço continua de pé; apenas o chat fica indisponível
+        self.api_key = os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
+            logger.warning("OPENAI_API_KEY não encontrada nas variáveis de ambiente; chat indisponível")
+        self._client = None
+        self.model = OPENAI_MODEL
+        self.max_retries = OPENAI_MAX_RETRIES
+        self.registry = registry
+        self._contexts: "OrderedDict[str, str]" = OrderedDict()
+        self._answers: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
         self.system_prompt = """Você é um assistente especializado em análise de contratos.
         Use as informações fornecidas sobre os contratos para responder às perguntas do usuário de forma clara e objetiva.
         Sempre baseie suas respostas nos dados concretos das análises."""
 
-    def get_analysis_context(self) -> str:
-        try:
-            status_data = self.contract_service.get_status_analysis()
-            modalidade_data = self.contract_service.get_modalidade_analysis()
-            temporal_data = self.contract_service.get_temporal_analysis()
-            responsavel_data = self.contract_service.get_responsavel_analysis()
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
 
-            context = f"""
-            Aqui estão os dados atuais dos contratos:
+    @property
+    def client(self):
+        """Cliente da OpenAI, criado (e o SDK importado) no primeiro uso"""
+        if self._client is None:
+            if not self.available:
+                raise ChatUnavailableError("OPENAI_API_KEY não encontrada nas variáveis de ambiente")
+            import httpx
+            from openai import AsyncOpenAI
 
-            Status dos Contratos:
-            {status_data['data']}
+            # Conexões HTTP reaproveitadas entre requisições; as tentativas são
+            # controladas aqui (com jitter) e não pelo SDK
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=OPENAI_BASE_URL,
+                timeout=OPENAI_TIMEOUT,
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    timeout=OPENAI_TIMEOUT,
+                    limits=httpx.Limits(
+                        max_connections=OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                    ),
+                ),
+            )
+        return self._client
 
-            Modalidades:
-            {modalidade_data['data']}
+    def get_analysis_context(self, dataset_id: Optional[str] = None) -> Tuple[str, Optional[str]]:
+        """Contexto compacto das análises e a versão dos dados a que se refere.
 
-            Evolução Temporal:
-            {temporal_data['data']}
+        O texto é guardado por versão do snapshot, então só é refeito quando
+        os dados mudam.
+        """
+        try:
+            with self.registry.acquire(dataset_id) as dataset:
+                snapshot = dataset.contracts.get_snapshot()
+                total = len(dataset.df)
 
-            Responsáveis:
-            {responsavel_data['data']}
-            """
-            return context
+            with self._lock:
+                context = self._contexts.get(snapshot.version)
+            if context is None:
+                with timed("chat.context_build"):
+                    context = build_context(snapshot.sections, total)
+                with self._lock:
+                    self._contexts[snapshot.version] = context
+                    while len(self._contexts) > MAX_CACHED_CONTEXTS:
+                        self._contexts.popitem(last=False)
+                logger.info(f"Contexto do chat gerado (~{estimate_tokens(context)} tokens)")
+            return context, snapshot.version
         except Exception as e:
             logger.error(f"Erro ao obter contexto das análises: {str(e)}")
-            return "Não foi possível obter os dados das análises."
+            return "Não foi possível obter os dados das análises.", None
+
+    def _cached_answer(self, answer_key: Tuple[Optional[str], str]) -> Optional[str]:
+        if answer_key[0] is None:
+            return None
+        with self._lock:
+            cached = self._answers.get(answer_key)
+            if cached is not None:
+                self._answers.move_to_end(answer_key)
+                logger.info("Resposta do chat obtida do cache")
+            return cached
+
+    def _store_answer(self, answer_key: Tuple[Optional[str], str], answer: Optional[str]) -> None:
+        if answer_key[0] is None or not answer:
+            return
+        with self._lock:
+            self._answers[answer_key] = answer
+            while len(self._answers) > CHAT_ANSWER_CACHE_SIZE:
+                self._answers.popitem(last=False)
+
+    async def _prepare(self, message: str, dataset_id: Optional[str]):
+        """Monta as mensagens do prompt e a chave do cache de respostas"""
+        # O contexto pode precisar recarregar o dataset: fora do event loop
+        with timed("chat.context"):
+            context, version = await executor.run_in_thread(self.get_analysis_context, dataset_id)
+        # Respostas recentes para a mesma pergunta sobre a mesma versão dos dados
+        answer_key = (version, " ".join(message.split()).lower())
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "system", "content": f"Dados das análises:\n{context}"},
+            {"role": "user", "content": message}
+        ]
+        return messages, answer_key
+
+    async def _create(self, **kwargs):
+        """Chamada à API com backoff exponencial e jitter completo"""
+        client = self.client
+        retryable = _retryable_errors()
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await client.chat.completions.create(
+                    model=self.model,
+                    temperature=0.7,
+                    max_tokens=1000,
+                    **kwargs
+                )
+            except retryable as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+                logger.warning(f"Falha na chamada à OpenAI ({type(e).__name__}), nova tentativa em {delay:.2f}s")
+                await asyncio.sleep(delay)
 
-    def process_message(self, message: str) -> Optional[str]:
+    async def process_message(self, message: str, dataset_id: Optional[str] = None) -> Optional[str]:
+        if not self.available:
+            raise ChatUnavailableError("Chat indisponível: OPENAI_API_KEY não configurada")
         try:
-            context = self.get_analysis_context()
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "system", "content": f"Dados das análises:\n{context}"},
-                    {"role": "user", "content": message}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
-            
-            return response.choices[0].message.content
+            messages, answer_key = await self._prepare(message, dataset_id)
+            cached = self._cached_answer(answer_key)
+            if cached is not None:
+                return cached
+
+            with timed("chat.llm"):
+                response = await self._create(messages=messages)
+            answer = response.choices[0].message.content
+            self._store_answer(answer_key, answer)
+            return answer
         except Exception as e:
             logger.error(f"Erro ao processar mensagem no chat: {str(e)}")
-            return None 
\ No newline at end of file
+            return None
+
+    async def stream_message(self, message: str, dataset_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Gera os trechos da resposta à medida que chegam do modelo"""
+        if not self.available:
+            raise ChatUnavailableError("Chat indisponível: OPENAI_API_KEY não configurada")
+        messages, answer_key = await self._prepare(message, dataset_id)
+        cached = self._cached_answer(answer_key)
+        if cached is not None:
+            yield cached
+            return
+
+        start = time.perf_counter()
+        stream = await self._create(messages=messages, stream=True)
+        parts = []
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                if not parts:
+                    observe_stages({"chat.llm_first_token": time.perf_counter() - start})
+                parts.append(token)
+                yield token
+        observe_stages({"chat.llm_stream": time.perf_counter() - start})
+        self._store_answer(answer_key, "".join(parts))
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
@@ -0,0 +1,139 @@
+import heapq
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+STATUS_LABELS = {'A': 'Ativo', 'E': 'Encerrado'}
+
+# Tamanho do ranking de responsáveis
+TOP_RESPONSAVEIS = 10
+
+
+def category_counts(series: pd.Series) -> Tuple[list, np.ndarray]:
+    """Contagem por categoria via bincount dos códigos inteiros"""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype("category")
+    codes = series.cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+    return series.cat.categories.tolist(), counts
+
+
+def _counter(series: pd.Series) -> Counter:
+    categories, counts = category_counts(series)
+    return Counter({cat: int(count) for cat, count in zip(categories, counts) if count > 0})
+
+
+def _month_counter(dates: pd.Series) -> Counter:
+    """Contagem de registros por mês (ordinal do período mensal)"""
+    values = pd.to_datetime(dates, errors="coerce")
+    ordinals = pd.PeriodIndex(values[values.notna()], freq="M").asi8
+    months, counts = np.unique(ordinals, return_counts=True)
+    return Counter({int(month): int(count) for month, count in zip(months, counts)})
+
+
+def _ranked(counter: Counter, limit: Optional[int] = None) -> List[Tuple[object, int]]:
+    """Pares (chave, contagem) em ordem decrescente; empates pela chave"""
+    items = ((key, count) for key, count in counter.items() if count > 0)
+    order = lambda item: (-item[1], str(item[0]))
+    if limit is None:
+        return sorted(items, key=order)
+    return heapq.nsmallest(limit, items, key=order)
+
+
+class ContractAggregates:
+    """Contadores de status, modalidade, mês e responsável de um dataset.
+
+    São montados uma vez a partir do DataFrame completo e depois apenas
+    ajustados pelas linhas alteradas em cada carga incremental: as linhas
+    substituídas são subtraídas e as novas somadas, sem reagrupar a base.
+    """
+
+    def __init__(
+        self,
+        status: Counter,
+        modalidade: Counter,
+        months: Counter,
+        responsavel: Optional[Counter] = None,
+    ):
+        self.status = status
+        self.modalidade = modalidade
+        self.months = months
+        self.responsavel = responsavel
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "ContractAggregates":
+        return cls(
+            status=_counter(df['status']),
+            modalidade=_counter(df['modalidade']),
+            months=_month_counter(df['data_cadastro']),
+            responsavel=_counter(df['responsavel']) if 'responsavel' in df.columns else None,
+        )
+
+    def copy(self) -> "ContractAggregates":
+        return ContractAggregates(
+            status=Counter(self.status),
+            modalidade=Counter(self.modalidade),
+            months=Counter(self.months),
+            responsavel=Counter(self.responsavel) if self.responsavel is not None else None,
+        )
+
+    def apply(self, removed: pd.DataFrame, added: pd.DataFrame) -> None:
+        """Subtrai as linhas removidas/substituídas e soma as novas"""
+        delta = ContractAggregates.from_frame(added)
+        delta.subtract(ContractAggregates.from_frame(removed))
+        for name in ("status", "modalidade", "months", "responsavel"):
+            change = getattr(delta, name)
+            if change is None:
+                continue
+            counter = getattr(self, name)
+            if counter is None:
+                counter = Counter()
+                setattr(self, name, counter)
+            counter.update(change)
+            # Remove chaves zeradas para não acumular categorias extintas
+            for key in [key for key in change if counter[key] <= 0]:
+                del counter[key]
+
+    def subtract(self, other: "ContractAggregates") -> None:
+        for name in ("status", "modalidade", "months", "responsavel"):
+            theirs = getattr(other, name)
+            if theirs is None:
+                continue
+            ours = getattr(self, name)
+            if ours is None:
+                ours = Counter()
+                setattr(self, name, ours)
+            ours.subtract(theirs)
+
+    def sections(self) -> Dict[str, dict]:
+        """Seções de /contracts/* no formato das respostas da API"""
+        return {
+            "status": {
+                "data": [
+                    {"name": STATUS_LABELS[status], "value": count}
+                    for status, count in _ranked(self.status)
+                    if status in STATUS_LABELS
+                ]
+            },
+            "modalidade": {
+                "data": [
+                    {"name": str(modalidade), "value": count}
+                    for modalidade, count in _ranked(self.modalidade)
+                ]
+            },
+            "temporal": {
+                "data": [
+                    {"date": pd.Period(ordinal=month, freq="M").strftime("%Y-%m"), "quantidade": count}
+                    for month, count in sorted(self.months.items())
+                    if count > 0
+                ]
+            },
+            "responsavel": {
+                "data": [
+                    {"name": str(resp), "value": count}
+                    for resp, count in _ranked(self.responsavel or Counter(), limit=TOP_RESPONSAVEIS)
+                ]
+            },
+        }
@@ -1,130 +1,471 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Iterator, List, Mapping, Optional, Sequence, Tuple
+import hashlib
+import json
 import logging
 import os
+import sys
+
+from src.core.config import CACHE_ENABLED, CONTRACT_KEY_COLUMN, ROWS_PAGE_SIZE, SHARED_DATASETS
+from src.core.metrics import StageTimings
+from src.utils.columnar_cache import ColumnarCache, file_sha256
+from src.utils.ingestion import read_tabular, downcast_numeric, concat_compact
+from src.utils.row_export import EXPORT_FORMATS, iter_export, page_body, project
+from src.services.contract_aggregates import ContractAggregates, category_counts
+from src.services.contract_query import ContractIndex, ContractQuery
+from src.services.timeseries import TimeSeriesEngine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Esquema das colunas conhecidas dos contratos
+CONTRACT_SCHEMA = {
+    'status': 'category',
+    'modalidade': 'category',
+    'responsavel': 'category',
+    'data_cadastro': 'date',
+    'data_encerramento': 'date',
+}
+
+# Colunas sem as quais um arquivo (ou planilha) não é aceito como contratos
+REQUIRED_COLUMNS = ['status', 'modalidade', 'data_cadastro', 'data_encerramento']
+
 class ContractAnalysisService:
-    def __init__(self):
+    def __init__(self, file_path: Optional[str] = None):
         self.df = None
-        # Carrega o arquivo automaticamente ao inicializar o serviço
-        try:
-            file_path = os.path.join("uploads", "Contratos.xlsx")
+        self.content_hash = None
+        self.snapshot = None
+        self.aggregates = None
+        self.memory_report = None
+        self.load_timings = None
+        self.last_upsert = None
+        self._timeseries = None
+        self._index = None
+        self._keys = None
+        self.cache = ColumnarCache(namespace="contracts") if CACHE_ENABLED else None
+        if file_path:
             self.load_data(file_path)
-            logger.info("Arquivo carregado automaticamente na inicialização do serviço")
-        except Exception as e:
-            logger.error(f"Erro ao carregar arquivo na inicialização: {str(e)}")
 
-    def load_data(self, file_path: str) -> None:
-        """Carrega e prepara os dados dos contratos"""
+    def load_data(self, file_path: str, content_hash: Optional[str] = None) -> None:
+        """Carrega e prepara os dados dos contratos.
+
+        ``content_hash`` pode ser informado quando já foi calculado durante o
+        upload, evitando reler o arquivo.
+        """
+        timings = StageTimings()
         try:
             logger.info(f"Iniciando carregamento do arquivo: {file_path}")
             
-            if not os.path.exists(file_path):
-                logger.error(f"Arquivo não encontrado: {file_path}")
-                raise ValueError(f"Arquivo não encontrado: {file_path}")
-            
-            # Tenta ler o arquivo Excel
-            logger.info("Lendo arquivo Excel...")
-            self.df = pd.read_excel(file_path)
-            logger.info(f"Arquivo carregado com sucesso. Shape: {self.df.shape}")
-            logger.info(f"Colunas encontradas: {self.df.columns.tolist()}")
-            
-            # Verifica se as colunas necessárias existem
-            required_columns = ['status', 'modalidade', 'data_cadastro', 'data_encerramento']
-            missing_columns = [col for col in required_columns if col not in self.df.columns]
-            if missing_columns:
-                logger.error(f"Colunas obrigatórias ausentes: {missing_columns}")
-                raise ValueError(f"Colunas obrigatórias ausentes: {missing_columns}")
-            
-            logger.info("Iniciando conversão de datas...")
-            # Converte datas
-            try:
-                self.df['data_cadastro'] = pd.to_datetime(self.df['data_cadastro'], format='%d/%m/%Y', errors='coerce')
-                self.df['data_encerramento'] = pd.to_datetime(self.df['data_encerramento'], format='%d/%m/%Y', errors='coerce')
-                logger.info("Datas convertidas com sucesso")
-            except Exception as e:
-                logger.error(f"Erro ao converter datas: {str(e)}")
-                raise ValueError("Erro ao converter datas. Verifique o formato (deve ser dd/mm/aaaa)")
-
-            # Verifica valores únicos em colunas importantes
-            logger.info("Verificando valores únicos nas colunas...")
-            logger.info(f"Valores únicos em 'status': {self.df['status'].unique()}")
-            logger.info(f"Valores únicos em 'modalidade': {self.df['modalidade'].unique()}")
-            logger.info("Carregamento dos dados concluído com sucesso")
+            if content_hash is None:
+                self._check_exists(file_path)
+                with timings.stage("hash"):
+                    content_hash = file_sha256(file_path)
+            with timings.stage("cache_read"):
+                df = self.cache.load(content_hash) if self.cache else None
+            if df is not None:
+                logger.info(f"Dados carregados do cache colunar. Shape: {df.shape}")
+            else:
+                self._check_exists(file_path)
+                df, self.memory_report = self._read_and_normalize(file_path, timings)
+                if self.cache:
+                    with timings.stage("cache_write"):
+                        df = self._store(content_hash, df, source_path=file_path)
+
+            with timings.stage("aggregates"):
+                self.set_data(df, content_hash)
+            self.load_timings = timings.record("load.")
+            logger.info(
+                "Carregamento dos dados concluído com sucesso ("
+                + ", ".join(f"{name}: {seconds:.3f}s" for name, seconds in self.load_timings.items())
+                + ")"
+            )
 
         except Exception as e:
             logger.error(f"Erro ao carregar dados: {str(e)}")
             raise ValueError(f"Erro ao carregar dados: {str(e)}")
 
-    def get_status_analysis(self) -> dict:
-        """Análise de status dos contratos"""
+    def load_frame(self, df: pd.DataFrame, content_hash: str) -> None:
+        """Carrega um DataFrame já lido (ex.: partes de um upload em lote).
+
+        Aplica a mesma validação, esquema e cache colunar de ``load_data``.
+        """
+        timings = StageTimings()
+        try:
+            with timings.stage("cache_read"):
+                cached = self.cache.load(content_hash) if self.cache else None
+            if cached is not None:
+                df = cached
+            else:
+                df, self.memory_report = self._validate_and_normalize(df, timings)
+                if self.cache:
+                    with timings.stage("cache_write"):
+                        df = self._store(content_hash, df)
+            with timings.stage("aggregates"):
+                self.set_data(df, content_hash)
+            self.load_timings = timings.record("load.")
+        except Exception as e:
+            logger.error(f"Erro ao carregar dados: {str(e)}")
+            raise ValueError(f"Erro ao carregar dados: {str(e)}")
+
+    def _store(
+        self, content_hash: str, df: pd.DataFrame, source_path: Optional[str] = None, parent: Optional[str] = None
+    ) -> pd.DataFrame:
+        """Grava no cache colunar; com datasets compartilhados, passa a usar a cópia mapeada.
+
+        A cópia mapeada é a mesma que os outros workers leem, então as colunas
+        numéricas e de datas ocupam memória uma única vez em vez de uma por
+        processo (ver ``read_frame``).
+        """
+        path = self.cache.store(content_hash, df, source_path=source_path, parent=parent)
+        if path is None or not SHARED_DATASETS:
+            return df
+        mapped = self.cache.load(content_hash)
+        return mapped if mapped is not None else df
+
+    @staticmethod
+    def _check_exists(file_path: str) -> None:
+        if not os.path.exists(file_path):
+            logger.error(f"Arquivo não encontrado: {file_path}")
+            raise ValueError(f"Arquivo não encontrado: {file_path}")
+
+    def set_data(self, df: pd.DataFrame, content_hash: str, aggregates: Optional[ContractAggregates] = None) -> None:
+        """Define um DataFrame já normalizado e o snapshot de agregados.
+
+        Sem ``aggregates`` os contadores são recalculados a partir de ``df``.
+        """
+        self.df = df
+        self.content_hash = content_hash
+        self.aggregates = aggregates or ContractAggregates.from_frame(df)
+        self._timeseries = None
+        self._index = None
+        self._keys = None
+        self.snapshot = ContractSnapshot.build(self.aggregates)
+        logger.info(f"Snapshot de agregados gerado (versão {self.snapshot.version})")
+
+    @property
+    def timeseries(self) -> Optional[TimeSeriesEngine]:
+        """Índice temporal ordenado, montado na primeira consulta após cada carga"""
+        if self._timeseries is None and self.df is not None:
+            self._timeseries = TimeSeriesEngine(self.df['data_cadastro'], self.df['data_encerramento'])
+        return self._timeseries
+
+    @property
+    def index(self) -> Optional[ContractIndex]:
+        """Índices para consultas filtradas, montados na primeira consulta após cada carga"""
+        if self._index is None and self.df is not None:
+            self._index = ContractIndex(self.df)
+        return self._index
+
+    def query(self, **filters) -> dict:
+        """Contagem (e soma opcional) dos contratos filtrados, agrupada por uma dimensão"""
         if self.df is None:
             raise ValueError("Dados não carregados")
+        return self.index.query(ContractQuery.build(**filters))
 
-        status_counts = self.df['status'].map({'A': 'Ativo', 'E': 'Encerrado'}).value_counts()
-        
-        return {
-            "data": [
-                {"name": status, "value": int(count)}
-                for status, count in status_counts.items()
-            ]
+    def rows_page(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        after: Optional[str] = None,
+        limit: int = ROWS_PAGE_SIZE,
+        **filters,
+    ) -> bytes:
+        """Página de linhas filtradas na ordem da chave, já serializada em JSON.
+
+        ``next_after`` é o cursor da página seguinte (None na última).
+        """
+        if self.df is None:
+            raise ValueError("Dados não carregados")
+        columns = project(self.df, columns)
+        index = self.index
+        rows, total = index.keyset(ContractQuery.build(**filters), after, limit + 1)
+        next_after = index.keys.value(rows[limit - 1]) if len(rows) > limit else None
+        rows = rows[:limit]
+        meta = {
+            "key": index.keys.name,
+            "columns": columns,
+            "total": total,
+            "count": len(rows),
+            "next_after": next_after,
         }
+        return page_body(self.df, rows, columns, meta)
 
-    def get_modalidade_analysis(self) -> dict:
-        """Análise de modalidades de contrato"""
+    def export_rows(
+        self,
+        fmt: str,
+        columns: Optional[Sequence[str]] = None,
+        after: Optional[str] = None,
+        **filters,
+    ) -> Iterator[bytes]:
+        """Todas as linhas filtradas (a partir de ``after``), serializadas em blocos"""
         if self.df is None:
             raise ValueError("Dados não carregados")
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportação inválido: {fmt}. Use um de {list(EXPORT_FORMATS)}")
+        columns = project(self.df, columns)
+        rows, total = self.index.keyset(ContractQuery.build(**filters), after)
+        logger.info(f"Exportando {len(rows)} linhas ({fmt}, {len(columns)} colunas)")
+        return iter_export(self.df, rows, columns, fmt)
 
-        modalidade_counts = self.df['modalidade'].value_counts()
-        
-        return {
-            "data": [
-                {"name": str(modalidade), "value": int(count)}
-                for modalidade, count in modalidade_counts.items()
-            ]
-        }
+    def upsert(self, file_path: str, delta_hash: str, key: str = CONTRACT_KEY_COLUMN) -> "ContractAnalysisService":
+        """Aplica um arquivo delta sobre os dados atuais, identificando contratos por ``key``.
 
-    def get_temporal_analysis(self) -> dict:
-        """Análise temporal dos contratos"""
+        Contratos já existentes são substituídos e os novos acrescentados. Os
+        dados atuais não são alterados (podem estar em uso por outras
+        requisições): o resultado é um novo serviço cujos agregados são
+        ajustados apenas pelas linhas alteradas.
+        """
         if self.df is None:
             raise ValueError("Dados não carregados")
+        if key not in self.df.columns:
+            raise ValueError(f"Coluna de identificação ausente nos dados atuais: {key}")
+
+        delta, _ = self._read_and_normalize(file_path)
+        if key not in delta.columns:
+            raise ValueError(f"Coluna de identificação ausente no arquivo delta: {key}")
+        extra = [col for col in delta.columns if col not in self.df.columns]
+        if extra:
+            logger.warning(f"Colunas ignoradas no arquivo delta: {extra}")
+        delta = delta.drop_duplicates(subset=key, keep="last").reindex(columns=self.df.columns)
 
-        temporal_data = (
-            self.df.groupby(self.df['data_cadastro'].dt.to_period('M'))
-            .size()
-            .reset_index()
+        positions = self._key_index(key).get_indexer(delta[key])
+        matched = positions >= 0
+        replaced = self.df.iloc[positions[matched]]
+        updates = delta[matched]
+        inserts = delta[~matched]
+
+        aggregates = self.aggregates.copy()
+        aggregates.apply(replaced, delta)
+
+        df = self.df.copy()
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                new = pd.Index(delta[col].dropna().unique()).difference(df[col].cat.categories)
+                if len(new):
+                    df[col] = df[col].cat.add_categories(new)
+        rows = positions[matched]
+        if len(rows):
+            for loc, col in enumerate(df.columns):
+                values = updates[col]
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    values = values.astype(object)
+                else:
+                    # Colunas reduzidas na carga (ex.: int8) são ampliadas antes de receber o delta
+                    target = _common_dtype(df[col].dtype, values.dtype)
+                    if target != df[col].dtype:
+                        df[col] = df[col].astype(target)
+                df.iloc[rows, loc] = values.to_numpy()
+        if len(inserts):
+            df = concat_compact([df, inserts.reset_index(drop=True)])
+
+        content_hash = hashlib.sha256(f"{self.content_hash}:{delta_hash}".encode()).hexdigest()
+        merged = ContractAnalysisService()
+        if merged.cache:
+            # A versão anterior fica na linhagem, para ser substituída quando esta for adotada
+            df = merged._store(content_hash, df, parent=self.content_hash)
+        merged.set_data(df, content_hash, aggregates)
+        merged.last_upsert = {"updated": int(matched.sum()), "inserted": int((~matched).sum())}
+        logger.info(
+            f"Delta aplicado: {merged.last_upsert['updated']} contratos atualizados, "
+            f"{merged.last_upsert['inserted']} inseridos"
         )
-        temporal_data.columns = ['data', 'quantidade']
+        return merged
+
+    def _key_index(self, key: str) -> pd.Index:
+        """Índice da coluna de identificação (montado uma vez por versão dos dados)"""
+        if self._keys is None or self._keys.name != key:
+            keys = pd.Index(self.df[key], name=key)
+            if not keys.is_unique:
+                raise ValueError(f"A coluna {key} possui valores repetidos nos dados atuais")
+            self._keys = keys
+        return self._keys
+
+    def _read_and_normalize(self, file_path: str, timings: Optional[StageTimings] = None) -> Tuple[pd.DataFrame, dict]:
+        """Lê o arquivo, valida as colunas e aplica o esquema (com relatório de memória)"""
+        timings = timings or StageTimings()
+        logger.info("Lendo arquivo...")
+        with timings.stage("read"):
+            df = read_tabular(file_path)
+        logger.info(f"Arquivo carregado com sucesso. Shape: {df.shape}")
+        return self._validate_and_normalize(df, timings)
+
+    def _validate_and_normalize(self, df: pd.DataFrame, timings: StageTimings) -> Tuple[pd.DataFrame, dict]:
+        logger.info(f"Colunas encontradas: {df.columns.tolist()}")
         
-        return {
-            "data": [
-                {
-                    "date": data.strftime("%Y-%m"),
-                    "quantidade": int(quantidade)
-                }
-                for data, quantidade in zip(temporal_data['data'], temporal_data['quantidade'])
-            ]
-        }
+        # Verifica se as colunas necessárias existem
+        with timings.stage("validate"):
+            missing_columns = missing_contract_columns(df.columns)
+        if missing_columns:
+            logger.error(f"Colunas obrigatórias ausentes: {missing_columns}")
+            raise ValueError(f"Colunas obrigatórias ausentes: {missing_columns}")
+        
+        logger.info("Normalizando colunas...")
+        df, report = normalize_contracts(df, timings)
+        logger.info(
+            f"Memória do DataFrame: {report['before']} -> {report['after']} bytes "
+            f"({report['before'] / max(report['after'], 1):.1f}x menor)"
+        )
+        logger.debug(f"Categorias de 'status': {df['status'].cat.categories.tolist()}")
+        logger.debug(f"Categorias de 'modalidade': {df['modalidade'].cat.categories.tolist()}")
+        return df, report
+
+    def get_snapshot(self) -> "ContractSnapshot":
+        """Retorna o snapshot de agregados da última carga de dados"""
+        if self.df is None or self.snapshot is None:
+            raise ValueError("Dados não carregados")
+        return self.snapshot
+
+    def get_status_analysis(self) -> dict:
+        """Análise de status dos contratos"""
+        return self.get_snapshot().section("status")
+
+    def get_modalidade_analysis(self) -> dict:
+        """Análise de modalidades de contrato"""
+        return self.get_snapshot().section("modalidade")
+
+    def get_temporal_analysis(self) -> dict:
+        """Análise temporal dos contratos"""
+        return self.get_snapshot().section("temporal")
 
     def get_responsavel_analysis(self) -> dict:
         """Análise de responsáveis por contratos"""
-        if self.df is None:
+        return self.get_snapshot().section("responsavel")
+
+    def get_temporal_series(
+        self,
+        freq: str = "month",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        window: Optional[int] = None,
+        cumulative: bool = True,
+    ) -> dict:
+        """Série temporal configurável: frequência, intervalo, média móvel e contratos ativos"""
+        if self.timeseries is None:
             raise ValueError("Dados não carregados")
+        return {
+            "frequency": freq,
+            "data": self.timeseries.series(freq, start, end, window=window, cumulative=cumulative),
+        }
+
 
-        resp_counts = (
-            self.df.groupby('responsavel')
-            .size()
-            .sort_values(ascending=False)
-            .head(10)
+@dataclass(frozen=True)
+class ContractSnapshot:
+    """Agregados imutáveis dos contratos, calculados uma vez por carga de dados.
+
+    Os quatro endpoints de /contracts/* são servidos a partir deste objeto.
+    Cada seção já fica serializada em JSON e ``version`` (derivado do próprio
+    conteúdo) é usado como ETag.
+    """
+    version: str
+    sections: Mapping[str, dict]
+    bodies: Mapping[str, bytes]
+
+    SECTIONS = ("status", "modalidade", "temporal", "responsavel")
+
+    @classmethod
+    def build(cls, aggregates: ContractAggregates) -> "ContractSnapshot":
+        sections = aggregates.sections()
+        bodies = {
+            name: json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            for name, data in sections.items()
+        }
+        digest = hashlib.sha256()
+        for name in cls.SECTIONS:
+            digest.update(bodies[name])
+        return cls(
+            version=digest.hexdigest()[:16],
+            sections=MappingProxyType(sections),
+            bodies=MappingProxyType(bodies),
         )
-        
-        return {
-            "data": [
-                {"name": str(resp), "value": int(count)}
-                for resp, count in resp_counts.items()
-            ]
-        } 
\ No newline at end of file
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+    def section(self, name: str) -> dict:
+        """Dados da seção (compartilhados entre requisições, não modificar)"""
+        return self.sections[name]
+
+    def body(self, name: str) -> bytes:
+        """JSON já serializado da seção"""
+        return self.bodies[name]
+
+
+def missing_contract_columns(columns) -> List[str]:
+    return [col for col in REQUIRED_COLUMNS if col not in columns]
+
+
+def normalize_contracts(df: pd.DataFrame, timings: Optional[StageTimings] = None) -> Tuple[pd.DataFrame, dict]:
+    """Aplica o esquema de contratos: categorias, datas e números compactos.
+
+    Retorna o DataFrame normalizado e um relatório de memória por coluna,
+    comparando com o layout ingênuo (textos como objetos Python, inteiros e
+    decimais com 64 bits).
+    """
+    timings = timings or StageTimings()
+    before = pd.Series({col: _plain_nbytes(df[col]) for col in df.columns}, dtype=np.int64)
+    for col, kind in CONTRACT_SCHEMA.items():
+        if col not in df.columns:
+            continue
+        if kind == "date":
+            with timings.stage("parse_dates"):
+                df[col] = _parse_dates(df[col])
+        elif kind == "category" and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            with timings.stage("categorize"):
+                df[col] = df[col].astype("category")
+    with timings.stage("downcast"):
+        for col in df.columns:
+            if col not in CONTRACT_SCHEMA:
+                df[col] = downcast_numeric(df[col])
+
+    after = df.memory_usage(deep=True, index=False)
+    report = {
+        "before": int(before.sum()),
+        "after": int(after.sum()),
+        "columns": {
+            str(col): {"before": int(before[col]), "after": int(after[col]), "dtype": str(df[col].dtype)}
+            for col in df.columns
+        },
+    }
+    return df, report
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    """Converte datas dd/mm/aaaa; colunas categóricas convertem cada valor distinto uma vez"""
+    try:
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categories = pd.to_datetime(values.cat.categories, format='%d/%m/%Y', errors='coerce')
+            codes = values.cat.codes.to_numpy()
+            parsed = categories.to_numpy(dtype="datetime64[ns]")[codes]
+            parsed[codes < 0] = np.datetime64("NaT")
+            return pd.Series(parsed, index=values.index, name=values.name)
+        return pd.to_datetime(values, format='%d/%m/%Y', errors='coerce')
+    except Exception as e:
+        logger.error(f"Erro ao converter datas: {str(e)}")
+        raise ValueError("Erro ao converter datas. Verifique o formato (deve ser dd/mm/aaaa)")
+
+
+def _plain_nbytes(series: pd.Series) -> int:
+    """Bytes que a coluna ocuparia como objetos Python / números de 64 bits"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Estimativa sem materializar: ponteiro por linha + objeto de cada valor
+        categories, counts = category_counts(series)
+        sizes = np.array([sys.getsizeof(cat) for cat in categories], dtype=np.int64)
+        return int(8 * len(series) + counts @ sizes)
+    if series.dtype == object:
+        return int(series.memory_usage(deep=True, index=False))
+    return 8 * len(series)
+
+
+def _common_dtype(current, incoming):
+    """Menor dtype NumPy que comporta os valores atuais e os do delta"""
+    if not isinstance(current, np.dtype) or not isinstance(incoming, np.dtype):
+        return current
+    try:
+        return np.result_type(current, incoming)
+    except TypeError:
+        # Ex.: datas recebendo NaN de uma coluna ausente no delta (vira NaT)
+        return current
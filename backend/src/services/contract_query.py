@@ -0,0 +1,391 @@
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.core.config import CONTRACT_KEY_COLUMN, QUERY_CACHE_SIZE
+from src.services.contract_aggregates import STATUS_LABELS
+
+# Dimensões categóricas filtráveis e agrupáveis
+CATEGORY_COLUMNS = ("status", "modalidade", "responsavel")
+
+# Agrupamentos por período da data de cadastro
+PERIOD_GROUPS = {"month": ("M", "%Y-%m"), "quarter": ("Q", "%YQ%q"), "year": ("Y", "%Y")}
+
+DATE_COLUMNS = {"cadastro": "data_cadastro", "encerramento": "data_encerramento"}
+
+
+@dataclass(frozen=True)
+class ContractQuery:
+    """Consulta normalizada: valores ordenados e sem repetição, para servir de chave de cache"""
+    status: Tuple[str, ...] = ()
+    modalidade: Tuple[str, ...] = ()
+    responsavel: Tuple[str, ...] = ()
+    start: Optional[pd.Timestamp] = None
+    end: Optional[pd.Timestamp] = None
+    date_field: str = "cadastro"
+    group_by: Optional[str] = None
+    sum: Optional[str] = None
+
+    @classmethod
+    def build(
+        cls,
+        status: Optional[Sequence[str]] = None,
+        modalidade: Optional[Sequence[str]] = None,
+        responsavel: Optional[Sequence[str]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        date_field: str = "cadastro",
+        group_by: Optional[str] = None,
+        sum: Optional[str] = None,
+    ) -> "ContractQuery":
+        if date_field not in DATE_COLUMNS:
+            raise ValueError(f"Campo de data inválido: {date_field}. Use um de {list(DATE_COLUMNS)}")
+        if group_by is not None and group_by not in CATEGORY_COLUMNS and group_by not in PERIOD_GROUPS:
+            raise ValueError(
+                f"Agrupamento inválido: {group_by}. Use um de {list(CATEGORY_COLUMNS) + list(PERIOD_GROUPS)}"
+            )
+        # Aceita tanto os códigos (A/E) quanto os rótulos (Ativo/Encerrado)
+        labels = {label.lower(): code for code, label in STATUS_LABELS.items()}
+        status = [labels.get(value.lower(), value) for value in status or ()]
+
+        start_ts = pd.Timestamp(start) if start else None
+        end_ts = pd.Timestamp(end) if end else None
+        # Data sem horário: o dia final entra inteiro
+        if end_ts is not None and end_ts == end_ts.normalize():
+            end_ts = end_ts + pd.Timedelta(days=1)
+        if start_ts is not None and end_ts is not None and end_ts <= start_ts:
+            raise ValueError("Data final anterior à data inicial")
+
+        return cls(
+            status=tuple(sorted(set(status))),
+            modalidade=tuple(sorted(set(modalidade or ()))),
+            responsavel=tuple(sorted(set(responsavel or ()))),
+            start=start_ts,
+            end=end_ts,
+            date_field=date_field,
+            group_by=group_by,
+            sum=sum,
+        )
+
+
+class _CategoryIndex:
+    """Listas de linhas por categoria (índice invertido sobre os códigos)"""
+
+    def __init__(self, series: pd.Series):
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype("category")
+        self.categories = series.cat.categories
+        self.codes = series.cat.codes.to_numpy()
+        # Linhas ordenadas por código; offsets[c]:offsets[c + 1] são as linhas da categoria c
+        self.rows = np.argsort(self.codes, kind="stable")
+        counts = np.bincount(self.codes[self.codes >= 0], minlength=len(self.categories))
+        missing = int((self.codes < 0).sum())
+        self.offsets = np.concatenate(([missing], missing + np.cumsum(counts)))
+
+    def lookup(self, values: Sequence[str]) -> np.ndarray:
+        """Códigos dos valores pedidos (valores desconhecidos são ignorados)"""
+        codes = self.categories.get_indexer(list(values))
+        return codes[codes >= 0]
+
+    def size(self, codes: np.ndarray) -> int:
+        return int(sum(self.offsets[c + 1] - self.offsets[c] for c in codes))
+
+    def postings(self, codes: np.ndarray) -> np.ndarray:
+        # A ordem das linhas não importa para contagens e somas: sem reordenar
+        parts = [self.rows[self.offsets[c]:self.offsets[c + 1]] for c in codes]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.intp)
+
+
+class _DateIndex:
+    """Datas ordenadas uma vez; intervalos viram duas buscas binárias"""
+
+    def __init__(self, series: pd.Series):
+        values = series.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        valid = values != np.iinfo(np.int64).min
+        self.values = values
+        self.rows = np.flatnonzero(valid)[np.argsort(values[valid], kind="stable")]
+        self.sorted = values[self.rows]
+
+    def bounds(self, start: Optional[pd.Timestamp], end: Optional[pd.Timestamp]) -> Tuple[int, int]:
+        lo = np.searchsorted(self.sorted, start.value, side="left") if start is not None else 0
+        hi = np.searchsorted(self.sorted, end.value, side="left") if end is not None else len(self.sorted)
+        return int(lo), int(hi)
+
+    def postings(self, start, end) -> np.ndarray:
+        lo, hi = self.bounds(start, end)
+        return self.rows[lo:hi]
+
+    def contains(self, rows: np.ndarray, start, end) -> np.ndarray:
+        values = self.values[rows]
+        mask = values != np.iinfo(np.int64).min
+        if start is not None:
+            mask &= values >= start.value
+        if end is not None:
+            mask &= values < end.value
+        return mask
+
+
+class _KeyOrder:
+    """Ordem das linhas pela chave do contrato, base da paginação por chave (keyset).
+
+    Sem a coluna de chave (ou com valores nulos/repetidos) a posição da linha
+    faz o papel de chave.
+    """
+
+    def __init__(self, df: pd.DataFrame, key: Optional[str]):
+        self.name = None
+        self.order = None  # None: ordem das próprias linhas
+        self.rank = None
+        self.sorted = np.arange(len(df))
+        if key and key in df.columns:
+            keys = df[key]
+            if not keys.isna().any() and keys.is_unique:
+                values = keys.to_numpy()
+                self.name = key
+                self.order = np.argsort(values, kind="stable")
+                self.sorted = values[self.order]
+                self.rank = np.empty(len(values), dtype=np.intp)
+                self.rank[self.order] = np.arange(len(values))
+
+    def start_after(self, after: Optional[str]) -> int:
+        """Posição na ordem logo depois do cursor ``after``.
+
+        O cursor é lido em largura total (int64, float64 ou data) e comparado
+        com a menor e a maior chave antes da busca: converter direto para o
+        dtype compactado da coluna (ex.: int8) daria a volta nos valores fora
+        da faixa e devolveria a página errada.
+        """
+        if after is None:
+            return 0
+        sorted_keys = self.sorted
+        if sorted_keys.dtype == object:
+            return int(np.searchsorted(sorted_keys, after, side="right"))
+        value = self._parse(after)
+        if len(sorted_keys) == 0:
+            return 0
+        # Extremos como escalares do Python (ou Timestamp): a comparação não passa pelo dtype compactado
+        if sorted_keys.dtype.kind == "M":
+            low, high = pd.Timestamp(sorted_keys[0]), pd.Timestamp(sorted_keys[-1])
+        else:
+            low, high = sorted_keys[0].item(), sorted_keys[-1].item()
+        if value < low:
+            return 0
+        if value >= high:
+            return len(sorted_keys)
+        # Dentro da faixa das chaves o valor cabe no dtype da coluna
+        if sorted_keys.dtype.kind == "f":
+            cast = sorted_keys.dtype.type(value)
+            # Arredondado para cima: as chaves iguais a ``cast`` ficam depois do cursor
+            return int(np.searchsorted(sorted_keys, cast, side="left" if float(cast) > value else "right"))
+        if sorted_keys.dtype.kind == "M":
+            value = value.to_datetime64()
+        return int(np.searchsorted(sorted_keys, np.asarray(value).astype(sorted_keys.dtype), side="right"))
+
+    def _parse(self, after: str):
+        """Cursor em largura total no tipo da chave"""
+        kind = self.sorted.dtype.kind
+        try:
+            value = None
+            if kind == "M":
+                value = pd.Timestamp(after)
+                if value is pd.NaT:
+                    value = None
+                elif value.tzinfo is not None:
+                    value = value.tz_convert(None)
+            elif kind == "f":
+                value = float(after)
+            elif kind in "iu":
+                try:
+                    value = int(after)
+                except ValueError:
+                    # Cursor fracionário sobre chave inteira: as chaves <= cursor são as <= piso
+                    value = math.floor(float(after))
+        except (TypeError, ValueError, OverflowError):
+            value = None
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            raise ValueError(f"Cursor inválido para a chave {self.name or 'posição'}: {after}")
+        return value
+
+    def ranks(self, rows: np.ndarray) -> np.ndarray:
+        return rows if self.rank is None else self.rank[rows]
+
+    def rows(self, ranks) -> np.ndarray:
+        return np.asarray(ranks) if self.order is None else self.order[ranks]
+
+    def value(self, row: int):
+        """Valor da chave da linha, usado como cursor da próxima página"""
+        value = self.sorted[row if self.rank is None else self.rank[row]]
+        return value.item() if hasattr(value, "item") else value
+
+
+class ContractIndex:
+    """Índices por coluna de um dataset de contratos, para consultas filtradas.
+
+    O filtro mais seletivo gera a lista de linhas candidatas (lista invertida
+    de uma categoria ou fatia do array de datas ordenado) e os demais são
+    verificados apenas sobre essas linhas, sem máscara sobre a tabela inteira.
+    Os resultados ficam em cache pela consulta normalizada; como o índice
+    pertence a uma versão dos dados, o cache é descartado junto com ela.
+    """
+
+    def __init__(self, df: pd.DataFrame, cache_size: int = QUERY_CACHE_SIZE, key: Optional[str] = CONTRACT_KEY_COLUMN):
+        self.df = df
+        self.key = key
+        self.categories: Dict[str, _CategoryIndex] = {
+            col: _CategoryIndex(df[col]) for col in CATEGORY_COLUMNS if col in df.columns
+        }
+        self._dates: Dict[str, _DateIndex] = {}
+        self._periods: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._keys: Optional[_KeyOrder] = None
+        self._cache: "OrderedDict[ContractQuery, dict]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def _date_index(self, field: str) -> _DateIndex:
+        with self._lock:
+            index = self._dates.get(field)
+            if index is None:
+                index = _DateIndex(self.df[DATE_COLUMNS[field]])
+                self._dates[field] = index
+            return index
+
+    def _period_codes(self, group: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Código do período de cada linha (-1 sem data) e os períodos distintos"""
+        with self._lock:
+            cached = self._periods.get(group)
+            if cached is None:
+                periods = pd.PeriodIndex(self.df["data_cadastro"], freq=PERIOD_GROUPS[group][0])
+                codes, uniques = pd.factorize(periods, sort=True)
+                cached = (codes, np.asarray(uniques.strftime(PERIOD_GROUPS[group][1])))
+                self._periods[group] = cached
+            return cached
+
+    @property
+    def keys(self) -> _KeyOrder:
+        with self._lock:
+            if self._keys is None:
+                self._keys = _KeyOrder(self.df, self.key)
+            return self._keys
+
+    def keyset(self, query: ContractQuery, after: Optional[str] = None, limit: Optional[int] = None) -> Tuple[np.ndarray, int]:
+        """Linhas filtradas na ordem da chave, a partir do cursor ``after``.
+
+        Retorna as posições (no máximo ``limit``) e o total de linhas que
+        atendem aos filtros. Sem filtros a página é uma fatia da ordem; com
+        filtros só as ``limit`` menores posições são ordenadas.
+        """
+        keys = self.keys
+        start = keys.start_after(after)
+        rows = self.rows(query)
+        if rows is None:
+            stop = len(self.df) if limit is None else min(start + limit, len(self.df))
+            return keys.rows(np.arange(start, stop) if keys.order is None else slice(start, stop)), len(self.df)
+
+        total = len(rows)
+        ranks = keys.ranks(rows)
+        ranks = ranks[ranks >= start]
+        if limit is not None and len(ranks) > limit:
+            ranks = np.partition(ranks, limit - 1)[:limit]
+        ranks = np.sort(ranks)
+        return keys.rows(ranks), total
+
+    def rows(self, query: ContractQuery) -> Optional[np.ndarray]:
+        """Linhas que atendem aos filtros (None quando não há filtro algum)"""
+        filters = []  # (tamanho estimado, gerar candidatos, verificar candidatos)
+        for col in CATEGORY_COLUMNS:
+            values = getattr(query, col)
+            if not values:
+                continue
+            if col not in self.categories:
+                raise ValueError(f"Coluna não disponível para filtro: {col}")
+            index = self.categories[col]
+            codes = index.lookup(values)
+            filters.append((
+                index.size(codes),
+                lambda index=index, codes=codes: index.postings(codes),
+                lambda rows, index=index, codes=codes: np.isin(index.codes[rows], codes),
+            ))
+        if query.start is not None or query.end is not None:
+            dates = self._date_index(query.date_field)
+            lo, hi = dates.bounds(query.start, query.end)
+            filters.append((
+                hi - lo,
+                lambda: dates.postings(query.start, query.end),
+                lambda rows: dates.contains(rows, query.start, query.end),
+            ))
+        if not filters:
+            return None
+
+        filters.sort(key=lambda item: item[0])
+        rows = filters[0][1]()
+        for _, _, check in filters[1:]:
+            if len(rows) == 0:
+                break
+            rows = rows[check(rows)]
+        return rows
+
+    def query(self, query: ContractQuery) -> dict:
+        with self._lock:
+            cached = self._cache.get(query)
+            if cached is not None:
+                self._cache.move_to_end(query)
+                return cached
+
+        result = self._execute(query)
+        with self._lock:
+            self._cache[query] = result
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _execute(self, query: ContractQuery) -> dict:
+        rows = self.rows(query)
+        total = len(self.df) if rows is None else len(rows)
+        result = {"total": total, "group_by": query.group_by}
+
+        weights = None
+        if query.sum is not None:
+            if query.sum not in self.df.columns or not pd.api.types.is_numeric_dtype(self.df[query.sum]):
+                raise ValueError(f"Coluna numérica não encontrada: {query.sum}")
+            values = self.df[query.sum].to_numpy(dtype=np.float64, na_value=np.nan)
+            weights = np.nan_to_num(values if rows is None else values[rows])
+            result["soma"] = float(weights.sum())
+
+        if query.group_by is None:
+            return result
+
+        if query.group_by in PERIOD_GROUPS:
+            all_codes, labels = self._period_codes(query.group_by)
+        else:
+            if query.group_by not in self.categories:
+                raise ValueError(f"Coluna não disponível para agrupamento: {query.group_by}")
+            index = self.categories[query.group_by]
+            all_codes, labels = index.codes, index.categories
+        codes = all_codes if rows is None else all_codes[rows]
+        valid = codes >= 0
+        counts = np.bincount(codes[valid], minlength=len(labels))
+        sums = None
+        if weights is not None:
+            sums = np.bincount(codes[valid], weights=weights[valid], minlength=len(labels))
+
+        if query.group_by in PERIOD_GROUPS:
+            order = np.flatnonzero(counts)
+        else:
+            order = np.argsort(-counts, kind="stable")
+            order = order[counts[order] > 0]
+        data: List[dict] = []
+        for code in order:
+            name = labels[code]
+            if query.group_by == "status":
+                name = STATUS_LABELS.get(name, name)
+            item = {"name": str(name), "value": int(counts[code])}
+            if sums is not None:
+                item["soma"] = float(sums[code])
+            data.append(item)
+        result["data"] = data
+        return result
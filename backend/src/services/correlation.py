@@ -0,0 +1,146 @@
+import math
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.core.config import CORRELATION_CHUNK_ROWS, CORRELATION_DICT_MAX, CORRELATION_MAX_PAIRS
+
+# Formatos da matriz na resposta: dict aninhado (legado), triângulo condensado ou nenhum
+CORRELATION_LAYOUTS = ("auto", "dict", "compact", "none")
+CORRELATION_ORDERS = ("original", "cluster")
+
+
+def correlation_matrix(df: pd.DataFrame, columns: Sequence[str], chunk_rows: int = CORRELATION_CHUNK_ROWS) -> np.ndarray:
+    """Correlação de Pearson com deleção par a par, igual a ``DataFrame.corr()``.
+
+    As colunas são padronizadas (média 0, desvio 1) em float64 e só então
+    convertidas para float32, bloco a bloco (``chunk_rows`` linhas): colunas
+    com grande deslocamento (ex.: datas em segundos) não perdem precisão na
+    subtração da média. Cada bloco vira produtos de matrizes (BLAS) com valores
+    bem condicionados; as somas parciais acumulam em float64. Blocos sem
+    valores ausentes precisam de um único produto.
+    """
+    size = len(columns)
+    frame = df[list(columns)]
+    mean = frame.mean().to_numpy(dtype=np.float64)
+    std = frame.std().to_numpy(dtype=np.float64)
+    # Colunas constantes (ou vazias) não têm correlação definida
+    scale = np.where((std > 0) & np.isfinite(std), std, np.nan)
+
+    pair_n = np.zeros((size, size))
+    pair_sum = np.zeros((size, size))
+    pair_sumsq = np.zeros((size, size))
+    pair_prod = np.zeros((size, size))
+    for start in range(0, len(frame), chunk_rows):
+        block = frame.iloc[start:start + chunk_rows].to_numpy(dtype=np.float64, na_value=np.nan)
+        z = ((block - mean) / scale).astype(np.float32)
+        mask = ~np.isnan(z)
+        if mask.all():
+            pair_n += len(z)
+            pair_sum += z.sum(axis=0, dtype=np.float64)[:, None]
+            pair_sumsq += np.einsum("ij,ij->j", z, z, dtype=np.float64)[:, None]
+            pair_prod += z.T @ z
+            continue
+        z[~mask] = 0.0
+        present = mask.astype(np.float32)
+        pair_n += present.T @ present
+        pair_sum += z.T @ present
+        pair_sumsq += (z * z).T @ present
+        pair_prod += z.T @ z
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = pair_prod - pair_sum * pair_sum.T / pair_n
+        var = pair_sumsq - pair_sum ** 2 / pair_n
+        corr = cov / np.sqrt(var * var.T)
+    corr = np.where(pair_n > 1, np.clip(corr, -1.0, 1.0), np.nan)
+    defined = ~np.isnan(np.diag(corr))
+    corr[np.diag_indices(size)] = np.where(defined, 1.0, np.nan)
+    return corr
+
+
+def cluster_order(matrix: np.ndarray) -> np.ndarray:
+    """Ordem das colunas pelo agrupamento hierárquico (ligação média) sobre 1 - |r|"""
+    if len(matrix) < 3:
+        return np.arange(len(matrix))
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+
+    distance = 1.0 - np.abs(np.nan_to_num(matrix, nan=0.0))
+    np.fill_diagonal(distance, 0.0)
+    distance = np.clip((distance + distance.T) / 2, 0.0, 1.0)
+    return leaves_list(linkage(squareform(distance, checks=False), method="average"))
+
+
+def strongest_pairs(
+    matrix: np.ndarray,
+    columns: Sequence[str],
+    top_k: Optional[int] = None,
+    threshold: Optional[float] = None,
+    max_pairs: int = CORRELATION_MAX_PAIRS,
+) -> Dict[str, object]:
+    """Pares de colunas com maior |r|, limitados a ``top_k`` e/ou a |r| >= ``threshold``"""
+    rows, cols = np.triu_indices(len(columns), k=1)
+    values = matrix[rows, cols]
+    strength = np.abs(values)
+    selected = ~np.isnan(values)
+    if threshold is not None:
+        selected &= strength >= threshold
+    candidates = np.flatnonzero(selected)
+
+    limit = min(top_k, max_pairs) if top_k else max_pairs
+    truncated = len(candidates) > limit
+    if truncated:
+        candidates = candidates[np.argpartition(-strength[candidates], limit - 1)[:limit]]
+    candidates = candidates[np.argsort(-strength[candidates], kind="stable")]
+    return {
+        "pairs": [
+            {"a": columns[rows[k]], "b": columns[cols[k]], "r": float(values[k])}
+            for k in candidates
+        ],
+        "truncated": bool(truncated and not top_k),
+    }
+
+
+def _rounded(values: np.ndarray, precision: int) -> List[Optional[float]]:
+    return [None if math.isnan(value) else value for value in np.round(values, precision).tolist()]
+
+
+def correlation_payload(
+    matrix: np.ndarray,
+    columns: List[str],
+    layout: str = "auto",
+    order: str = "original",
+    top_k: Optional[int] = None,
+    threshold: Optional[float] = None,
+    precision: int = 4,
+) -> Dict[str, object]:
+    """Monta a resposta da análise de correlação.
+
+    ``layout=dict`` mantém o formato legado ``correlation_matrix`` (dict
+    aninhado); ``compact`` devolve ``correlation.values`` com o triângulo
+    superior condensado (i < j, linha a linha, como o ``squareform`` do
+    SciPy); ``auto`` escolhe ``dict`` até CORRELATION_DICT_MAX colunas.
+    ``order=cluster`` reordena as colunas pelo agrupamento hierárquico.
+    """
+    if layout not in CORRELATION_LAYOUTS:
+        raise ValueError(f"Formato de correlação inválido: {layout}. Use um de {list(CORRELATION_LAYOUTS)}")
+    if order not in CORRELATION_ORDERS:
+        raise ValueError(f"Ordenação inválida: {order}. Use um de {list(CORRELATION_ORDERS)}")
+    if layout == "auto":
+        layout = "dict" if len(columns) <= CORRELATION_DICT_MAX else "compact"
+
+    if order == "cluster":
+        permutation = cluster_order(matrix)
+        matrix = matrix[np.ix_(permutation, permutation)]
+        columns = [columns[i] for i in permutation]
+
+    results: Dict[str, object] = {"layout": layout, "order": order, "columns": columns}
+    if layout == "dict":
+        results["correlation_matrix"] = pd.DataFrame(matrix, index=columns, columns=columns).to_dict()
+    elif layout == "compact":
+        rows, cols = np.triu_indices(len(columns), k=1)
+        results["correlation"] = {"size": len(columns), "values": _rounded(matrix[rows, cols], precision)}
+    if top_k or threshold is not None:
+        results.update(strongest_pairs(matrix, columns, top_k, threshold))
+    return results
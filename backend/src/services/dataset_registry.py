@@ -0,0 +1,310 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+import pandas as pd
+
+from src.core.config import DATASET_MEMORY_BUDGET, CONTRACT_KEY_COLUMN
+from src.services.analysis import DataAnalysisService
+from src.services.contract_analysis import ContractAnalysisService
+from src.utils.columnar_cache import file_sha256
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetNotFoundError(KeyError):
+    """Dataset desconhecido ou que não pode mais ser recarregado"""
+
+    def __str__(self) -> str:
+        return f"Dataset não encontrado: {self.args[0]}"
+
+
+@dataclass
+class DatasetInfo:
+    """Metadados de um dataset registrado, esteja ele em memória ou não"""
+    dataset_id: str
+    filename: str
+    # Arquivo de onde o dataset é recarregado (o cache colunar, quando existe)
+    source_path: Optional[str]
+    rows: int
+    nbytes: int
+    base_id: Optional[str] = None
+
+
+@dataclass
+class DatasetEntry:
+    """Dataset mantido em memória, com os serviços que operam sobre ele"""
+    info: DatasetInfo
+    contracts: ContractAnalysisService
+    analysis: DataAnalysisService
+    refcount: int = field(default=0)
+
+    @property
+    def dataset_id(self) -> str:
+        return self.info.dataset_id
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self.contracts.df
+
+
+class DatasetRegistry:
+    """Registro de datasets indexado pelo hash do conteúdo enviado.
+
+    Cada upload vira um dataset independente. Os DataFrames ficam em memória
+    em ordem LRU até ``memory_budget`` bytes; ao ultrapassar o orçamento, os
+    menos usados (e sem requisições em andamento) são descartados da memória
+    e recarregados do cache colunar quando forem solicitados novamente.
+    """
+
+    def __init__(self, memory_budget: int = DATASET_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self.default_id: Optional[str] = None
+        self._entries: "OrderedDict[str, DatasetEntry]" = OrderedDict()
+        self._known: Dict[str, DatasetInfo] = {}
+        self._lock = threading.RLock()
+        # Chamado a cada novo dataset padrão (ex.: publicação para outros workers)
+        self.publisher: Optional[Callable[[DatasetInfo], None]] = None
+        # Chamado quando um dataset sai do registro (substituído ou sem origem para recarregar)
+        self.remover: Optional[Callable[[str], None]] = None
+        # Datasets vistos no manifesto compartilhado da última vez
+        self._shared: Set[str] = set()
+
+    @property
+    def memory_usage(self) -> int:
+        with self._lock:
+            return sum(entry.info.nbytes for entry in self._entries.values())
+
+    @property
+    def loaded_count(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def registered_count(self) -> int:
+        with self._lock:
+            return len(self._known)
+
+    def register_file(self, file_path: str, content_hash: Optional[str] = None, filename: Optional[str] = None) -> DatasetInfo:
+        """Carrega um arquivo de contratos e o registra como dataset (bloqueante)"""
+        content_hash = content_hash or file_sha256(file_path)
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if entry is not None:
+                self._entries.move_to_end(content_hash)
+        if entry is not None:
+            self._set_default(entry.info)
+            return entry.info
+
+        contracts = ContractAnalysisService()
+        contracts.load_data(file_path, content_hash)
+        source_path = file_path
+        if contracts.cache is not None and contracts.cache.contains(content_hash):
+            # Recarregado do cache colunar: o arquivo enviado deixa de ser necessário
+            source_path = contracts.cache.path_for(content_hash)
+        info = DatasetInfo(
+            dataset_id=content_hash,
+            filename=filename or file_path,
+            source_path=source_path,
+            rows=len(contracts.df),
+            nbytes=int(contracts.df.memory_usage(deep=True).sum()),
+        )
+        self._insert(info, contracts)
+        self._set_default(info)
+        logger.info(f"Dataset registrado: {content_hash} ({info.rows} linhas, {info.nbytes} bytes)")
+        return info
+
+    def register_frame(self, df: pd.DataFrame, content_hash: str, filename: str) -> DatasetInfo:
+        """Registra um DataFrame montado a partir de várias partes (bloqueante)"""
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if entry is not None:
+                self._entries.move_to_end(content_hash)
+        if entry is not None:
+            self._set_default(entry.info)
+            return entry.info
+
+        contracts = ContractAnalysisService()
+        contracts.load_frame(df, content_hash)
+        info = DatasetInfo(
+            dataset_id=content_hash,
+            filename=filename,
+            # Sem arquivo de origem único: recarregado apenas do cache colunar
+            source_path=contracts.cache.path_for(content_hash) if contracts.cache else None,
+            rows=len(contracts.df),
+            nbytes=int(contracts.df.memory_usage(deep=True).sum()),
+        )
+        self._insert(info, contracts)
+        self._set_default(info)
+        logger.info(f"Dataset registrado: {content_hash} ({info.rows} linhas, {info.nbytes} bytes)")
+        return info
+
+    def upsert_file(
+        self,
+        dataset_id: Optional[str],
+        file_path: str,
+        delta_hash: str,
+        filename: Optional[str] = None,
+        key: str = CONTRACT_KEY_COLUMN,
+    ) -> DatasetInfo:
+        """Aplica um arquivo delta sobre um dataset, gerando uma nova versão (bloqueante).
+
+        A nova versão passa a ser o dataset padrão. A carga original continua
+        disponível pelo seu próprio id; versões intermediárias de uma cadeia de
+        upserts são descartadas do cache colunar e do registro.
+        """
+        with self.acquire(dataset_id) as base:
+            merged = base.contracts.upsert(file_path, delta_hash, key=key)
+            base_info = base.info
+
+        info = DatasetInfo(
+            dataset_id=merged.content_hash,
+            filename=filename or base_info.filename,
+            # Sem arquivo de origem próprio: recarregado apenas do cache colunar
+            source_path=merged.cache.path_for(merged.content_hash) if merged.cache else None,
+            rows=len(merged.df),
+            nbytes=int(merged.df.memory_usage(deep=True).sum()),
+            base_id=base_info.dataset_id,
+        )
+        self._insert(info, merged)
+        self._set_default(info)
+        logger.info(f"Dataset {info.dataset_id} gerado a partir de {base_info.dataset_id} ({info.rows} linhas)")
+        superseded = merged.cache.supersede(info.dataset_id) if merged.cache else None
+        if superseded is not None:
+            info.base_id = base_info.base_id
+            self._forget(superseded)
+        return info
+
+    def _forget(self, dataset_id: str, notify: bool = True) -> None:
+        """Remove um dataset do registro (da memória, assim que não estiver em uso)"""
+        with self._lock:
+            if self._known.pop(dataset_id, None) is None:
+                return
+            entry = self._entries.get(dataset_id)
+            if entry is not None and entry.refcount == 0:
+                del self._entries[dataset_id]
+        logger.info(f"Dataset {dataset_id} removido do registro")
+        if notify and self.remover is not None:
+            self.remover(dataset_id)
+
+    def adopt(self, infos: List[DatasetInfo], default_id: Optional[str]) -> Optional[str]:
+        """Aplica a lista de datasets publicada por outros processos e troca o padrão.
+
+        Datasets que saíram da lista desde a última chamada também saem do
+        registro. Devolve o id do novo dataset padrão, ou None se ele não mudou.
+        """
+        shared = {info.dataset_id for info in infos}
+        for dataset_id in self._shared - shared:
+            self._forget(dataset_id, notify=False)
+        with self._lock:
+            self._shared = shared
+            for info in infos:
+                self._known.setdefault(info.dataset_id, info)
+            if default_id is None or default_id not in self._known or default_id == self.default_id:
+                return None
+            self.default_id = default_id
+        logger.info(f"Dataset padrão trocado para {default_id}")
+        return default_id
+
+    def _set_default(self, info: DatasetInfo) -> None:
+        with self._lock:
+            self.default_id = info.dataset_id
+        if self.publisher is not None:
+            self.publisher(info)
+
+    def list_datasets(self) -> List[dict]:
+        with self._lock:
+            return [
+                {
+                    "dataset_id": info.dataset_id,
+                    "filename": info.filename,
+                    "rows": info.rows,
+                    "memory_bytes": info.nbytes,
+                    "base_id": info.base_id,
+                    "loaded": info.dataset_id in self._entries,
+                    "default": info.dataset_id == self.default_id,
+                }
+                for info in self._known.values()
+            ]
+
+    @contextmanager
+    def acquire(self, dataset_id: Optional[str] = None) -> Iterator[DatasetEntry]:
+        """Obtém um dataset, impedindo sua remoção enquanto estiver em uso"""
+        entry = self._get(dataset_id or self.default_id)
+        try:
+            yield entry
+        finally:
+            with self._lock:
+                entry.refcount -= 1
+                self._evict_if_needed()
+
+    def _get(self, dataset_id: Optional[str]) -> DatasetEntry:
+        if dataset_id is None:
+            raise ValueError("Dados não carregados")
+
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is not None:
+                self._entries.move_to_end(dataset_id)
+                entry.refcount += 1
+                return entry
+            info = self._known.get(dataset_id)
+        if info is None:
+            raise DatasetNotFoundError(dataset_id)
+
+        # Dataset removido da memória: recarrega do cache colunar (ou da origem)
+        logger.info(f"Recarregando dataset {dataset_id} removido da memória")
+        contracts = ContractAnalysisService()
+        try:
+            contracts.load_data(info.source_path, dataset_id)
+        except ValueError as e:
+            logger.error(f"Não foi possível recarregar o dataset {dataset_id}: {str(e)}")
+            if not info.source_path or not os.path.exists(info.source_path):
+                # Origem substituída ou removida: o dataset não volta mais
+                self._forget(dataset_id)
+            raise DatasetNotFoundError(dataset_id)
+        entry = self._insert(info, contracts, refcount=1)
+        return entry
+
+    def _insert(self, info: DatasetInfo, contracts: ContractAnalysisService, refcount: int = 0) -> DatasetEntry:
+        with self._lock:
+            entry = self._entries.get(info.dataset_id)
+            if entry is None:
+                entry = DatasetEntry(
+                    info=info,
+                    contracts=contracts,
+                    analysis=DataAnalysisService(contracts.df),
+                )
+                self._entries[info.dataset_id] = entry
+                self._known[info.dataset_id] = info
+            entry.refcount += refcount
+            self._entries.move_to_end(info.dataset_id)
+            self._evict_if_needed()
+            return entry
+
+    def _evict_if_needed(self) -> None:
+        # Datasets substituídos enquanto estavam em uso saem sem voltar ao cache
+        for dataset_id in [i for i, e in self._entries.items() if e.refcount == 0 and i not in self._known]:
+            del self._entries[dataset_id]
+        usage = sum(entry.info.nbytes for entry in self._entries.values())
+        for dataset_id in list(self._entries):
+            if usage <= self.memory_budget or len(self._entries) <= 1:
+                break
+            entry = self._entries[dataset_id]
+            # Versões incrementais sem cache colunar não podem ser recarregadas
+            if entry.refcount > 0 or entry.info.source_path is None:
+                continue
+            self._spill(entry)
+            del self._entries[dataset_id]
+            usage -= entry.info.nbytes
+            logger.info(f"Dataset {dataset_id} removido da memória (uso atual: {usage} bytes)")
+
+    @staticmethod
+    def _spill(entry: DatasetEntry) -> None:
+        cache = entry.contracts.cache
+        if cache is not None and not cache.contains(entry.dataset_id):
+            cache.store(entry.dataset_id, entry.df, source_path=entry.info.source_path)
@@ -0,0 +1,407 @@
+"""Fila persistente de jobs em segundo plano.
+
+Trabalhos longos (análises com renderização, leitura de planilhas grandes)
+são enfileirados numa tabela SQLite e executados por workers no event loop,
+que delegam o trabalho pesado aos pools do ``executor``. A requisição recebe
+apenas o id do job e acompanha o resultado por consulta (com espera opcional)
+ou por Server-Sent Events.
+
+Jobs idênticos em andamento são deduplicados pela chave informada no envio e
+os resultados concluídos são reaproveitados até expirarem (``JOB_RESULT_TTL``).
+Cada job em execução tem uma reserva renovada pelo processo dono; se o dono
+parar (queda ou reinício), a reserva vence em ``JOB_LEASE_SECONDS`` e o job
+volta para a fila. Com vários workers
+do uvicorn, todos consomem a mesma tabela e cada job é reservado por um só;
+a fila também é relida a cada ``JOB_POLL_INTERVAL`` segundos, para pegar os
+jobs enviados por outros processos. Handlers informam o andamento com
+``report_progress``.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import sqlite3
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+from src.core.config import JOBS_DB, JOB_WORKERS, JOB_RESULT_TTL, JOB_POLL_INTERVAL, JOB_LEASE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[dict], Awaitable[Any]]
+
+# Tipos de job e as funções que os executam (registradas pelas rotas)
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+FINISHED = ("done", "failed")
+
+# Intervalo entre as remoções de resultados expirados
+PURGE_INTERVAL = 60.0
+
+# Releitura do estado ao esperar um job, que pode estar em outro processo
+WAIT_POLL_INTERVAL = 1.0
+
+# Espera após uma falha ao reservar jobs (banco bloqueado), dobrada a cada nova falha
+CLAIM_RETRY_DELAY = 0.5
+CLAIM_MAX_DELAY = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    dedup_key TEXT,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    expires REAL,
+    progress TEXT,
+    owner TEXT,
+    lease_expires REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, status);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created);
+"""
+
+# Colunas acrescentadas depois da primeira versão do esquema
+ADDED_COLUMNS = {"progress": "TEXT", "owner": "TEXT", "lease_expires": "REAL"}
+
+
+class JobNotFoundError(KeyError):
+    """Job desconhecido ou com resultado já expirado"""
+
+    def __str__(self) -> str:
+        return f"Job não encontrado: {self.args[0]}"
+
+
+# Fila e id do job em execução na tarefa atual (definidos por ``JobQueue._run``)
+_current_job: contextvars.ContextVar = contextvars.ContextVar("current_job", default=None)
+
+
+def register_handler(kind: str, handler: JobHandler) -> None:
+    JOB_HANDLERS[kind] = handler
+
+
+def report_progress(progress: dict) -> None:
+    """Grava o andamento do job em execução (ignorado fora de um job)"""
+    current = _current_job.get()
+    if current is not None:
+        queue, job_id = current
+        queue.set_progress(job_id, progress)
+
+
+class JobQueue:
+    """Fila de jobs em SQLite, consumida por ``workers`` tarefas assíncronas.
+
+    Todo acesso ao banco passa por uma thread dedicada: um ``BEGIN IMMEDIATE``
+    pode esperar o busy timeout enquanto outro worker segura o lock de
+    escrita, e isso não pode parar o event loop. Cada job reservado leva o
+    dono (processo) e o vencimento da reserva, renovado enquanto o job roda;
+    só jobs com a reserva vencida (dono parado) voltam para a fila.
+    """
+
+    def __init__(
+        self,
+        db_path: str = JOBS_DB,
+        workers: int = JOB_WORKERS,
+        ttl: float = JOB_RESULT_TTL,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        lease: float = JOB_LEASE_SECONDS,
+    ):
+        self.db_path = db_path
+        self.workers = workers
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.lease = lease
+        # pid sozinho se repete entre reinícios do contêiner
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for name, kind in ADDED_COLUMNS.items():
+            if name not in columns:
+                # Bancos criados antes da coluna
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+        self._lock = threading.Lock()
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs-db")
+        self._pending = 0
+        self._running: Set[str] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._tasks = []
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._db.execute(sql, params)
+
+    async def _call(self, func: Callable[..., Any], *args) -> Any:
+        """Executa ``func`` (acesso ao banco) na thread da fila"""
+        return await asyncio.get_running_loop().run_in_executor(self._io, func, *args)
+
+    def start(self) -> None:
+        """Inicia os workers, a renovação das reservas e a limpeza dos resultados expirados"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat_loop()))
+        self._tasks.append(asyncio.create_task(self._purge_loop()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._call(self._close)
+        self._io.shutdown(wait=True)
+
+    def _close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    @property
+    def pending(self) -> int:
+        """Jobs na fila ou em execução, contados na última reserva (sem consultar o banco)"""
+        return self._pending
+
+    async def submit(self, kind: str, payload: dict, dedup_key: Optional[str] = None, memoize: bool = True) -> dict:
+        """Enfileira um job; devolve o job equivalente em andamento ou memorizado, se houver.
+
+        Com ``memoize=False`` só jobs em andamento são reaproveitados (para
+        trabalhos cujo efeito, e não o resultado, é o que importa).
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Tipo de job desconhecido: {kind}")
+        job = await self._call(self._submit, kind, payload, dedup_key, memoize)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    def _submit(self, kind: str, payload: dict, dedup_key: Optional[str], memoize: bool) -> dict:
+        now = time.time()
+        with self._lock:
+            if dedup_key is not None:
+                row = self._db.execute(
+                    "SELECT * FROM jobs WHERE dedup_key = ? AND (status IN ('queued', 'running')"
+                    " OR (status = 'done' AND expires > ? AND ?)) ORDER BY created DESC LIMIT 1",
+                    (dedup_key, now, memoize),
+                ).fetchone()
+                if row is not None:
+                    logger.info(f"Job {row['job_id']} reaproveitado ({kind}, {row['status']})")
+                    return self._as_dict(row)
+            job_id = uuid.uuid4().hex
+            self._db.execute(
+                "INSERT INTO jobs (job_id, kind, dedup_key, status, payload, created) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, dedup_key, json.dumps(payload), now),
+            )
+        logger.info(f"Job {job_id} enfileirado ({kind})")
+        return self._get(job_id)
+
+    async def get(self, job_id: str) -> dict:
+        return await self._call(self._get, job_id)
+
+    def _get(self, job_id: str) -> dict:
+        row = self._execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None or (row["expires"] is not None and row["expires"] <= time.time()):
+            raise JobNotFoundError(job_id)
+        return self._as_dict(row)
+
+    async def wait(self, job_id: str, timeout: float) -> dict:
+        """Estado do job assim que mudar (ou ao fim de ``timeout`` segundos)"""
+        job = await self.get(job_id)
+        if job["status"] in FINISHED or timeout <= 0:
+            return job
+        event = self._changed.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return await self.get(job_id)
+
+    async def wait_finished(self, job_id: str, timeout: float) -> dict:
+        deadline = time.monotonic() + timeout
+        job = await self.get(job_id)
+        while job["status"] not in FINISHED and time.monotonic() < deadline:
+            job = await self.wait(job_id, min(deadline - time.monotonic(), WAIT_POLL_INTERVAL))
+        return job
+
+    async def latest_payload(self, dedup_key: str) -> Optional[dict]:
+        """Dados de envio do job mais recente com a chave ``dedup_key``"""
+        return await self._call(self._latest_payload, dedup_key)
+
+    def _latest_payload(self, dedup_key: str) -> Optional[dict]:
+        row = self._execute(
+            "SELECT payload FROM jobs WHERE dedup_key = ? ORDER BY created DESC LIMIT 1", (dedup_key,)
+        ).fetchone()
+        return json.loads(row["payload"]) if row is not None else None
+
+    def set_progress(self, job_id: str, progress: dict) -> None:
+        """Agenda a gravação do andamento na thread da fila, sem esperar por ela.
+
+        A thread é única, então quem for avisado e reler o job enxerga o novo
+        andamento: a leitura entra na fila depois da gravação.
+        """
+        self._io.submit(self._write_progress, job_id, json.dumps(jsonable_encoder(progress)))
+        self._notify(job_id)
+
+    def _write_progress(self, job_id: str, progress: str) -> None:
+        try:
+            self._execute("UPDATE jobs SET progress = ? WHERE job_id = ?", (progress, job_id))
+        except sqlite3.Error as e:
+            logger.warning(f"Não foi possível gravar o andamento do job {job_id}: {str(e)}")
+
+    async def purge(self) -> int:
+        """Remove os jobs concluídos cujo resultado expirou"""
+        return await self._call(self._purge)
+
+    def _purge(self) -> int:
+        cursor = self._execute("DELETE FROM jobs WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+        if cursor.rowcount:
+            logger.info(f"{cursor.rowcount} jobs expirados removidos")
+        return cursor.rowcount
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Devolve à fila os jobs com reserva vencida e reserva o mais antigo da fila"""
+        now = time.time()
+        with self._lock:
+            # Transação com lock de escrita: outro processo não reserva o mesmo job
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Reserva vencida: o dono parou sem concluir o job (bancos antigos não têm reserva)
+                expired = self._db.execute(
+                    "UPDATE jobs SET status = 'queued', started = NULL, owner = NULL, lease_expires = NULL"
+                    " WHERE status = 'running' AND (lease_expires IS NULL OR lease_expires < ?)",
+                    (now,),
+                ).rowcount
+                row = self._db.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', started = ?, owner = ?, lease_expires = ? WHERE job_id = ?",
+                        (now, self.owner, now + self.lease, row["job_id"]),
+                    )
+                self._pending = self._db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+                ).fetchone()[0]
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        if expired:
+            logger.info(f"{expired} jobs com reserva vencida voltaram para a fila")
+        return row
+
+    def _renew(self, job_ids: List[str]) -> None:
+        placeholders = ", ".join("?" for _ in job_ids)
+        self._execute(
+            f"UPDATE jobs SET lease_expires = ? WHERE owner = ? AND status = 'running' AND job_id IN ({placeholders})",
+            (time.time() + self.lease, self.owner, *job_ids),
+        )
+
+    async def _heartbeat_loop(self) -> None:
+        """Renova as reservas dos jobs em execução neste processo"""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            if not self._running:
+                continue
+            try:
+                await self._call(self._renew, list(self._running))
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Não foi possível renovar as reservas dos jobs: {str(e)}")
+
+    async def _worker(self) -> None:
+        delay = CLAIM_RETRY_DELAY
+        while True:
+            try:
+                row = await self._call(self._claim)
+            except sqlite3.OperationalError as e:
+                # Banco bloqueado por outro processo além do busy timeout: tenta de novo mais tarde
+                logger.warning(f"Não foi possível reservar jobs ({str(e)}), nova tentativa em {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, CLAIM_MAX_DELAY)
+                continue
+            delay = CLAIM_RETRY_DELAY
+            if row is None:
+                self._wakeup.clear()
+                try:
+                    # Sem aviso local, relê a fila: jobs enviados por outros workers do uvicorn
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._notify(row["job_id"])
+            await self._run(row)
+
+    async def _run(self, row: sqlite3.Row) -> None:
+        job_id, kind = row["job_id"], row["kind"]
+        started = time.time()
+        _current_job.set((self, job_id))
+        self._running.add(job_id)
+        try:
+            handler = JOB_HANDLERS[kind]
+            result = await handler(json.loads(row["payload"]))
+            await self._finish(job_id, "done", result=json.dumps(jsonable_encoder(result)))
+            logger.info(f"Job {job_id} concluído ({kind}, {time.time() - started:.3f}s)")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            await self._finish(job_id, "failed", error=str(detail))
+            logger.error(f"Erro no job {job_id} ({kind}): {detail}")
+        finally:
+            self._running.discard(job_id)
+
+    async def _finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        now = time.time()
+        cursor = await self._call(
+            self._execute,
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ?, expires = ?, lease_expires = NULL"
+            " WHERE job_id = ? AND owner = ?",
+            (status, result, error, now, now + self.ttl, job_id, self.owner),
+        )
+        if not cursor.rowcount:
+            # A reserva venceu e o job foi para outro worker: o resultado dele prevalece
+            logger.warning(f"Job {job_id} perdeu a reserva; resultado descartado")
+        self._notify(job_id)
+
+    def _notify(self, job_id: str) -> None:
+        event = self._changed.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def _purge_loop(self) -> None:
+        while True:
+            try:
+                await self.purge()
+            except sqlite3.OperationalError as e:
+                logger.warning(f"Não foi possível remover os jobs expirados: {str(e)}")
+            await asyncio.sleep(PURGE_INTERVAL)
+
+    @staticmethod
+    def _as_dict(row: sqlite3.Row) -> dict:
+        return {
+            "job_id": row["job_id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created": row["created"],
+            "started": row["started"],
+            "finished": row["finished"],
+            "expires": row["expires"],
+            "progress": json.loads(row["progress"]) if row["progress"] else None,
+        }
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+from io import BytesIO
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from src.core.config import CACHE_DIR, RENDER_CACHE_BYTES
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def new_figure(figsize: Tuple[float, float]) -> "Figure":
+    """Cria uma figura com canvas Agg próprio, sem usar o estado global do pyplot"""
+    # matplotlib só é importado na primeira renderização
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def figure_to_bytes(fig: "Figure", image_format: str = "png") -> bytes:
+    """Serializa a figura no formato pedido (png ou svg)"""
+    if image_format not in MEDIA_TYPES:
+        raise ValueError(f"Formato de imagem não suportado: {image_format}")
+    buffer = BytesIO()
+    fig.savefig(buffer, format=image_format, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def render_key(
+    dataset_id: str,
+    analysis_type: str,
+    columns: Optional[List[str]] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Chave determinística de uma visualização (dataset, tipo, colunas, parâmetros)"""
+    spec = json.dumps(
+        [dataset_id, analysis_type, columns or [], params or {}],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(spec.encode("utf-8")).hexdigest()[:32]
+
+
+class RenderCache:
+    """Cache LRU de imagens renderizadas em disco, limitado pelo total de bytes.
+
+    Cada imagem é um arquivo ``{key}.{formato}`` em ``CACHE_DIR/renders``,
+    visível a todos os workers do uvicorn; a data de modificação marca o
+    último acesso e as imagens mais antigas são removidas ao exceder o limite.
+    """
+
+    def __init__(self, cache_dir: str = os.path.join(CACHE_DIR, "renders"), max_bytes: int = RENDER_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _find(self, key: str) -> Optional[Tuple[str, str]]:
+        """Caminho e tipo de conteúdo da imagem, ou None se não estiver no cache"""
+        for image_format, media_type in MEDIA_TYPES.items():
+            path = os.path.join(self.cache_dir, f"{key}.{image_format}")
+            if os.path.exists(path):
+                return path, media_type
+        return None
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(key) is not None
+
+    @property
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        found = self._find(key)
+        if found is None:
+            return None
+        path, media_type = found
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # Removida por outro worker entre a busca e a leitura
+            return None
+        return data, media_type
+
+    def put(self, key: str, data: bytes, media_type: str) -> None:
+        if len(data) > self.max_bytes:
+            return
+        image_format = next(name for name, value in MEDIA_TYPES.items() if value == media_type)
+        path = os.path.join(self.cache_dir, f"{key}.{image_format}")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+
+render_cache = RenderCache()
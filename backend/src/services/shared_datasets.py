@@ -0,0 +1,130 @@
+"""Datasets compartilhados entre os processos workers do uvicorn.
+
+Cada dataset registrado é gravado no cache colunar (Arrow sem compressão, um
+único bloco por coluna) e publicado num manifesto ``datasets.json`` ao lado
+do cache. Os outros workers verificam o manifesto periodicamente e passam a
+conhecer os novos datasets (e a esquecer os que foram retirados, como versões
+de upsert substituídas), que são lidos por memory-map: as colunas numéricas e
+de datas ficam uma única vez no cache de páginas do sistema, qualquer que seja
+o número de workers (textos continuam copiados em cada processo). A troca do dataset padrão é uma atribuição sob o lock do registro,
+de forma que cada requisição enxerga uma versão inteira, antiga ou nova.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import Iterator, Optional, Tuple
+
+from src.core.config import CACHE_DIR, SHARED_POLL_INTERVAL
+from src.core.executor import executor
+from src.services.dataset_registry import DatasetInfo, DatasetRegistry
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+class SharedDatasetStore:
+    """Manifesto dos datasets publicados pelos workers e observador de mudanças"""
+
+    def __init__(self, registry: DatasetRegistry, cache_dir: str = CACHE_DIR, poll_interval: float = SHARED_POLL_INTERVAL):
+        self.registry = registry
+        self.poll_interval = poll_interval
+        self.manifest_path = os.path.join(cache_dir, "datasets.json")
+        self._seen: Optional[Tuple[int, int]] = None
+        self._task: Optional[asyncio.Task] = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @contextmanager
+    def exclusive(self, name: str = "datasets") -> Iterator[None]:
+        """Lock entre processos (``flock``) identificado por ``name``"""
+        with open(f"{self.manifest_path}.{name}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read(self) -> dict:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {"version": MANIFEST_VERSION, "default_id": None, "datasets": []}
+        if manifest.get("version") != MANIFEST_VERSION:
+            logger.warning(f"Versão do manifesto de datasets incompatível, ignorando {self.manifest_path}")
+            return {"version": MANIFEST_VERSION, "default_id": None, "datasets": []}
+        return manifest
+
+    def publish(self, info: DatasetInfo) -> None:
+        """Acrescenta o dataset ao manifesto e o torna o padrão de todos os workers"""
+        with self.exclusive():
+            manifest = self.read()
+            manifest["datasets"] = [item for item in manifest["datasets"] if item["dataset_id"] != info.dataset_id]
+            manifest["datasets"].append(asdict(info))
+            manifest["default_id"] = info.dataset_id
+            self._write(manifest)
+        logger.info(f"Dataset {info.dataset_id} publicado para os demais workers")
+
+    def remove(self, dataset_id: str) -> None:
+        """Retira do manifesto um dataset que saiu do registro"""
+        with self.exclusive():
+            manifest = self.read()
+            datasets = [item for item in manifest["datasets"] if item["dataset_id"] != dataset_id]
+            if len(datasets) == len(manifest["datasets"]):
+                return
+            manifest["datasets"] = datasets
+            if manifest["default_id"] == dataset_id:
+                manifest["default_id"] = None
+            self._write(manifest)
+        logger.info(f"Dataset {dataset_id} retirado do manifesto compartilhado")
+
+    def _write(self, manifest: dict) -> None:
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def sync(self) -> Optional[str]:
+        """Aplica o manifesto ao registro se ele mudou; devolve o novo dataset padrão"""
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        # O manifesto é sempre substituído por os.replace: novo inode a cada versão
+        seen = (stat.st_ino, stat.st_mtime_ns)
+        if seen == self._seen:
+            return None
+        self._seen = seen
+        manifest = self.read()
+        infos = [DatasetInfo(**item) for item in manifest["datasets"]]
+        return self.registry.adopt(infos, manifest["default_id"])
+
+    def start(self) -> None:
+        if self._task is None:
+            self.sync()
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                default_id = self.sync()
+                if default_id is not None:
+                    # Anexa a nova versão antes da primeira requisição que a usar
+                    await executor.run_in_thread(self._attach, default_id)
+            except Exception as e:
+                logger.error(f"Erro ao sincronizar os datasets compartilhados: {str(e)}")
+
+    def _attach(self, dataset_id: str) -> None:
+        with self.registry.acquire(dataset_id):
+            pass
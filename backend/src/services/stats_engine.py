@@ -0,0 +1,174 @@
+import warnings
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.schemas.data import DescriptiveStats
+
+QUANTILES = (0.25, 0.5, 0.75)
+# Somas abaixo deste valor são erro de arredondamento (mesmo limite do pandas)
+FPERR_EPSILON = 1e-14
+
+
+@dataclass(frozen=True)
+class NumericSummary:
+    """Momentos e quantis de várias colunas numéricas, um valor por coluna.
+
+    ``m2``, ``m3`` e ``m4`` são somas das potências dos desvios em relação à
+    média (não divididas por n), a mesma convenção usada pelo pandas.
+    """
+    columns: List[str]
+    count: np.ndarray
+    mean: np.ndarray
+    m2: np.ndarray
+    m3: np.ndarray
+    m4: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+    q1: np.ndarray
+    median: np.ndarray
+    q3: np.ndarray
+    outliers: np.ndarray
+
+    def select(self, columns: Sequence[str]) -> "NumericSummary":
+        """Subconjunto do resumo para as colunas pedidas, na ordem pedida"""
+        positions = {col: i for i, col in enumerate(self.columns)}
+        idx = np.array([positions[col] for col in columns], dtype=np.intp)
+        return NumericSummary(
+            columns=list(columns),
+            **{
+                name: getattr(self, name)[idx]
+                for name in ("count", "mean", "m2", "m3", "m4", "min", "max", "q1", "median", "q3", "outliers")
+            },
+        )
+
+    @property
+    def std(self) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+
+    @property
+    def skewness(self) -> np.ndarray:
+        """Assimetria amostral ajustada (G1), idêntica a ``Series.skew``"""
+        n = self.count
+        m2 = _zero_out_fperr(self.m2)
+        m3 = _zero_out_fperr(self.m3)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = n * np.sqrt(n - 1) / (n - 2) * (m3 / m2 ** 1.5)
+        result = np.where(m2 == 0, 0.0, result)
+        return np.where(n < 3, np.nan, result)
+
+    @property
+    def kurtosis(self) -> np.ndarray:
+        """Curtose em excesso ajustada (G2), idêntica a ``Series.kurtosis``"""
+        n = self.count
+        with np.errstate(divide="ignore", invalid="ignore"):
+            adj = 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+            numerator = _zero_out_fperr(n * (n + 1) * (n - 1) * self.m4)
+            denominator = _zero_out_fperr((n - 2) * (n - 3) * self.m2 ** 2)
+            result = numerator / denominator - adj
+        result = np.where(denominator == 0, 0.0, result)
+        return np.where(n < 4, np.nan, result)
+
+    def descriptive_stats(self) -> Dict[str, DescriptiveStats]:
+        std = self.std
+        return {
+            col: DescriptiveStats(
+                count=float(self.count[i]),
+                mean=_optional(self.mean[i]),
+                std=_optional(std[i]),
+                min=_optional(self.min[i]),
+                q1=_optional(self.q1[i]),
+                median=_optional(self.median[i]),
+                q3=_optional(self.q3[i]),
+                max=_optional(self.max[i]),
+            )
+            for i, col in enumerate(self.columns)
+        }
+
+    def distribution_stats(self) -> Dict[str, dict]:
+        skewness = self.skewness
+        kurtosis = self.kurtosis
+        return {
+            col: {
+                "skewness": float(skewness[i]),
+                "kurtosis": float(kurtosis[i]),
+                "outliers_count": int(self.outliers[i]),
+            }
+            for i, col in enumerate(self.columns)
+        }
+
+
+def _optional(value: float):
+    return None if np.isnan(value) else float(value)
+
+
+def _zero_out_fperr(values: np.ndarray) -> np.ndarray:
+    """Zera resíduos de arredondamento, como em colunas constantes não representáveis (ex.: 0.1)"""
+    return np.where(np.abs(values) < FPERR_EPSILON, 0.0, values)
+
+
+def summarize(df: pd.DataFrame, columns: Sequence[str]) -> NumericSummary:
+    """Calcula todas as estatísticas numéricas em uma passada vetorizada.
+
+    As colunas são copiadas uma única vez para um bloco 2-D de float64,
+    contíguo por coluna, e todos os agregados são reduções por eixo sobre ele.
+    """
+    columns = list(columns)
+    block = np.asfortranarray(df[columns].to_numpy(dtype=np.float64, na_value=np.nan))
+    n_rows, n_cols = block.shape
+    if n_rows == 0 or n_cols == 0:
+        nan = np.full(n_cols, np.nan)
+        return NumericSummary(
+            columns, np.zeros(n_cols), nan, nan, nan, nan, nan, nan, nan, nan, nan, np.zeros(n_cols, dtype=int)
+        )
+
+    valid = ~np.isnan(block)
+    missing = ~valid.all(axis=0)
+    count = valid.sum(axis=0).astype(np.float64)
+
+    with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        if missing.any():
+            mean = np.nansum(block, axis=0) / count
+            deviations = np.where(valid, block - mean, 0.0)
+            minimum = np.nanmin(block, axis=0)
+            maximum = np.nanmax(block, axis=0)
+        else:
+            mean = block.sum(axis=0) / count
+            deviations = block - mean
+            minimum = block.min(axis=0)
+            maximum = block.max(axis=0)
+
+        # Quantis com tratamento de NaN apenas nas colunas que têm faltantes
+        quantiles = np.empty((len(QUANTILES), n_cols))
+        if (~missing).any():
+            quantiles[:, ~missing] = np.quantile(block[:, ~missing], QUANTILES, axis=0)
+        if missing.any():
+            quantiles[:, missing] = np.nanquantile(block[:, missing], QUANTILES, axis=0)
+        q1, median, q3 = quantiles
+
+        squared = deviations * deviations
+        m2 = squared.sum(axis=0)
+        m3 = (squared * deviations).sum(axis=0)
+        m4 = (squared * squared).sum(axis=0)
+        std = np.where(count > 1, np.sqrt(m2 / (count - 1)), np.nan)
+        # Mesmo critério da versão anterior: |x| acima de 3 desvios-padrão
+        outliers = (np.abs(block) > std * 3).sum(axis=0)
+
+    return NumericSummary(
+        columns=columns,
+        count=count,
+        mean=mean,
+        m2=m2,
+        m3=m3,
+        m4=m4,
+        min=minimum,
+        max=maximum,
+        q1=q1,
+        median=median,
+        q3=q3,
+        outliers=outliers,
+    )
@@ -0,0 +1,370 @@
+import io
+import logging
+import os
+import warnings
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.core.config import CSV_CHUNK_ROWS
+from src.services.stats_engine import NumericSummary
+
+logger = logging.getLogger(__name__)
+
+KLL_K = 200
+KLL_RANK_ERROR = 0.0165
+
+# Formatos lidos em blocos, sem carregar o arquivo inteiro (JSON apenas em linhas)
+STREAMING_EXTENSIONS = ("csv", "json", "jsonl", "ndjson")
+
+
+class KLLSketch:
+    """Sketch de quantis KLL (Karnin, Lang e Liberty) com níveis em arrays NumPy"""
+
+    def __init__(self, k: int = KLL_K, seed: Optional[int] = None):
+        self.k = k
+        self.n = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # Com tamanho ímpar, um item permanece no nível atual
+                keep = len(items) % 2
+                offset = int(self._rng.integers(2))
+                promoted = items[keep + offset::2]
+                self.levels[level] = items[:keep]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def _weighted_items(self) -> Tuple[np.ndarray, np.ndarray]:
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lvl), 2.0 ** h) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        items, cumulative = self._weighted_items()
+        targets = np.asarray(qs) * cumulative[-1]
+        idx = np.minimum(np.searchsorted(cumulative, targets, side="left"), len(items) - 1)
+        return items[idx]
+
+    def rank(self, value: float, inclusive: bool = True) -> float:
+        """Fração estimada dos valores menores (ou iguais) a ``value``"""
+        if self.n == 0:
+            return np.nan
+        items, cumulative = self._weighted_items()
+        pos = np.searchsorted(items, value, side="right" if inclusive else "left")
+        return float(cumulative[pos - 1] / cumulative[-1]) if pos > 0 else 0.0
+
+
+class StreamingStats:
+    """Estado combinável de momentos, quantis e correlação de colunas numéricas.
+
+    Cada bloco do arquivo atualiza um estado de memória constante, que pode
+    ser combinado (``merge``) com o estado de outro bloco; assim partes do
+    arquivo podem ser processadas em paralelo.
+
+    Garantias de erro:
+
+    * contagem, média, desvio-padrão, assimetria, curtose, mínimo e máximo são
+      exatos (a menos de arredondamento): os momentos centrais são combinados
+      com as fórmulas de Chan/Pébay;
+    * a correlação é exata, com a mesma deleção par a par de faltantes do
+      ``DataFrame.corr``: as somas cruzadas de cada par de colunas são somadas
+      bloco a bloco;
+    * q1, mediana e q3 vêm de um sketch KLL. Com ``k=200`` (padrão) o erro de
+      rank normalizado é de cerca de 1,65% com 99% de confiança: o quantil
+      devolvido tem rank verdadeiro dentro de ±0,0165·n do pedido;
+    * a contagem de outliers é estimada pelo mesmo sketch, com erro de até
+      ±2·0,0165·n elementos.
+    """
+
+    def __init__(self, columns: Sequence[str], shift: Optional[np.ndarray] = None, k: int = KLL_K, seed: Optional[int] = None):
+        self.columns = list(columns)
+        size = len(self.columns)
+        self.count = np.zeros(size)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.m3 = np.zeros(size)
+        self.m4 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+        self.sketches = [KLLSketch(k, None if seed is None else seed + i) for i in range(size)]
+        # Somas cruzadas sobre dados deslocados (shift fixo) para a correlação par a par
+        self.shift = np.zeros(size) if shift is None else np.asarray(shift, dtype=np.float64)
+        self.pair_n = np.zeros((size, size))
+        self.pair_sum = np.zeros((size, size))
+        self.pair_sumsq = np.zeros((size, size))
+        self.pair_prod = np.zeros((size, size))
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        block = _numeric_block(chunk, self.columns)
+        if len(block) == 0:
+            return
+        valid = ~np.isnan(block)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            n = valid.sum(axis=0).astype(np.float64)
+            mean = np.where(n > 0, np.nansum(block, axis=0) / n, 0.0)
+            deviations = np.where(valid, block - mean, 0.0)
+            squared = deviations * deviations
+            self._merge_moments(n, mean, squared.sum(axis=0), (squared * deviations).sum(axis=0), (squared * squared).sum(axis=0))
+            self.min = np.fmin(self.min, np.where(valid, block, np.inf).min(axis=0))
+            self.max = np.fmax(self.max, np.where(valid, block, -np.inf).max(axis=0))
+
+        for i, sketch in enumerate(self.sketches):
+            sketch.update(block[:, i])
+
+        shifted = np.where(valid, block - self.shift, 0.0)
+        mask = valid.astype(np.float64)
+        self.pair_n += mask.T @ mask
+        self.pair_sum += shifted.T @ mask
+        self.pair_sumsq += (shifted * shifted).T @ mask
+        self.pair_prod += shifted.T @ shifted
+
+    def merge(self, other: "StreamingStats") -> "StreamingStats":
+        if other.columns != self.columns or not np.array_equal(other.shift, self.shift):
+            raise ValueError("Estados de streaming incompatíveis")
+        self._merge_moments(other.count, other.mean, other.m2, other.m3, other.m4)
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        for sketch, other_sketch in zip(self.sketches, other.sketches):
+            sketch.merge(other_sketch)
+        self.pair_n += other.pair_n
+        self.pair_sum += other.pair_sum
+        self.pair_sumsq += other.pair_sumsq
+        self.pair_prod += other.pair_prod
+        return self
+
+    def _merge_moments(self, nb, mean_b, m2b, m3b, m4b) -> None:
+        """Combina momentos centrais de dois conjuntos (Chan et al. / Pébay)"""
+        na = self.count
+        n = na + nb
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta = mean_b - self.mean
+            delta_n = np.where(n > 0, delta / n, 0.0)
+            term = delta * delta_n * na * nb
+            mean = self.mean + delta_n * nb
+            m2 = self.m2 + m2b + term
+            m3 = (self.m3 + m3b + term * delta_n * (na - nb)
+                  + 3 * delta_n * (na * m2b - nb * self.m2))
+            m4 = (self.m4 + m4b + term * delta_n ** 2 * (na * na - na * nb + nb * nb)
+                  + 6 * delta_n ** 2 * (na * na * m2b + nb * nb * self.m2)
+                  + 4 * delta_n * (na * m3b - nb * self.m3))
+        self.count, self.mean, self.m2, self.m3, self.m4 = n, mean, m2, m3, m4
+
+    def summary(self) -> NumericSummary:
+        """Resumo no mesmo formato do motor em memória (quantis aproximados)"""
+        quantiles = np.array([sketch.quantiles((0.25, 0.5, 0.75)) for sketch in self.sketches]).reshape(-1, 3)
+        empty = self.count == 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            std = np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+        outliers = np.array([
+            _tail_count(sketch, 3 * s) for sketch, s in zip(self.sketches, std)
+        ], dtype=int)
+        return NumericSummary(
+            columns=self.columns,
+            count=self.count,
+            mean=np.where(empty, np.nan, self.mean),
+            m2=self.m2,
+            m3=self.m3,
+            m4=self.m4,
+            min=np.where(empty, np.nan, self.min),
+            max=np.where(empty, np.nan, self.max),
+            q1=quantiles[:, 0],
+            median=quantiles[:, 1],
+            q3=quantiles[:, 2],
+            outliers=outliers,
+        )
+
+    def correlation(self) -> pd.DataFrame:
+        """Matriz de correlação de Pearson com deleção par a par"""
+        n = self.pair_n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = self.pair_prod - self.pair_sum * self.pair_sum.T / n
+            var = self.pair_sumsq - self.pair_sum ** 2 / n
+            corr = cov / np.sqrt(var * var.T)
+        corr = np.where(n > 1, np.clip(corr, -1.0, 1.0), np.nan)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+    def error_bounds(self) -> Dict[str, float]:
+        return {
+            "quantile_rank_error": KLL_RANK_ERROR,
+            "outliers_count_error": float(2 * KLL_RANK_ERROR * self.count.max()) if len(self.count) else 0.0,
+        }
+
+
+def _tail_count(sketch: KLLSketch, threshold: float) -> int:
+    """Estimativa de |x| > threshold a partir do sketch"""
+    if sketch.n == 0 or np.isnan(threshold):
+        return 0
+    above = 1.0 - sketch.rank(threshold, inclusive=True)
+    below = sketch.rank(-threshold, inclusive=False)
+    return int(round(sketch.n * (above + below)))
+
+
+def _numeric_block(chunk: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    data = {col: pd.to_numeric(chunk[col], errors="coerce") if col in chunk.columns else np.nan for col in columns}
+    return pd.DataFrame(data, index=chunk.index).to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _reader(source, ext: str, chunk_rows: int, **kwargs):
+    if ext == "csv":
+        return pd.read_csv(source, chunksize=chunk_rows, **kwargs)
+    if ext in STREAMING_EXTENSIONS:
+        return pd.read_json(source, lines=True, chunksize=chunk_rows, **kwargs)
+    raise ValueError("Modo streaming suporta apenas CSV e JSON-lines")
+
+
+class _RangeReader(io.RawIOBase):
+    """Leitura restrita ao intervalo [start, end) de um arquivo"""
+
+    def __init__(self, path: str, start: int, end: int):
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._remaining <= 0:
+            return 0
+        size = min(len(buffer), self._remaining)
+        data = self._file.read(size)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def _split_ranges(file_path: str, data_start: int, parts: int) -> List[Tuple[int, int]]:
+    """Divide o arquivo em intervalos alinhados a quebras de linha"""
+    size = os.path.getsize(file_path)
+    step = max(1, (size - data_start) // parts)
+    bounds = [data_start]
+    with open(file_path, "rb") as f:
+        for i in range(1, parts):
+            f.seek(data_start + i * step)
+            f.readline()
+            position = f.tell()
+            if position >= size or position <= bounds[-1]:
+                break
+            bounds.append(position)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+@dataclass(frozen=True)
+class StreamPlan:
+    """Colunas, deslocamento e intervalos de um arquivo a processar em partes.
+
+    É pequeno e picklable: cada parte é enviada sozinha ao pool de processos,
+    que lê o próprio intervalo do arquivo pelo caminho.
+    """
+    file_path: str
+    ext: str
+    columns: List[str]
+    shift: np.ndarray
+    header: Optional[List[str]]
+    ranges: List[Tuple[int, int]]
+    chunk_rows: int
+    seed: int
+
+
+def plan_stream(
+    file_path: str,
+    columns: Optional[List[str]] = None,
+    chunk_rows: int = CSV_CHUNK_ROWS,
+    parts: int = 1,
+    seed: int = 0,
+) -> StreamPlan:
+    """Lê o primeiro bloco do arquivo e o divide em até ``parts`` intervalos.
+
+    Os intervalos são alinhados a quebras de linha; a divisão supõe que nenhum
+    campo contém quebras de linha.
+    """
+    ext = file_path.rsplit(".", 1)[-1].lower()
+    try:
+        reader = _reader(file_path, ext, chunk_rows)
+    except pd.errors.EmptyDataError:
+        reader = None
+    if reader is not None:
+        with reader:
+            first = next(iter(reader), None)
+    else:
+        first = None
+    if first is None:
+        return StreamPlan(file_path, ext, list(columns or []), np.zeros(len(columns or [])), None, [], chunk_rows, seed)
+
+    numeric = first.select_dtypes(include=[np.number]).columns.tolist()
+    columns = [col for col in columns if col in numeric] if columns else numeric
+    # Deslocamento pela média do primeiro bloco melhora a estabilidade das somas cruzadas
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        shift = np.nan_to_num(np.nanmean(_numeric_block(first, columns), axis=0))
+
+    header = first.columns.tolist() if ext == "csv" else None
+    with open(file_path, "rb") as f:
+        if ext == "csv":
+            f.readline()
+        data_start = f.tell()
+    ranges = _split_ranges(file_path, data_start, max(1, parts))
+    return StreamPlan(file_path, ext, columns, shift, header, ranges, chunk_rows, seed)
+
+
+def accumulate_part(plan: StreamPlan, index: int) -> StreamingStats:
+    """Processa o intervalo ``index`` do plano (executado em um processo do pool)"""
+    start, end = plan.ranges[index]
+    state = StreamingStats(plan.columns, shift=plan.shift, seed=plan.seed + index * 7919)
+    if start >= end:
+        return state
+    kwargs = {"header": None, "names": plan.header} if plan.ext == "csv" else {}
+    with io.BufferedReader(_RangeReader(plan.file_path, start, end)) as source:
+        for chunk in _reader(source, plan.ext, plan.chunk_rows, **kwargs):
+            state.update(chunk)
+    return state
+
+
+def combine_parts(plan: StreamPlan, states: Iterable[StreamingStats]) -> StreamingStats:
+    """Combina os estados das partes na ordem do arquivo"""
+    state = StreamingStats(plan.columns, shift=plan.shift, seed=plan.seed)
+    for part in states:
+        state.merge(part)
+    return state
+
@@ -0,0 +1,130 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Frequência pública -> (frequência de período do pandas, formato do rótulo)
+FREQUENCIES = {
+    "day": ("D", "%Y-%m-%d"),
+    "week": ("W-SUN", "%Y-%m-%d"),
+    "month": ("M", "%Y-%m"),
+    "quarter": ("Q", "%YQ%q"),
+}
+
+
+class TimeSeriesEngine:
+    """Séries temporais sobre arrays de datas ordenados uma única vez.
+
+    As datas de início (e, opcionalmente, de término) são ordenadas na
+    construção; cada consulta apenas faz buscas binárias nas bordas dos
+    períodos, então mudar a granularidade ou o intervalo custa O(P log N).
+    """
+
+    def __init__(self, starts: pd.Series, ends: Optional[pd.Series] = None):
+        start_values = pd.to_datetime(starts, errors="coerce").to_numpy(dtype="datetime64[ns]")
+        valid = ~np.isnat(start_values)
+        self._rows = np.flatnonzero(valid)
+        self._order = np.argsort(start_values[valid], kind="stable")
+        self.starts = start_values[valid][self._order].view(np.int64)
+
+        self.ends = None
+        if ends is not None:
+            end_values = pd.to_datetime(ends, errors="coerce").to_numpy(dtype="datetime64[ns]")[valid]
+            self.ends = np.sort(end_values[~np.isnat(end_values)]).view(np.int64)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def periods(self, freq: str = "month", start=None, end=None) -> pd.PeriodIndex:
+        """Períodos cobrindo o intervalo pedido (por padrão, todo o dataset)"""
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Frequência não suportada: {freq}. Use uma de {list(FREQUENCIES)}")
+        if len(self.starts) == 0 and (start is None or end is None):
+            return pd.PeriodIndex([], freq=FREQUENCIES[freq][0])
+        start = pd.Timestamp(start) if start is not None else pd.Timestamp(self.starts[0])
+        end = pd.Timestamp(end) if end is not None else pd.Timestamp(self.starts[-1])
+        if end < start:
+            raise ValueError("Data final anterior à data inicial")
+        return pd.period_range(start=start, end=end, freq=FREQUENCIES[freq][0])
+
+    @staticmethod
+    def _edges(periods: pd.PeriodIndex, start=None, end=None) -> np.ndarray:
+        """Bordas [início do 1º período, ..., início do período após o último].
+
+        Com ``start``/``end``, a primeira e a última borda são recortadas no
+        instante exato do intervalo (``end`` inclusivo), e não no limite do
+        período que o contém.
+        """
+        if len(periods) == 0:
+            return np.empty(0, dtype=np.int64)
+        starts = periods.start_time.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        after = (periods[-1] + 1).start_time.to_datetime64().astype("datetime64[ns]").view(np.int64)
+        edges = np.append(starts, after)
+        if start is not None:
+            edges[0] = max(edges[0], pd.Timestamp(start).value)
+        if end is not None:
+            edges[-1] = min(edges[-1], pd.Timestamp(end).value + 1)
+        return edges
+
+    @staticmethod
+    def _labels(periods: pd.PeriodIndex, freq: str) -> List[str]:
+        if len(periods) == 0:
+            return []
+        fmt = FREQUENCIES[freq][1]
+        # Semanas são rotuladas pela data de início (segunda-feira)
+        if freq == "week":
+            return periods.start_time.strftime(fmt).tolist()
+        return periods.strftime(fmt).tolist()
+
+    def counts(self, periods: pd.PeriodIndex, start=None, end=None) -> np.ndarray:
+        """Quantidade de registros iniciados em cada período"""
+        positions = np.searchsorted(self.starts, self._edges(periods, start, end), side="left")
+        return np.diff(positions)
+
+    def active(self, periods: pd.PeriodIndex, start=None, end=None) -> np.ndarray:
+        """Registros ativos ao fim de cada período (iniciados e ainda não encerrados)"""
+        edges = self._edges(periods, start, end)[1:]
+        started = np.searchsorted(self.starts, edges, side="left")
+        if self.ends is None:
+            return started
+        ended = np.searchsorted(self.ends, edges, side="left")
+        return started - ended
+
+    def sums(self, values: pd.Series, periods: pd.PeriodIndex, start=None, end=None) -> np.ndarray:
+        """Soma de uma coluna numérica por período de início"""
+        ordered = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        ordered = np.nan_to_num(ordered[self._rows][self._order])
+        cumulative = np.concatenate(([0.0], np.cumsum(ordered)))
+        positions = np.searchsorted(self.starts, self._edges(periods, start, end), side="left")
+        return np.diff(cumulative[positions])
+
+    def series(
+        self,
+        freq: str = "month",
+        start=None,
+        end=None,
+        window: Optional[int] = None,
+        cumulative: bool = False,
+        include_empty: bool = True,
+        values: Optional[Dict[str, pd.Series]] = None,
+    ) -> List[dict]:
+        """Série pronta para resposta: quantidade por período e métricas derivadas"""
+        periods = self.periods(freq, start, end)
+        labels = self._labels(periods, freq)
+        columns = {"quantidade": self.counts(periods, start, end)}
+        if window:
+            columns["media_movel"] = (
+                pd.Series(columns["quantidade"]).rolling(window, min_periods=1).mean().to_numpy()
+            )
+        if cumulative:
+            columns["ativos"] = self.active(periods, start, end)
+        for name, series in (values or {}).items():
+            columns[f"soma_{name}"] = self.sums(series, periods, start, end)
+
+        keep = np.ones(len(periods), dtype=bool) if include_empty else columns["quantidade"] > 0
+        lists = {name: array[keep].tolist() for name, array in columns.items()}
+        labels = [label for label, kept in zip(labels, keep) if kept]
+        return [
+            {"date": label, **{name: lists[name][i] for name in lists}}
+            for i, label in enumerate(labels)
+        ]
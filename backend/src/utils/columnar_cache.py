@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.core.config import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Incrementar sempre que a normalização dos dados mudar, invalidando o cache antigo
+CACHE_FORMAT_VERSION = 3
+
+
+def _zero_copy_table(df: pd.DataFrame):
+    """Tabela Arrow que o pandas consegue ler do memory-map sem copiar.
+
+    Decimais e datas ausentes ficam como NaN/NaT nos próprios valores, e não
+    como nulos do Arrow: colunas sem bitmap de nulos e em um único bloco
+    viram arrays NumPy apontando direto para o arquivo mapeado, compartilhado
+    entre processos pelo cache de páginas do sistema.
+    """
+    import pyarrow as pa
+
+    df = df.reset_index(drop=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, col in enumerate(df.columns):
+        values = df[col].to_numpy() if df[col].dtype.kind in "fM" else None
+        if values is None:
+            continue
+        if values.dtype.kind == "f":
+            array = pa.array(values, from_pandas=False)
+        else:
+            unit = np.datetime_data(values.dtype)[0]
+            data = np.ascontiguousarray(values.view(np.int64))
+            array = pa.Array.from_buffers(pa.timestamp(unit), len(data), [None, pa.py_buffer(data)])
+        table = table.set_column(i, table.schema.field(i).with_type(array.type), array)
+    return table
+
+
+def write_frame(df: pd.DataFrame, path: str) -> None:
+    """Grava o DataFrame em Arrow sem compressão e em um único bloco (escrita atômica)"""
+    import pyarrow.feather as feather
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        # Sem compressão e em um único bloco para permitir memory-map direto das colunas
+        feather.write_feather(_zero_copy_table(df), tmp_path, compression="uncompressed", chunksize=max(len(df), 1))
+        os.replace(tmp_path, path)
+    except BaseException:
+        ColumnarCache._remove(tmp_path)
+        raise
+
+
+def read_frame(path: str) -> pd.DataFrame:
+    """Lê um arquivo gravado por ``write_frame`` via memory-map.
+
+    Só as colunas numéricas e de datas (e os códigos das categóricas) apontam
+    para o arquivo mapeado. Textos, tanto as categorias quanto as colunas de
+    strings, são convertidos em objetos Python e copiados em cada processo.
+    """
+    import pyarrow.feather as feather
+
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Calcula o hash SHA-256 do conteúdo do arquivo, lendo em blocos"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ColumnarCache:
+    """Cache em disco (Arrow IPC/Feather) de DataFrames já normalizados.
+
+    As entradas são indexadas pelo hash do conteúdo do arquivo de origem, de
+    forma que um arquivo modificado gera uma nova chave. O índice mantém o
+    último hash conhecido para cada arquivo de origem e remove a entrada antiga
+    quando os bytes mudam. Entradas derivadas de outra (versões de upsert)
+    registram a versão de origem na linhagem e a substituem quando adotadas
+    (``supersede``).
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, namespace: str = "data"):
+        self.cache_dir = cache_dir
+        self.namespace = namespace
+        self.index_path = os.path.join(cache_dir, f"{namespace}-index.json")
+        self.lineage_path = os.path.join(cache_dir, f"{namespace}-lineage.json")
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, content_hash: str) -> str:
+        """Caminho do arquivo colunar para um hash de conteúdo"""
+        file_name = f"{self.namespace}-{content_hash}.v{CACHE_FORMAT_VERSION}.arrow"
+        return os.path.join(self.cache_dir, file_name)
+
+    def contains(self, content_hash: str) -> bool:
+        return os.path.exists(self.path_for(content_hash))
+
+    def load(self, content_hash: str) -> Optional[pd.DataFrame]:
+        """Lê a entrada do cache via memory-map, ou None se não existir"""
+        path = self.path_for(content_hash)
+        if not os.path.exists(path):
+            return None
+        import pyarrow as pa
+
+        try:
+            return read_frame(path)
+        except (OSError, pa.ArrowException) as e:
+            logger.warning(f"Entrada de cache inválida, descartando {path}: {str(e)}")
+            self._remove(path)
+            return None
+
+    def store(
+        self,
+        content_hash: str,
+        df: pd.DataFrame,
+        source_path: Optional[str] = None,
+        parent: Optional[str] = None,
+    ) -> Optional[str]:
+        """Grava o DataFrame no cache e atualiza o índice do arquivo de origem (ou a linhagem, com ``parent``)"""
+        path = self.path_for(content_hash)
+        import pyarrow as pa
+
+        try:
+            write_frame(df, path)
+        except (OSError, pa.ArrowException, ValueError, TypeError) as e:
+            logger.warning(f"Não foi possível gravar o cache colunar: {str(e)}")
+            return None
+
+        if source_path:
+            self._update_index(os.path.abspath(source_path), content_hash)
+        if parent:
+            lineage = self._read_json(self.lineage_path)
+            lineage[content_hash] = parent
+            self._write_json(self.lineage_path, lineage)
+        logger.info(f"Cache colunar gravado em: {path}")
+        return path
+
+    def supersede(self, content_hash: str) -> Optional[str]:
+        """Remove a versão de origem de ``content_hash`` se ela também for derivada.
+
+        Chamado quando a nova versão é adotada. Entradas de arquivos de origem
+        (presentes no índice) são mantidas, de forma que uma cadeia de upserts
+        guarda só a carga original e a versão mais recente. Devolve o hash
+        removido, ou None.
+        """
+        lineage = self._read_json(self.lineage_path)
+        parent = lineage.get(content_hash)
+        if parent is None or parent not in lineage or parent in self._read_index().values():
+            return None
+        grandparent = lineage.pop(parent)
+        for child, origin in lineage.items():
+            if origin == parent:
+                lineage[child] = grandparent
+        self._write_json(self.lineage_path, lineage)
+        self._remove(self.path_for(parent))
+        logger.info(f"Entrada de cache {parent} substituída por {content_hash}")
+        return parent
+
+    def invalidate(self, source_path: str) -> None:
+        """Remove a entrada de cache associada a um arquivo de origem"""
+        index = self._read_index()
+        content_hash = index.pop(os.path.abspath(source_path), None)
+        if content_hash is None:
+            return
+        if content_hash not in index.values():
+            self._remove(self.path_for(content_hash))
+        self._write_index(index)
+
+    def _update_index(self, source_path: str, content_hash: str) -> None:
+        index = self._read_index()
+        previous = index.get(source_path)
+        index[source_path] = content_hash
+        # Os bytes da origem mudaram: a entrada anterior não é mais alcançável
+        if previous and previous != content_hash and previous not in index.values():
+            self._remove(self.path_for(previous))
+        self._write_index(index)
+
+    def _read_index(self) -> Dict[str, str]:
+        return self._read_json(self.index_path)
+
+    def _write_index(self, index: Dict[str, str]) -> None:
+        self._write_json(self.index_path, index)
+
+    @staticmethod
+    def _read_json(path: str) -> Dict[str, str]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_json(path: str, data: Dict[str, str]) -> None:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
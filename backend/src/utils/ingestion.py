@@ -0,0 +1,246 @@
+import hashlib
+import importlib.util
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi import UploadFile
+from pandas.api.types import union_categoricals
+
+from src.core.config import MAX_UPLOAD_BYTES, UPLOAD_CHUNK_SIZE, CSV_CHUNK_ROWS, EXCEL_ENGINE
+
+logger = logging.getLogger(__name__)
+
+# Colunas de texto com proporção de valores distintos abaixo disso viram categoria
+CATEGORY_RATIO = 0.5
+
+
+class UploadTooLargeError(ValueError):
+    """Arquivo enviado excede o limite configurado"""
+
+
+@dataclass
+class SpooledUpload:
+    path: str
+    sha256: str
+    size: int
+
+
+async def spool_upload(
+    file: UploadFile,
+    dest_dir: str,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> SpooledUpload:
+    """Copia o upload para um arquivo temporário em blocos, calculando o hash.
+
+    Nunca mantém o arquivo inteiro em memória e interrompe a cópia assim que o
+    limite de tamanho é ultrapassado.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(f"Arquivo excede o limite de {max_bytes} bytes")
+
+    os.makedirs(dest_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Arquivo excede o limite de {max_bytes} bytes")
+                digest.update(chunk)
+                buffer.write(chunk)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    return SpooledUpload(path=tmp_path, sha256=digest.hexdigest(), size=size)
+
+
+def downcast_numeric(series: pd.Series) -> pd.Series:
+    """Reduz a largura de colunas numéricas sem perder informação"""
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return pd.to_numeric(series, downcast="integer")
+    if pd.api.types.is_float_dtype(series.dtype) and series.dtype != np.float32:
+        values = series.to_numpy()
+        narrow = values.astype(np.float32)
+        # Só converte quando todos os valores são representáveis exatamente
+        if np.array_equal(narrow.astype(values.dtype), values, equal_nan=True):
+            return series.astype(np.float32)
+    return series
+
+
+def compact_frame(df: pd.DataFrame, category_ratio: float = CATEGORY_RATIO) -> pd.DataFrame:
+    """Reduz o uso de memória: inteiros com menor largura e textos repetitivos como categoria"""
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_integer_dtype(series.dtype):
+            df[col] = downcast_numeric(series)
+        elif series.dtype == object and len(series) > 0:
+            if series.nunique(dropna=True) <= len(series) * category_ratio:
+                df[col] = series.astype("category")
+    return df
+
+
+def concat_compact(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatena blocos compactados preservando as colunas categóricas"""
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+
+    columns = frames[0].columns
+    if any(not frame.columns.equals(columns) for frame in frames[1:]):
+        return pd.concat(frames, ignore_index=True)
+
+    data = {}
+    for col in columns:
+        parts = [frame[col] for frame in frames]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            # A decisão de categoria é tomada no primeiro bloco; os demais seguem
+            parts = [part.astype("category") for part in parts]
+            try:
+                data[col] = pd.Series(union_categoricals(parts), name=col)
+            except TypeError:
+                # Categorias de tipos diferentes (ex.: coluna vazia em um dos blocos)
+                data[col] = pd.concat([part.astype(object) for part in parts], ignore_index=True).astype("category")
+        else:
+            data[col] = pd.concat(parts, ignore_index=True)
+        for frame in frames:
+            del frame[col]
+    return pd.DataFrame(data)
+
+
+def _read_compact_chunks(chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    frames: List[pd.DataFrame] = []
+    category_columns = None
+    for chunk in chunks:
+        if category_columns is None:
+            chunk = compact_frame(chunk)
+            category_columns = [
+                col for col in chunk.columns if isinstance(chunk[col].dtype, pd.CategoricalDtype)
+            ]
+        else:
+            for col in chunk.columns:
+                if pd.api.types.is_integer_dtype(chunk[col].dtype):
+                    chunk[col] = pd.to_numeric(chunk[col], downcast="integer")
+            for col in category_columns:
+                if col in chunk.columns:
+                    chunk[col] = chunk[col].astype("category")
+        frames.append(chunk)
+    return concat_compact(frames)
+
+
+def _is_json_lines(file_path: str) -> bool:
+    with open(file_path, "rb") as f:
+        head = f.read(4096).lstrip()
+    return not head.startswith(b"[")
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def excel_engine(ext: str = "xlsx", engine: str = EXCEL_ENGINE) -> Optional[str]:
+    """Motor de leitura para a extensão, ou None quando nenhum está instalado.
+
+    O calamine (python-calamine, opcional) lê xlsx e xls bem mais rápido que o
+    openpyxl; arquivos .xls sem o calamine dependem do xlrd.
+    """
+    if engine not in ("auto", "calamine"):
+        return engine if ext == "xlsx" else ("xlrd" if _installed("xlrd") else None)
+    if _installed("python_calamine"):
+        return "calamine"
+    if engine == "calamine":
+        logger.warning("EXCEL_ENGINE=calamine, mas python-calamine não está instalado")
+    if ext == "xlsx":
+        return "openpyxl"
+    return "xlrd" if _installed("xlrd") else None
+
+
+def supported_extensions() -> Tuple[str, ...]:
+    """Extensões que podem ser lidas com os pacotes instalados"""
+    extensions = ("csv", "json", "xlsx")
+    return extensions + ("xls",) if excel_engine("xls") else extensions
+
+
+def list_sheets(file_path: str) -> List[str]:
+    """Nomes das planilhas de um arquivo Excel"""
+    ext = file_path.rsplit(".", 1)[-1].lower()
+    engine = excel_engine(ext)
+    if engine is None:
+        raise ValueError(f"Nenhum leitor instalado para arquivos .{ext}")
+    if engine == "calamine":
+        from python_calamine import CalamineWorkbook
+
+        return list(CalamineWorkbook.from_path(file_path).sheet_names)
+    with pd.ExcelFile(file_path, engine=engine) as workbook:
+        return list(workbook.sheet_names)
+
+
+def read_sheet(file_path: str, sheet: Optional[str] = None) -> pd.DataFrame:
+    """Lê uma planilha (a primeira quando ``sheet`` é None), já compactada"""
+    ext = file_path.rsplit(".", 1)[-1].lower()
+    engine = excel_engine(ext)
+    if engine is None:
+        raise ValueError(f"Nenhum leitor instalado para arquivos .{ext}")
+    if engine != "calamine":
+        return compact_frame(pd.read_excel(file_path, sheet_name=sheet or 0, engine=engine))
+
+    from python_calamine import CalamineWorkbook
+
+    workbook = CalamineWorkbook.from_path(file_path)
+    rows = workbook.get_sheet_by_name(sheet or workbook.sheet_names[0]).to_python(skip_empty_area=True)
+    if not rows:
+        return pd.DataFrame()
+    df = pd.DataFrame(rows[1:], columns=[str(col) for col in rows[0]])
+    df = df.replace("", np.nan).infer_objects()
+    for col in df.columns:
+        # O calamine devolve todo número como float; restaura colunas inteiras
+        values = df[col]
+        if pd.api.types.is_float_dtype(values.dtype) and values.notna().all() and (values % 1 == 0).all():
+            df[col] = values.astype(np.int64)
+    return compact_frame(df)
+
+
+def read_excel_sheets(file_path: str) -> pd.DataFrame:
+    """Lê todas as planilhas com as mesmas colunas da primeira não vazia e as concatena"""
+    frames: List[pd.DataFrame] = []
+    for sheet in list_sheets(file_path):
+        df = read_sheet(file_path, sheet)
+        if df.empty:
+            continue
+        if frames and not df.columns.equals(frames[0].columns):
+            logger.info(f"Planilha '{sheet}' ignorada: colunas diferentes da primeira planilha")
+            continue
+        frames.append(df)
+    return concat_compact(frames)
+
+
+def read_tabular(file_path: str, chunk_rows: int = CSV_CHUNK_ROWS) -> pd.DataFrame:
+    """Lê CSV, JSON/JSON-lines ou Excel.
+
+    CSV e JSON-lines são lidos incrementalmente em blocos de ``chunk_rows``
+    linhas e compactados bloco a bloco, de modo que o pico de memória acompanha
+    o tamanho do bloco e não o do arquivo. Em planilhas, todas as abas com as
+    mesmas colunas da primeira são concatenadas.
+    """
+    ext = file_path.rsplit(".", 1)[-1].lower()
+    if ext == "csv":
+        return _read_compact_chunks(pd.read_csv(file_path, chunksize=chunk_rows))
+    if ext in ("json", "jsonl", "ndjson"):
+        if _is_json_lines(file_path):
+            return _read_compact_chunks(pd.read_json(file_path, lines=True, chunksize=chunk_rows))
+        return compact_frame(pd.read_json(file_path))
+    if ext in ("xlsx", "xls"):
+        return read_excel_sheets(file_path)
+    raise ValueError("Formato de arquivo não suportado")
@@ -0,0 +1,97 @@
+import io
+import json
+from typing import Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.core.config import EXPORT_CHUNK_ROWS
+
+# Formatos de exportação em streaming: tipo de mídia e extensão do arquivo
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+def project(df: pd.DataFrame, columns: Optional[Sequence[str]]) -> List[str]:
+    """Colunas pedidas (todas quando vazio), validadas contra o DataFrame"""
+    if not columns:
+        return list(df.columns)
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise ValueError(f"Colunas não encontradas: {missing}")
+    return list(dict.fromkeys(columns))
+
+
+def _take(df: pd.DataFrame, rows: np.ndarray, columns: List[str]) -> pd.DataFrame:
+    """Recorte das linhas e colunas pedidas, copiando só esse bloco"""
+    return df.iloc[rows, df.columns.get_indexer(columns)]
+
+
+def _records(frame: pd.DataFrame) -> str:
+    return frame.to_json(orient="records", date_format="iso", force_ascii=False)
+
+
+def page_body(df: pd.DataFrame, rows: np.ndarray, columns: List[str], meta: dict) -> bytes:
+    """Página em JSON: metadados mais ``data`` serializado direto das colunas"""
+    head = json.dumps(meta, ensure_ascii=False)
+    return f'{head[:-1]}, "data": {_records(_take(df, rows, columns))}}}'.encode("utf-8")
+
+
+def _arrow_schema(frame: pd.DataFrame):
+    import pyarrow as pa
+
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    # Colunas só com nulos no primeiro bloco não definem o tipo dos seguintes
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    return schema
+
+
+def iter_export(
+    df: pd.DataFrame,
+    rows: np.ndarray,
+    columns: List[str],
+    fmt: str,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+) -> Iterator[bytes]:
+    """Serializa as linhas em blocos de ``chunk_rows``.
+
+    Cada bloco é recortado das colunas, convertido e descartado antes do
+    próximo: a memória usada não cresce com o total exportado.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportação inválido: {fmt}. Use um de {list(EXPORT_FORMATS)}")
+
+    if fmt == "arrow":
+        yield from _iter_arrow(df, rows, columns, chunk_rows)
+        return
+
+    for start in range(0, len(rows), chunk_rows):
+        frame = _take(df, rows[start:start + chunk_rows], columns)
+        if fmt == "csv":
+            yield frame.to_csv(index=False, header=start == 0, lineterminator="\n").encode("utf-8")
+        else:
+            text = frame.to_json(orient="records", lines=True, date_format="iso", force_ascii=False)
+            yield (text if text.endswith("\n") else text + "\n").encode("utf-8")
+    if len(rows) == 0 and fmt == "csv":
+        yield (",".join(columns) + "\n").encode("utf-8")
+
+
+def _iter_arrow(df: pd.DataFrame, rows: np.ndarray, columns: List[str], chunk_rows: int) -> Iterator[bytes]:
+    """Formato de streaming do Arrow IPC: esquema seguido de um record batch por bloco"""
+    import pyarrow as pa
+
+    sink = io.BytesIO()
+    schema = _arrow_schema(_take(df, rows[:chunk_rows], columns))
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for start in range(0, len(rows), chunk_rows):
+            frame = _take(df, rows[start:start + chunk_rows], columns)
+            writer.write_batch(pa.RecordBatch.from_pandas(frame, schema=schema, preserve_index=False))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
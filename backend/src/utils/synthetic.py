@@ -0,0 +1,105 @@
+"""Gerador de datasets sintéticos de contratos para testes de carga e benchmarks.
+
+Uso:
+    python -m src.utils.synthetic --rows 1000000 --output uploads/contratos_1m.csv
+"""
+import argparse
+import os
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+FORMATS = ("csv", "xlsx", "json")
+
+# Limite de linhas de uma planilha do Excel (descontando o cabeçalho)
+XLSX_MAX_ROWS = 1_048_575
+
+MODALIDADES = ["Pregão", "Dispensa", "Concorrência", "Inexigibilidade", "Tomada de Preços", "Convite"]
+# Pesos das modalidades: poucas dominam, como nos dados reais
+MODALIDADE_WEIGHTS = [0.45, 0.25, 0.12, 0.1, 0.05, 0.03]
+
+
+def generate_contracts(
+    rows: int,
+    seed: int = 0,
+    responsaveis: int = 200,
+    start: str = "2015-01-01",
+    days: int = 3650,
+    offset: int = 0,
+) -> pd.DataFrame:
+    """Gera ``rows`` contratos com o esquema esperado pelo serviço.
+
+    As datas saem no formato dd/mm/aaaa e contratos ativos ficam sem data de
+    encerramento. ``offset`` desloca os ids, permitindo gerar em blocos.
+    """
+    rng = np.random.default_rng(seed)
+    cadastro = rng.integers(0, days, rows)
+    encerramento = cadastro + rng.integers(30, 1460, rows)
+    # Formata cada dia do calendário uma única vez e indexa pelos deslocamentos
+    calendar = pd.date_range(start, periods=days + 1460, freq="D").strftime("%d/%m/%Y").to_numpy()
+    status = np.where(rng.random(rows) < 0.35, "A", "E")
+    # Distribuição de cauda longa: poucos responsáveis concentram os contratos
+    responsavel = (rng.zipf(1.3, rows) - 1) % responsaveis
+
+    return pd.DataFrame({
+        "id_contrato": np.arange(offset + 1, offset + rows + 1),
+        "status": status,
+        "modalidade": rng.choice(MODALIDADES, rows, p=MODALIDADE_WEIGHTS),
+        "data_cadastro": calendar[cadastro],
+        "data_encerramento": np.where(status == "E", calendar[encerramento], ""),
+        "responsavel": np.char.add("Responsável ", responsavel.astype(str)),
+        "valor": rng.lognormal(10, 1.2, rows).round(2),
+        "prazo": rng.integers(1, 60, rows),
+    })
+
+
+def iter_contracts(rows: int, seed: int = 0, chunk_rows: int = 500_000, **kwargs) -> Iterator[pd.DataFrame]:
+    """Gera os contratos em blocos, para arquivos maiores que a memória disponível"""
+    for number, offset in enumerate(range(0, rows, chunk_rows)):
+        size = min(chunk_rows, rows - offset)
+        yield generate_contracts(size, seed=seed + number, offset=offset, **kwargs)
+
+
+def write_contracts(
+    path: str,
+    rows: int,
+    fmt: Optional[str] = None,
+    seed: int = 0,
+    chunk_rows: int = 500_000,
+) -> str:
+    """Grava um dataset sintético em CSV, XLSX ou JSON (uma linha por contrato)"""
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato não suportado: {fmt}. Use um de {list(FORMATS)}")
+    if fmt == "xlsx" and rows > XLSX_MAX_ROWS:
+        raise ValueError(f"Arquivos XLSX suportam no máximo {XLSX_MAX_ROWS} linhas")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if fmt == "xlsx":
+        generate_contracts(rows, seed=seed).to_excel(path, index=False)
+        return path
+
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for number, chunk in enumerate(iter_contracts(rows, seed=seed, chunk_rows=chunk_rows)):
+            if fmt == "csv":
+                chunk.to_csv(f, index=False, header=number == 0)
+            else:
+                chunk.to_json(f, orient="records", lines=True, force_ascii=False)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Gera um dataset sintético de contratos")
+    parser.add_argument("--rows", type=int, default=10_000, help="quantidade de contratos (ex.: 10000 a 10000000)")
+    parser.add_argument("--output", required=True, help="arquivo de saída (.csv, .xlsx ou .json)")
+    parser.add_argument("--format", choices=FORMATS, help="formato (padrão: extensão do arquivo)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    path = write_contracts(args.output, args.rows, fmt=args.format, seed=args.seed)
+    print(f"{args.rows} contratos gravados em {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Fixtures dos testes: diretórios temporários e dados sintéticos de contratos."""
+import os
+import tempfile
+
+import pytest
+
+# O ambiente precisa estar pronto antes de importar src.core.config
+_WORKDIR = tempfile.mkdtemp(prefix="contract-tests-")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_WORKDIR, "uploads"))
+os.environ.setdefault("CACHE_DIR", os.path.join(_WORKDIR, "cache"))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from src.utils.synthetic import write_contracts  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def contracts_csv():
+    path = os.path.join(_WORKDIR, "data", "contratos.csv")
+    if not os.path.exists(path):
+        write_contracts(path, 3000, fmt="csv")
+    return path
+
+
+@pytest.fixture(scope="session")
+def contracts(contracts_csv):
+    from src.services.contract_analysis import ContractAnalysisService
+
+    service = ContractAnalysisService()
+    service.load_data(contracts_csv)
+    return service
+
+
+@pytest.fixture(scope="session")
+def raw_contracts(contracts_csv):
+    """Arquivo de contratos como texto, para montar deltas no formato de origem"""
+    import pandas as pd
+
+    return pd.read_csv(contracts_csv, dtype=str, keep_default_na=False)
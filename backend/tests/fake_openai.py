@@ -0,0 +1,73 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Servidor mínimo compatível com /v1/chat/completions, usado pelos testes do
+# chat e para desenvolvimento local sem acessar a OpenAI:
+#   python tests/fake_openai.py
+#   OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=fake python src/main.py
+app = FastAPI(title="Fake OpenAI")
+
+# Atraso entre tokens, para simular a geração do modelo
+TOKEN_DELAY = 0.02
+
+# Status HTTP devolvidos, um por requisição, antes das respostas normais (falhas simuladas)
+failures: List[int] = []
+# Corpos das requisições recebidas
+received: List[dict] = []
+
+
+def _answer_for(messages: list) -> str:
+    question = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+    return f"Resposta simulada para: {question}"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    received.append(body)
+    if failures:
+        status = failures.pop(0)
+        return JSONResponse(status_code=status, content={"error": {"message": "Falha simulada", "type": "server_error"}})
+    answer = _answer_for(body.get("messages", []))
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    model = body.get("model", "fake")
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop",
+            }],
+        }
+
+    async def events():
+        for token in answer.split(" "):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token + " "}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(TOKEN_DELAY)
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=8001)
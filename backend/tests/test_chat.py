@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import fake_openai
+from src.services import chat_service as chat_module
+from src.services.chat_service import ChatService
+from src.services.dataset_registry import DatasetRegistry
+
+
+@pytest.fixture(scope="module")
+def registry(contracts_csv):
+    registry = DatasetRegistry()
+    registry.register_file(contracts_csv, None, "contratos.csv")
+    return registry
+
+
+@pytest.fixture(autouse=True)
+def fake(monkeypatch):
+    monkeypatch.setattr(fake_openai, "TOKEN_DELAY", 0)
+    fake_openai.failures.clear()
+    fake_openai.received.clear()
+    return fake_openai
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    """Limites sorteados pelo jitter; a espera em si é zerada"""
+    drawn = []
+
+    def uniform(low, high):
+        drawn.append((low, high))
+        return 0.0
+
+    monkeypatch.setattr(chat_module.random, "uniform", uniform)
+    return drawn
+
+
+def _service(registry, max_retries: int = 3) -> ChatService:
+    """ChatService com o cliente apontando para o servidor falso, sem rede"""
+    from openai import AsyncOpenAI
+
+    service = ChatService(registry=registry)
+    service.max_retries = max_retries
+    service._client = AsyncOpenAI(
+        api_key="test",
+        base_url="http://fake-openai/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_openai.app)),
+    )
+    return service
+
+
+def _run(registry, scenario, **kwargs):
+    async def main():
+        service = _service(registry, **kwargs)
+        try:
+            return await scenario(service)
+        finally:
+            await service.aclose()
+
+    return asyncio.run(main())
+
+
+async def _stream(service, message):
+    return [token async for token in service.stream_message(message)]
+
+
+def test_answer_uses_analysis_context(registry, fake):
+    answer = _run(registry, lambda service: service.process_message("Quantos contratos ativos?"))
+    assert answer == "Resposta simulada para: Quantos contratos ativos?"
+    messages = fake.received[0]["messages"]
+    assert messages[1]["content"].startswith("Dados das análises:")
+    assert messages[-1] == {"role": "user", "content": "Quantos contratos ativos?"}
+
+
+def test_answer_cache_by_normalized_question(registry, fake):
+    async def scenario(service):
+        first = await service.process_message("Qual o valor total?")
+        second = await service.process_message("  qual o VALOR   total? ")
+        return first, second
+
+    first, second = _run(registry, scenario)
+    assert first == second
+    assert len(fake.received) == 1
+
+
+def test_retries_transient_errors_with_jitter(registry, fake, delays):
+    fake.failures.extend([503, 429])
+    answer = _run(registry, lambda service: service.process_message("Teste de nova tentativa"))
+    assert answer == "Resposta simulada para: Teste de nova tentativa"
+    assert len(fake.received) == 3
+    base = chat_module.RETRY_BASE_DELAY
+    # Jitter completo: espera sorteada entre 0 e o backoff exponencial da tentativa
+    assert delays == [(0, base), (0, base * 2)]
+
+
+def test_gives_up_after_max_retries(registry, fake, delays):
+    fake.failures.extend([503] * 3)
+    answer = _run(registry, lambda service: service.process_message("Sem resposta"), max_retries=2)
+    assert answer is None
+    assert len(fake.received) == 3 and len(delays) == 2
+
+
+def test_client_errors_are_not_retried(registry, fake, delays):
+    fake.failures.append(400)
+    assert _run(registry, lambda service: service.process_message("Pedido inválido")) is None
+    assert len(fake.received) == 1 and delays == []
+
+
+def test_stream_then_cached(registry, fake, delays):
+    fake.failures.append(503)
+
+    async def scenario(service):
+        return await _stream(service, "Resumo dos contratos"), await _stream(service, "resumo dos contratos")
+
+    tokens, cached = _run(registry, scenario)
+    assert len(tokens) > 1
+    assert "".join(tokens).strip() == "Resposta simulada para: Resumo dos contratos"
+    # Do cache, a resposta inteira vem de uma vez e sem nova chamada
+    assert cached == ["".join(tokens)]
+    assert len(fake.received) == 2 and len(delays) == 1
+
+
+def test_stream_route_sends_sse(registry, fake):
+    from src.api.dependencies import get_chat_service
+    from src.main import app
+
+    service = _service(registry)
+    app.dependency_overrides[get_chat_service] = lambda: service
+    try:
+        response = TestClient(app).post("/api/chat/stream", json={"message": "Olá"})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block for block in response.text.split("\n\n") if block]
+    tokens = [json.loads(block.removeprefix("data: "))["token"] for block in events[:-1]]
+    assert "".join(tokens).strip() == "Resposta simulada para: Olá"
+    assert events[-1] == "event: done\ndata: {}"
+    assert fake.received[0]["stream"] is True
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.contract_aggregates import STATUS_LABELS
+from src.services.contract_query import DATE_COLUMNS, ContractIndex, ContractQuery
+
+QUERIES = {
+    "sem_filtro": {},
+    "status": {"status": ["A"]},
+    "status_rotulo_modalidade": {"status": ["Encerrado"], "modalidade": ["Pregão", "Concorrência"]},
+    "responsavel_desconhecido": {"responsavel": ["Responsável 3", "Responsável 7", "Ninguém"]},
+    "periodo": {"start": "2018-03-01", "end": "2019-06-30"},
+    "encerramento": {"start": "2024-01-01", "date_field": "encerramento"},
+    "combinado": {"status": ["A"], "responsavel": ["Responsável 1", "Responsável 2"], "start": "2017-01-01", "end": "2023-12-31"},
+    "vazio": {"modalidade": ["Inexistente"]},
+}
+
+
+def _mask(df: pd.DataFrame, status=(), modalidade=(), responsavel=(), start=None, end=None, date_field="cadastro"):
+    """Mesmo filtro com máscaras booleanas do pandas sobre a tabela inteira"""
+    labels = {label: code for code, label in STATUS_LABELS.items()}
+    mask = pd.Series(True, index=df.index)
+    if status:
+        mask &= df["status"].isin([labels.get(value, value) for value in status])
+    if modalidade:
+        mask &= df["modalidade"].isin(modalidade)
+    if responsavel:
+        mask &= df["responsavel"].isin(responsavel)
+    dates = df[DATE_COLUMNS[date_field]]
+    if start:
+        mask &= dates >= pd.Timestamp(start)
+    if end:
+        mask &= dates < pd.Timestamp(end) + pd.Timedelta(days=1)
+    return mask.to_numpy()
+
+
+@pytest.mark.parametrize("filters", list(QUERIES.values()), ids=list(QUERIES))
+def test_rows_match_boolean_mask(contracts, filters):
+    df = contracts.df
+    expected = np.flatnonzero(_mask(df, **filters))
+    rows = contracts.index.rows(ContractQuery.build(**filters))
+    if rows is None:
+        assert len(expected) == len(df)
+    else:
+        np.testing.assert_array_equal(np.sort(rows), expected)
+
+
+@pytest.mark.parametrize("group_by", ["status", "modalidade", "responsavel", "month", "year"])
+@pytest.mark.parametrize("filters", ["sem_filtro", "combinado", "periodo"])
+def test_grouped_query_matches_pandas(contracts, filters, group_by):
+    df = contracts.df
+    selected = df[_mask(df, **QUERIES[filters])]
+    result = contracts.query(group_by=group_by, sum="valor", **QUERIES[filters])
+    assert result["total"] == len(selected)
+    assert result["soma"] == pytest.approx(selected["valor"].sum())
+
+    if group_by in ("month", "year"):
+        keys = selected["data_cadastro"].dt.to_period("M" if group_by == "month" else "Y").astype(str)
+    elif group_by == "status":
+        keys = selected["status"].astype(str).map(STATUS_LABELS)
+    else:
+        keys = selected[group_by].astype(str)
+    counts = keys.value_counts()
+    sums = selected["valor"].groupby(keys).sum()
+    assert {item["name"]: item["value"] for item in result["data"]} == counts.to_dict()
+    for item in result["data"]:
+        assert item["soma"] == pytest.approx(sums[item["name"]])
+    values = [item["value"] for item in result["data"]]
+    if group_by in ("month", "year"):
+        assert [item["name"] for item in result["data"]] == sorted(counts.index)
+    else:
+        assert values == sorted(values, reverse=True)
+
+
+def test_query_cache_is_lru():
+    df = pd.DataFrame({
+        "status": pd.Categorical(["A", "E", "A"]),
+        "modalidade": pd.Categorical(["x", "y", "x"]),
+        "responsavel": pd.Categorical(["a", "b", "c"]),
+        "data_cadastro": pd.to_datetime(["2020-01-01", "2020-02-01", "2020-03-01"]),
+        "data_encerramento": pd.NaT,
+    })
+    index = ContractIndex(df, cache_size=2)
+    queries = [ContractQuery.build(status=[value]) for value in ("A", "E")]
+    first = index.query(queries[0])
+    index.query(queries[1])
+    # Mesma consulta normalizada (ordem e repetições não importam) vem do cache
+    assert index.query(ContractQuery.build(status=["A", "A"])) is first
+    index.query(ContractQuery.build(modalidade=["y"]))
+    assert list(index._cache) == [queries[0], ContractQuery.build(modalidade=["y"])]
+    assert index.query(queries[1])["total"] == 1
+
+
+@pytest.mark.parametrize("keys, cursor, expected", [
+    # Fora da faixa do int8: antes "200" virava -56 e devolvia quase tudo
+    (np.array([-100, -5, 0, 7, 120], dtype=np.int8), "200", []),
+    (np.array([-100, -5, 0, 7, 120], dtype=np.int8), "-300", [-100, -5, 0, 7, 120]),
+    (np.array([-100, -5, 0, 7, 120], dtype=np.int8), "99999999999999999999", []),
+    (np.array([-100, -5, 0, 7, 120], dtype=np.int8), "6.5", [7, 120]),
+    (np.array([-100, -5, 0, 7, 120], dtype=np.int8), "7", [120]),
+    (np.array([1, 300, 40000], dtype=np.uint16), "-1", [1, 300, 40000]),
+    (np.array([0.1, 0.5, 1e30], dtype=np.float32), "1e300", []),
+    # O cursor de uma chave float32 é o valor exato em float64 (o ``next_after``)
+    (np.array([0.1, 0.5, 1e30], dtype=np.float32), str(float(np.float32(0.1))), [0.5, 1e30]),
+    (np.array([0.1, 0.5, 1e30], dtype=np.float32), "0.1", [0.1, 0.5, 1e30]),
+    (np.array([0.1, 0.5, 1e30], dtype=np.float32), "0.49999999999", [0.5, 1e30]),
+])
+def test_keyset_cursor_is_parsed_at_full_width(keys, cursor, expected):
+    df = pd.DataFrame({"id": keys[::-1]})
+    index = ContractIndex(df, key="id")
+    rows, _ = index.keyset(ContractQuery.build(), cursor)
+    np.testing.assert_array_equal(df["id"].to_numpy()[rows], np.array(expected, dtype=keys.dtype))
+
+
+def test_keyset_cursor_on_dates():
+    df = pd.DataFrame({"id": pd.to_datetime(["2021-01-01", "2020-01-01", "2022-01-01"])})
+    index = ContractIndex(df, key="id")
+    assert index.keyset(ContractQuery.build(), "2020-06-01")[0].tolist() == [0, 2]
+    assert index.keyset(ContractQuery.build(), "1500-01-01")[0].tolist() == [1, 0, 2]
+    assert index.keyset(ContractQuery.build(), "2500-01-01")[0].tolist() == []
+    assert index.keyset(ContractQuery.build(), "2021-01-01T00:00:00Z")[0].tolist() == [2]
+
+
+@pytest.mark.parametrize("cursor", ["abc", "nan", "", "1.5.2"])
+def test_invalid_cursor_is_rejected(cursor):
+    index = ContractIndex(pd.DataFrame({"id": np.array([3, 1, 2], dtype=np.int8)}), key="id")
+    with pytest.raises(ValueError):
+        index.keyset(ContractQuery.build(), cursor)
@@ -0,0 +1,115 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.contract_query import ContractIndex, ContractQuery
+from test_contract_query import QUERIES, _mask
+
+
+def _pages(service, limit, after=None, **filters):
+    """Todas as páginas concatenadas, seguindo ``next_after``"""
+    keys = []
+    while True:
+        page = json.loads(service.rows_page(after=None if after is None else str(after), limit=limit, **filters))
+        keys += [row["id_contrato"] for row in page["data"]]
+        after = page["next_after"]
+        if after is None:
+            return keys, page["total"]
+
+
+@pytest.mark.parametrize("limit", [1, 97, 5000])
+@pytest.mark.parametrize("filters", ["sem_filtro", "status", "combinado", "vazio"])
+def test_keyset_pages_match_sorted_mask(contracts, filters, limit):
+    df = contracts.df
+    expected = np.sort(df.loc[_mask(df, **QUERIES[filters]), "id_contrato"].to_numpy())
+    if limit == 1 and len(expected) > 200:
+        expected = expected[:200]
+        # Páginas de uma linha: só o começo, a partir de cursores sucessivos
+        keys, after = [], None
+        for _ in range(200):
+            page = json.loads(contracts.rows_page(after=after, limit=1, **QUERIES[filters]))
+            keys += [row["id_contrato"] for row in page["data"]]
+            after = str(page["next_after"])
+        assert keys == expected.tolist()
+        return
+    keys, total = _pages(contracts, limit, **QUERIES[filters])
+    assert keys == expected.tolist()
+    assert total == len(expected)
+
+
+def test_cursor_across_upsert(contracts, raw_contracts, tmp_path):
+    filters = {"status": ["A"]}
+    first = json.loads(contracts.rows_page(limit=300, **filters))
+    cursor = first["next_after"]
+
+    # Delta: ativa contratos antes e depois do cursor e insere novos no fim
+    delta = raw_contracts.sample(500, random_state=1).copy()
+    delta["status"] = "A"
+    inserts = raw_contracts.head(50).copy()
+    inserts["id_contrato"] = (np.arange(len(inserts)) + len(raw_contracts) + 1).astype(str)
+    inserts["status"] = "A"
+    path = tmp_path / "delta.csv"
+    pd.concat([delta, inserts]).to_csv(path, index=False)
+    merged = contracts.upsert(str(path), "delta-cursor")
+
+    keys, total = _pages(merged, 250, after=cursor, **filters)
+    df = merged.df
+    mask = _mask(df, **filters)
+    assert total == mask.sum()
+    expected = np.sort(df.loc[mask & (df["id_contrato"] > cursor).to_numpy(), "id_contrato"].to_numpy())
+    assert keys == expected.tolist()
+    assert keys[-50:] == inserts["id_contrato"].astype(int).tolist()
+
+
+def test_duplicate_keys_use_row_position():
+    df = pd.DataFrame({
+        "id_contrato": [5, 3, 5, 1, 3, 2, 2, 9],
+        "status": pd.Categorical(["A", "E", "A", "A", "E", "A", "E", "A"]),
+        "modalidade": pd.Categorical(["x"] * 8),
+        "responsavel": pd.Categorical(list("abcabcab")),
+        "data_cadastro": pd.date_range("2020-01-01", periods=8, freq="MS"),
+        "data_encerramento": pd.NaT,
+    })
+    index = ContractIndex(df)
+    assert index.keys.name is None
+    query = ContractQuery.build(status=["A"])
+    expected = np.flatnonzero(_mask(df, status=["A"]))
+
+    rows, after = [], None
+    while True:
+        page, total = index.keyset(query, after, limit=2)
+        rows += page.tolist()
+        if len(page) < 2:
+            break
+        after = str(index.keys.value(page[-1]))
+    assert rows == expected.tolist()
+    assert total == len(expected)
+
+
+def test_cursor_outside_key_dtype(contracts):
+    df = contracts.df
+    assert df["id_contrato"].dtype == np.int16
+    ordered = np.sort(df["id_contrato"].to_numpy()).tolist()
+    # Antes, 40000 virava -25536 no int16 e a paginação recomeçava do início
+    page = json.loads(contracts.rows_page(after="40000", limit=10))
+    assert page["data"] == [] and page["next_after"] is None
+    keys, _ = _pages(contracts, 1000, after=-70000)
+    assert keys == ordered
+    keys, _ = _pages(contracts, 1000, after=ordered[99] + 0.5)
+    assert keys == ordered[100:]
+
+
+def test_invalid_cursor_is_bad_request(contracts_csv):
+    from fastapi.testclient import TestClient
+
+    from src.api.dependencies import get_registry
+    from src.main import app
+
+    info = get_registry().register_file(contracts_csv, None, "contratos.csv")
+    client = TestClient(app)
+    response = client.get("/api/contracts/rows", params={"after": "abc", "dataset_id": info.dataset_id})
+    assert response.status_code == 400
+    response = client.get("/api/contracts/rows", params={"after": "99999", "dataset_id": info.dataset_id})
+    assert response.status_code == 200 and response.json()["data"] == []
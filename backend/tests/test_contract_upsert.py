@@ -0,0 +1,111 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.contract_aggregates import ContractAggregates
+from src.services.contract_analysis import ContractAnalysisService
+from src.services.dataset_registry import DatasetRegistry
+from src.utils.columnar_cache import ColumnarCache
+
+
+def _delta(raw: pd.DataFrame, seed: int = 0) -> pd.DataFrame:
+    """Contratos alterados (status, responsável, prazo fora do int8) e contratos novos"""
+    rng = np.random.default_rng(seed)
+    updates = raw.sample(400, random_state=seed).copy()
+    updates["status"] = rng.choice(["A", "E", "C"], size=len(updates))
+    # Um responsável novo com contratos suficientes para entrar no top 10
+    updates["responsavel"] = np.where(rng.random(len(updates)) < 0.5, "Responsável Novo", updates["responsavel"])
+    updates["prazo"] = "100000"
+    updates["valor"] = (rng.random(len(updates)) * 1e6).round(2).astype(str)
+    inserts = raw.head(150).copy()
+    inserts["id_contrato"] = (np.arange(len(inserts)) + len(raw) + 1).astype(str)
+    inserts["responsavel"] = "Responsável Inserido"
+    inserts["data_cadastro"] = "15/01/2030"
+    return pd.concat([updates, inserts], ignore_index=True)
+
+
+def _merged_source(raw: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """Resultado esperado do upsert, montado com pandas a partir dos arquivos brutos"""
+    merged = raw.set_index("id_contrato")
+    changes = delta.set_index("id_contrato")
+    existing = changes.index.isin(merged.index)
+    merged.loc[changes.index[existing]] = changes[existing]
+    return pd.concat([merged, changes[~existing]]).reset_index()
+
+
+@pytest.fixture(scope="module")
+def upserted(contracts, raw_contracts, tmp_path_factory):
+    delta = _delta(raw_contracts)
+    folder = tmp_path_factory.mktemp("upsert")
+    delta_path = folder / "delta.csv"
+    delta.to_csv(delta_path, index=False)
+    expected_path = folder / "esperado.csv"
+    _merged_source(raw_contracts, delta).to_csv(expected_path, index=False)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        merged = contracts.upsert(str(delta_path), "delta")
+    recomputed = ContractAnalysisService()
+    recomputed.load_data(str(expected_path))
+    return merged, recomputed
+
+
+def test_upsert_counts(upserted):
+    merged, _ = upserted
+    assert merged.last_upsert == {"updated": 400, "inserted": 150}
+
+
+def test_incremental_aggregates_match_recompute(upserted):
+    merged, recomputed = upserted
+    assert merged.aggregates.sections() == ContractAggregates.from_frame(merged.df).sections()
+    for name in ("status", "modalidade", "temporal", "responsavel"):
+        assert merged.snapshot.section(name) == recomputed.snapshot.section(name), name
+    assert merged.snapshot.version == recomputed.snapshot.version
+
+
+def test_top_responsaveis_after_upsert(upserted):
+    merged, recomputed = upserted
+    top = merged.snapshot.section("responsavel")["data"]
+    assert len(top) == 10
+    assert {"Responsável Novo", "Responsável Inserido"} <= {row["name"] for row in top}
+    expected = recomputed.df["responsavel"].astype(str).value_counts()
+    expected = sorted(expected.items(), key=lambda item: (-item[1], item[0]))[:10]
+    assert [(row["name"], row["value"]) for row in top] == expected
+
+
+def test_upsert_upcasts_downcast_columns(contracts, upserted):
+    merged, recomputed = upserted
+    assert contracts.df["prazo"].dtype == np.int8
+    assert merged.df["prazo"].max() == 100000
+    key = "id_contrato"
+    left = merged.df.sort_values(key).reset_index(drop=True)
+    right = recomputed.df.sort_values(key).reset_index(drop=True)
+    for col in ("id_contrato", "prazo", "valor"):
+        np.testing.assert_array_equal(left[col].to_numpy(np.float64), right[col].to_numpy(np.float64))
+    for col in ("status", "modalidade", "responsavel"):
+        assert left[col].astype(str).tolist() == right[col].astype(str).tolist()
+    for col in ("data_cadastro", "data_encerramento"):
+        assert left[col].equals(right[col])
+
+
+def test_upsert_chain_keeps_only_base_and_latest(contracts_csv, raw_contracts, tmp_path):
+    registry = DatasetRegistry()
+    base = registry.register_file(contracts_csv, None, "contratos.csv")
+    versions = []
+    for seed in range(3):
+        delta_path = tmp_path / f"delta{seed}.csv"
+        _delta(raw_contracts, seed).to_csv(delta_path, index=False)
+        versions.append(registry.upsert_file(None, str(delta_path), f"cadeia{seed}"))
+
+    cache = ColumnarCache(namespace="contracts")
+    latest = versions[-1]
+    assert latest.base_id == base.dataset_id
+    assert cache.contains(base.dataset_id) and cache.contains(latest.dataset_id)
+    for info in versions[:-1]:
+        assert not cache.contains(info.dataset_id)
+    listed = {item["dataset_id"] for item in registry.list_datasets()}
+    assert listed == {base.dataset_id, latest.dataset_id}
+    with registry.acquire() as entry:
+        assert entry.dataset_id == latest.dataset_id
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.correlation import cluster_order, correlation_matrix
+
+
+@pytest.fixture(scope="module")
+def frame():
+    rng = np.random.default_rng(7)
+    n = 20_000
+    base = rng.normal(size=n)
+    df = pd.DataFrame({
+        "base": base,
+        # Deslocamentos grandes: float32 antes da padronização perdia toda a variação
+        "offset": base + rng.normal(scale=0.1, size=n) + 1e8,
+        "epoch": 1.7e9 + 86400 * (base + rng.normal(scale=0.1, size=n)),
+        "negative": -2 * base + rng.normal(size=n),
+        "constant": np.full(n, 3.0),
+        "sparse": base + rng.normal(scale=0.5, size=n),
+        "independent": rng.normal(size=n),
+        "integer": rng.integers(0, 10, size=n),
+    })
+    # Coluna com 90% de faltantes e outra com faltantes em blocos inteiros
+    df.loc[rng.random(n) < 0.9, "sparse"] = np.nan
+    df.loc[5_000:12_000, "negative"] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("chunk_rows", [1_000, 4_096, 65_536])
+def test_matches_pandas_corr(frame, chunk_rows):
+    expected = frame.corr().to_numpy()
+    result = correlation_matrix(frame, frame.columns, chunk_rows=chunk_rows)
+    np.testing.assert_array_equal(np.isnan(result), np.isnan(expected))
+    np.testing.assert_allclose(result, expected, atol=1e-4, equal_nan=True)
+
+
+def test_offset_columns_keep_correlation(frame):
+    result = correlation_matrix(frame, ["base", "offset", "epoch"])
+    assert result[0, 1] > 0.99
+    assert result[0, 2] > 0.99
+
+
+def test_constant_and_empty_columns_are_nan():
+    df = pd.DataFrame({"a": [1.0, 2.0, 3.0, 4.0], "constant": 5.0, "empty": np.nan})
+    result = correlation_matrix(df, df.columns)
+    assert result[0, 0] == 1.0
+    assert np.isnan(result[1]).all() and np.isnan(result[:, 2]).all()
+
+
+def test_cluster_order_is_permutation(frame):
+    matrix = frame.corr().to_numpy()
+    order = cluster_order(matrix)
+    assert sorted(order) == list(range(len(matrix)))
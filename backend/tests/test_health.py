@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import dependencies
+from src.main import app
+
+
+@pytest.fixture
+def warmup(monkeypatch):
+    state = dependencies.WarmupState()
+    monkeypatch.setattr("src.main.warmup", state)
+    return state
+
+
+def test_not_ready_while_loading(warmup):
+    warmup.status = "running"
+    response = TestClient(app).get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
+
+
+def test_failed_warmup_does_not_block_readiness(warmup, monkeypatch, tmp_path):
+    corrupt = tmp_path / "Contratos.xlsx"
+    corrupt.write_bytes(b"not a workbook")
+    monkeypatch.setattr(dependencies, "warmup", warmup)
+    asyncio.run(dependencies.warm_up(str(corrupt)))
+    assert warmup.status == "failed"
+
+    response = TestClient(app).get("/health/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "degraded"
+    assert body["warmup"]["error"]
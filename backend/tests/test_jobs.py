@@ -0,0 +1,139 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from src.services import jobs
+from src.services.jobs import JobQueue, register_handler, report_progress
+
+
+async def _echo(payload: dict) -> dict:
+    report_progress({"step": "half"})
+    return {"echo": payload["value"]}
+
+
+register_handler("test_echo", _echo)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+
+def test_claims_jobs_submitted_by_another_process(db_path):
+    async def scenario():
+        worker = JobQueue(db_path, workers=1, poll_interval=0.05)
+        other = JobQueue(db_path, workers=1)  # outro processo: só envia, sem workers
+        worker.start()
+        try:
+            await asyncio.sleep(0.1)
+            job = await other.submit("test_echo", {"value": 7})
+            return await worker.wait_finished(job["job_id"], 5)
+        finally:
+            await worker.stop()
+            await other.stop()
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "done"
+    assert job["result"] == {"echo": 7}
+    assert job["progress"] == {"step": "half"}
+
+
+def test_worker_survives_locked_database(db_path, monkeypatch):
+    monkeypatch.setattr(jobs, "CLAIM_RETRY_DELAY", 0.01)
+
+    async def scenario():
+        queue = JobQueue(db_path, workers=1, poll_interval=0.05)
+        claim = queue._claim
+        failures = []
+
+        def flaky_claim():
+            if len(failures) < 3:
+                failures.append(1)
+                raise sqlite3.OperationalError("database is locked")
+            return claim()
+
+        monkeypatch.setattr(queue, "_claim", flaky_claim)
+        queue.start()
+        try:
+            job = await queue.submit("test_echo", {"value": "ok"})
+            return await queue.wait_finished(job["job_id"], 5), len(failures)
+        finally:
+            await queue.stop()
+
+    job, failures = asyncio.run(scenario())
+    assert failures == 3
+    assert job["status"] == "done"
+
+
+def test_latest_payload_by_dedup_key(db_path):
+    async def scenario():
+        queue = JobQueue(db_path)
+        try:
+            assert await queue.latest_payload("analyze:x") is None
+            await queue.submit("test_echo", {"value": 1}, "analyze:x")
+            assert await queue.latest_payload("analyze:x") == {"value": 1}
+        finally:
+            await queue.stop()
+
+    asyncio.run(scenario())
+
+
+async def _slow(payload: dict) -> dict:
+    await asyncio.sleep(payload["seconds"])
+    return {"slept": payload["seconds"]}
+
+
+register_handler("test_slow", _slow)
+
+
+def test_running_job_of_live_worker_is_not_requeued(db_path):
+    """Um worker que (re)inicia não rouba o job que outro ainda executa"""
+    async def scenario():
+        busy = JobQueue(db_path, workers=1, poll_interval=0.05, lease=0.3)
+        busy.start()
+        try:
+            job = await busy.submit("test_slow", {"seconds": 1.0})
+            await busy.wait(job["job_id"], 1)
+            restarted = JobQueue(db_path, workers=1, poll_interval=0.05, lease=0.3)
+            restarted.start()
+            try:
+                # Várias reservas vencem durante o job: a renovação as mantém
+                done = await busy.wait_finished(job["job_id"], 5)
+                return done, restarted.owner
+            finally:
+                await restarted.stop()
+        finally:
+            await busy.stop()
+
+    job, restarted_owner = asyncio.run(scenario())
+    assert job["status"] == "done"
+    with sqlite3.connect(db_path) as db:
+        owner = db.execute("SELECT owner FROM jobs WHERE job_id = ?", (job["job_id"],)).fetchone()[0]
+    assert owner != restarted_owner
+
+
+def test_job_of_stopped_worker_is_requeued(db_path):
+    async def scenario():
+        crashed = JobQueue(db_path, workers=1, poll_interval=0.05, lease=0.2)
+        crashed.start()
+        job = await crashed.submit("test_slow", {"seconds": 30})
+        await crashed.wait(job["job_id"], 1)
+        # Queda do processo: os workers e a renovação param sem concluir o job
+        await crashed.stop()
+
+        survivor = JobQueue(db_path, workers=1, poll_interval=0.05, lease=0.2)
+        survivor.start()
+        try:
+            running = await survivor.get(job["job_id"])
+            assert running["status"] == "running"
+            with sqlite3.connect(db_path) as db:
+                db.execute("UPDATE jobs SET payload = ? WHERE job_id = ?", ('{"seconds": 0}', job["job_id"]))
+            return await survivor.wait_finished(job["job_id"], 5), survivor.owner
+        finally:
+            await survivor.stop()
+
+    job, owner = asyncio.run(scenario())
+    assert job["status"] == "done" and job["result"] == {"slept": 0}
+    with sqlite3.connect(db_path) as db:
+        assert db.execute("SELECT owner FROM jobs WHERE job_id = ?", (job["job_id"],)).fetchone()[0] == owner
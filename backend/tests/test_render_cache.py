@@ -0,0 +1,34 @@
+import os
+
+from src.services.rendering import MEDIA_TYPES, RenderCache
+
+
+def test_shared_between_instances(tmp_path):
+    # Duas instâncias no mesmo diretório fazem o papel de dois workers
+    first = RenderCache(str(tmp_path), max_bytes=1024)
+    second = RenderCache(str(tmp_path), max_bytes=1024)
+    first.put("abc", b"<svg/>", MEDIA_TYPES["svg"])
+    assert "abc" in second
+    assert second.get("abc") == (b"<svg/>", MEDIA_TYPES["svg"])
+    assert second.get("missing") is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = RenderCache(str(tmp_path), max_bytes=250)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, bytes(100), MEDIA_TYPES["png"])
+        os.utime(tmp_path / f"{key}.png", (i, i))
+    assert "a" not in cache
+    # A leitura renova o acesso: "b" fica e "c" sai na próxima gravação
+    os.utime(tmp_path / "c.png", (10, 10))
+    cache.get("b")
+    cache.put("d", bytes(100), MEDIA_TYPES["png"])
+    assert "b" in cache and "d" in cache and "c" not in cache
+    assert cache.size == 200
+
+
+def test_oversized_image_is_not_stored(tmp_path):
+    cache = RenderCache(str(tmp_path), max_bytes=10)
+    cache.put("big", bytes(11), MEDIA_TYPES["png"])
+    assert "big" not in cache
+    assert not os.listdir(tmp_path)
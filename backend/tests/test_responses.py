@@ -0,0 +1,98 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+
+from src.core.compression import CompressionMiddleware
+from src.core.responses import ARROW_MEDIA_TYPE, arrow_body
+from src.schemas.data import AnalysisType
+from src.services.analysis import DataAnalysisService
+
+
+@pytest.fixture(scope="module")
+def service():
+    rng = np.random.default_rng(3)
+    return DataAnalysisService(pd.DataFrame(rng.normal(size=(200, 4)), columns=["a", "b", "c", "d"]))
+
+
+def _read(body):
+    table = pa.ipc.open_stream(body).read_all()
+    meta = json.loads(table.schema.metadata[b"meta"])
+    return table, table.schema.metadata[b"table"].decode(), meta
+
+
+def test_correlation_matrix_as_rows(service):
+    results = service.analyze(AnalysisType.CORRELATION, render=False, parameters={"layout": "dict"})
+    results.pop("timings")
+    table, path, meta = _read(arrow_body({"analysis_type": "correlation", "results": results}))
+    assert path == "results.correlation_matrix"
+    assert table.column("column").to_pylist() == ["a", "b", "c", "d"]
+    for row in table.to_pylist():
+        assert row == {"column": row["column"], **results["correlation_matrix"][row["column"]]}
+    assert meta["results"]["columns"] == ["a", "b", "c", "d"]
+
+
+def test_descriptive_stats_as_rows(service):
+    results = service.analyze(AnalysisType.DESCRIPTIVE, render=False)
+    results.pop("timings")
+    table, path, _ = _read(arrow_body({"results": results}))
+    assert path == "results.stats"
+    rows = {row.pop("column"): row for row in table.to_pylist()}
+    assert rows == {name: stats.model_dump() for name, stats in results["stats"].items()}
+
+
+def test_records_win_over_smaller_keyed_table():
+    content = {"summary": {"a": {"n": 1}}, "items": [{"x": 1}, {"x": 2}]}
+    table, path, meta = _read(arrow_body(content))
+    assert path == "items" and table.num_rows == 2
+    assert meta == {"summary": {"a": {"n": 1}}}
+
+
+def test_scalars_only_is_not_acceptable():
+    from fastapi import HTTPException
+
+    with pytest.raises(HTTPException) as error:
+        arrow_body({"count": 3, "values": [1, 2], "nested": {"a": 1}})
+    assert error.value.status_code == 406
+
+
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+    body = b'{"values": [' + b",".join(b"1" for _ in range(5000)) + b"]}"
+
+    @app.get("/data")
+    def data(request: Request):
+        if request.headers.get("if-none-match", "").removeprefix("W/") == '"v1"':
+            return Response(status_code=304, headers={"ETag": '"v1"'})
+        return Response(content=body, media_type="application/json", headers={"ETag": '"v1"'})
+
+    @app.get("/arrow")
+    def arrow():
+        return Response(content=b"x" * 5000, media_type=ARROW_MEDIA_TYPE, headers={"ETag": '"v2"'})
+
+    return TestClient(CompressionMiddleware(app, minimum_size=100))
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_compressed_responses_get_weak_etag(client, encoding):
+    if encoding == "br":
+        pytest.importorskip("brotli")
+    response = client.get("/data", headers={"Accept-Encoding": encoding})
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["etag"] == 'W/"v1"'
+    cached = client.get("/data", headers={"Accept-Encoding": encoding, "If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == 'W/"v1"'
+
+
+def test_identity_keeps_strong_etag(client):
+    response = client.get("/data", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"v1"'
+    assert client.get("/arrow", headers={"Accept-Encoding": "gzip"}).headers["etag"] == 'W/"v2"'
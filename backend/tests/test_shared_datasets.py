@@ -0,0 +1,59 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src.services.dataset_registry import DatasetNotFoundError, DatasetRegistry
+from src.services.shared_datasets import SharedDatasetStore
+
+
+def _worker(cache_dir):
+    registry = DatasetRegistry()
+    store = SharedDatasetStore(registry, cache_dir=str(cache_dir))
+    registry.publisher = store.publish
+    registry.remover = store.remove
+    return registry, store
+
+
+def _delta(raw: pd.DataFrame, seed: int) -> pd.DataFrame:
+    delta = raw.sample(50, random_state=seed).copy()
+    delta["status"] = "E"
+    return delta
+
+
+def test_superseded_versions_leave_the_manifest(contracts_csv, raw_contracts, tmp_path):
+    first, first_store = _worker(tmp_path)
+    second, second_store = _worker(tmp_path)
+    base = first.register_file(contracts_csv, None, "contratos.csv")
+    delta_path = tmp_path / "delta0.csv"
+    _delta(raw_contracts, 0).to_csv(delta_path, index=False)
+    middle = first.upsert_file(None, str(delta_path), "manifesto0")
+
+    assert second_store.sync() == middle.dataset_id
+    assert {item["dataset_id"] for item in second.list_datasets()} == {base.dataset_id, middle.dataset_id}
+
+    delta_path = tmp_path / "delta1.csv"
+    _delta(raw_contracts, 1).to_csv(delta_path, index=False)
+    latest = first.upsert_file(None, str(delta_path), "manifesto1")
+
+    manifest = first_store.read()
+    assert [item["dataset_id"] for item in manifest["datasets"]] == [base.dataset_id, latest.dataset_id]
+    assert manifest["default_id"] == latest.dataset_id
+    assert second_store.sync() == latest.dataset_id
+    assert {item["dataset_id"] for item in second.list_datasets()} == {base.dataset_id, latest.dataset_id}
+
+
+def test_unreloadable_dataset_leaves_the_manifest(raw_contracts, tmp_path):
+    registry, store = _worker(tmp_path)
+    source = tmp_path / "contratos.csv"
+    raw_contracts.head(20).to_csv(source, index=False)
+    info = registry.register_file(str(source), None, "contratos.csv")
+    # Simula a saída da memória seguida da remoção da origem
+    registry._entries.clear()
+    os.remove(info.source_path)
+
+    with pytest.raises(DatasetNotFoundError):
+        with registry.acquire(info.dataset_id):
+            pass
+    assert store.read()["datasets"] == []
+    assert registry.registered_count == 0
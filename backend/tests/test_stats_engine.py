@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.stats_engine import summarize
+
+
+def _frame(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "normal": rng.normal(size=n),
+        "faltantes": rng.lognormal(size=n),
+        "constante": np.full(n, 0.1),
+        "constante_nan": np.full(n, 7.0),
+        "inteiro": rng.integers(-50, 50, size=n),
+        "vazia": np.full(n, np.nan),
+    })
+    df.loc[rng.random(n) < 0.3, "faltantes"] = np.nan
+    df.loc[::2, "constante_nan"] = np.nan
+    return df
+
+
+def _assert_matches(actual: np.ndarray, expected: pd.Series) -> None:
+    np.testing.assert_allclose(actual, expected.to_numpy(np.float64), rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 4, 5, 8, 500])
+def test_summary_matches_pandas(n):
+    df = _frame(n, seed=n)
+    summary = summarize(df, df.columns)
+    described = df.describe().T
+
+    _assert_matches(summary.count, described["count"])
+    _assert_matches(summary.mean, described["mean"])
+    _assert_matches(summary.std, described["std"])
+    _assert_matches(summary.min, described["min"])
+    _assert_matches(summary.q1, described["25%"])
+    _assert_matches(summary.median, described["50%"])
+    _assert_matches(summary.q3, described["75%"])
+    _assert_matches(summary.max, described["max"])
+    _assert_matches(summary.skewness, df.skew())
+    _assert_matches(summary.kurtosis, df.kurt())
+
+
+def test_select_keeps_requested_order():
+    df = _frame(50)
+    summary = summarize(df, df.columns).select(["inteiro", "normal"])
+    assert summary.columns == ["inteiro", "normal"]
+    _assert_matches(summary.mean, df[["inteiro", "normal"]].mean())
@@ -0,0 +1,157 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from src.schemas.data import DataAnalysisRequest
+from src.services.streaming_stats import (
+    KLL_RANK_ERROR, KLLSketch, accumulate_part, combine_parts, plan_stream,
+)
+
+QS = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+
+@pytest.fixture(scope="module")
+def frame():
+    rng = np.random.default_rng(42)
+    n = 60_000
+    base = rng.normal(size=n)
+    df = pd.DataFrame({
+        "normal": base,
+        "offset": rng.normal(size=n) + 1e8,
+        "skewed": rng.lognormal(sigma=1.5, size=n),
+        "related": 3 * base + rng.normal(scale=0.5, size=n),
+        "inteiro": rng.integers(0, 1000, size=n),
+        "texto": rng.choice(["a", "b", "c"], size=n),
+    })
+    df.loc[rng.random(n) < 0.2, "related"] = np.nan
+    df.loc[rng.random(n) < 0.05, "skewed"] = np.nan
+    return df
+
+
+@pytest.fixture(scope="module")
+def csv_path(frame, tmp_path_factory):
+    path = tmp_path_factory.mktemp("streaming") / "dados.csv"
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def jsonl_path(frame, tmp_path_factory):
+    path = tmp_path_factory.mktemp("streaming") / "dados.jsonl"
+    frame.to_json(path, orient="records", lines=True)
+    return str(path)
+
+
+def _true_rank(sorted_values, value):
+    return np.searchsorted(sorted_values, value, side="right") / len(sorted_values)
+
+
+def test_kll_rank_error_within_bound():
+    rng = np.random.default_rng(1)
+    values = rng.lognormal(size=200_000)
+    sketch = KLLSketch(seed=3)
+    for block in np.array_split(values, 37):
+        sketch.update(block)
+
+    ordered = np.sort(values)
+    for q, estimate in zip(QS, sketch.quantiles(QS)):
+        assert abs(_true_rank(ordered, estimate) - q) <= KLL_RANK_ERROR
+    exact = np.quantile(values, QS)
+    assert np.all(np.diff(sketch.quantiles(QS)) >= 0)
+    assert sketch.quantiles([0.5])[0] == pytest.approx(exact[3], rel=0.1)
+
+
+def test_kll_merge_keeps_rank_error():
+    rng = np.random.default_rng(2)
+    parts = [rng.normal(loc=i, size=40_000) for i in range(5)]
+    merged = KLLSketch(seed=0)
+    for i, part in enumerate(parts):
+        sketch = KLLSketch(seed=i + 1)
+        sketch.update(part)
+        merged.merge(sketch)
+
+    ordered = np.sort(np.concatenate(parts))
+    assert merged.n == len(ordered)
+    for q, estimate in zip(QS, merged.quantiles(QS)):
+        assert abs(_true_rank(ordered, estimate) - q) <= KLL_RANK_ERROR
+
+
+@pytest.mark.parametrize("parts", [1, 3, 8])
+def test_parts_match_pandas(csv_path, parts):
+    plan = plan_stream(csv_path, chunk_rows=5_000, parts=parts)
+    assert plan.columns == ["normal", "offset", "skewed", "related", "inteiro"]
+    assert len(plan.ranges) == parts
+    state = combine_parts(plan, [accumulate_part(plan, i) for i in range(len(plan.ranges))])
+
+    numeric = pd.read_csv(csv_path)[plan.columns].astype(float)
+    summary = state.summary()
+    np.testing.assert_array_equal(summary.count, numeric.count().to_numpy())
+    np.testing.assert_allclose(summary.mean, numeric.mean().to_numpy(), rtol=1e-12)
+    np.testing.assert_allclose(summary.std, numeric.std().to_numpy(), rtol=1e-9)
+    np.testing.assert_allclose(summary.skewness, numeric.skew().to_numpy(), rtol=1e-6, atol=1e-9)
+    np.testing.assert_allclose(summary.kurtosis, numeric.kurt().to_numpy(), rtol=1e-6, atol=1e-9)
+    np.testing.assert_array_equal(summary.min, numeric.min().to_numpy())
+    np.testing.assert_array_equal(summary.max, numeric.max().to_numpy())
+
+    expected = numeric.corr()
+    np.testing.assert_allclose(state.correlation().to_numpy(), expected.to_numpy(), atol=1e-7)
+
+    for i, col in enumerate(plan.columns):
+        ordered = np.sort(numeric[col].dropna().to_numpy())
+        for q, estimate in zip((0.25, 0.5, 0.75), (summary.q1[i], summary.median[i], summary.q3[i])):
+            # Valores repetidos (coluna inteira) ocupam um intervalo de ranks
+            low = np.searchsorted(ordered, estimate, side="left") / len(ordered)
+            high = _true_rank(ordered, estimate)
+            assert low - KLL_RANK_ERROR <= q <= high + KLL_RANK_ERROR
+
+
+def _parallel(path, pool, parts):
+    """Partes processadas em paralelo e combinadas na ordem do arquivo, como na rota"""
+    plan = plan_stream(path, chunk_rows=7_000, parts=parts)
+    futures = [pool.submit(accumulate_part, plan, i) for i in range(len(plan.ranges))]
+    return combine_parts(plan, (future.result() for future in futures))
+
+
+def test_pool_and_jsonl_match_sequential(csv_path, jsonl_path):
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        sequential = _parallel(csv_path, pool, parts=1)
+        parallel = _parallel(csv_path, pool, parts=4)
+        lines = _parallel(jsonl_path, pool, parts=4)
+
+    for state in (parallel, lines):
+        assert state.columns == sequential.columns
+        np.testing.assert_array_equal(state.count, sequential.count)
+        np.testing.assert_allclose(state.mean, sequential.mean, rtol=1e-9)
+        np.testing.assert_allclose(state.m2, sequential.m2, rtol=1e-9)
+        np.testing.assert_allclose(state.correlation(), sequential.correlation(), atol=1e-7)
+
+
+def test_plan_selects_requested_numeric_columns(csv_path):
+    plan = plan_stream(csv_path, columns=["related", "texto", "normal"], parts=2)
+    assert plan.columns == ["related", "normal"]
+    state = combine_parts(plan, [accumulate_part(plan, i) for i in range(len(plan.ranges))])
+    assert state.correlation().loc["related", "normal"] > 0.9
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "vazio.csv"
+    path.write_text("")
+    plan = plan_stream(str(path), parts=4)
+    assert plan.ranges == []
+    assert combine_parts(plan, []).columns == []
+
+
+@pytest.mark.parametrize("parts", [0, -1, 10_000, "4", 2.5, True])
+def test_request_rejects_invalid_parts(parts):
+    with pytest.raises(ValidationError):
+        DataAnalysisRequest(file_name="dados.csv", analysis_type="descriptive", parameters={"streaming": True, "parts": parts})
+
+
+def test_request_accepts_parts():
+    request = DataAnalysisRequest(
+        file_name="dados.csv", file_id="abc_dados.csv", analysis_type="correlation", parameters={"parts": 4}
+    )
+    assert request.parameters["parts"] == 4
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.timeseries import FREQUENCIES, TimeSeriesEngine
+
+
+@pytest.fixture(scope="module")
+def frame():
+    rng = np.random.default_rng(11)
+    n = 5000
+    starts = pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 3 * 365 * 24, n), unit="h")
+    ends = starts + pd.to_timedelta(rng.integers(1, 400, n), unit="D")
+    df = pd.DataFrame({"inicio": starts, "fim": ends, "valor": rng.gamma(2.0, 1000.0, n)})
+    df.loc[rng.random(n) < 0.05, "inicio"] = pd.NaT
+    df.loc[rng.random(n) < 0.3, "fim"] = pd.NaT
+    df.loc[rng.random(n) < 0.1, "valor"] = np.nan
+    return df
+
+
+def _expected(df, freq, start=None, end=None):
+    """Mesma série calculada com máscara booleana e resample do pandas"""
+    mask = df["inicio"].notna()
+    if start is not None:
+        mask &= df["inicio"] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df["inicio"] <= pd.Timestamp(end)
+    rows = df[mask].set_index("inicio")["valor"]
+    freq_code = FREQUENCIES[freq][0]
+    periods = pd.period_range(
+        start=pd.Timestamp(start) if start is not None else df["inicio"].min(),
+        end=pd.Timestamp(end) if end is not None else df["inicio"].max(),
+        freq=freq_code,
+    )
+    resampled = rows.resample(freq_code)
+    counts, sums = resampled.size(), resampled.sum()
+    counts.index = counts.index.to_period(freq_code)
+    sums.index = sums.index.to_period(freq_code)
+    return counts.reindex(periods, fill_value=0), sums.reindex(periods, fill_value=0.0)
+
+
+@pytest.mark.parametrize("freq", list(FREQUENCIES))
+@pytest.mark.parametrize("bounds", [(None, None), ("2022-03-15 12:00", "2023-07-09"), ("2023-02-03", "2023-02-27")])
+def test_counts_and_sums_match_resample(frame, freq, bounds):
+    start, end = bounds
+    engine = TimeSeriesEngine(frame["inicio"], frame["fim"])
+    series = engine.series(freq, start, end, values={"valor": frame["valor"]})
+    counts, sums = _expected(frame, freq, start, end)
+    assert [row["quantidade"] for row in series] == counts.tolist()
+    np.testing.assert_allclose([row["soma_valor"] for row in series], sums.to_numpy(), rtol=1e-9, atol=1e-6)
+
+
+def test_range_inside_one_period():
+    dates = pd.Series(pd.to_datetime(["2024-01-02", "2024-01-20", "2024-01-30", "2024-02-10"]))
+    series = TimeSeriesEngine(dates).series("month", start="2024-01-15", end="2024-01-25")
+    assert series == [{"date": "2024-01", "quantidade": 1}]
+    # O fim é inclusivo
+    series = TimeSeriesEngine(dates).series("month", start="2024-01-02", end="2024-02-10")
+    assert [row["quantidade"] for row in series] == [3, 1]
+
+
+@pytest.mark.parametrize("end", [None, "2023-05-17"])
+def test_active_matches_mask(frame, end):
+    engine = TimeSeriesEngine(frame["inicio"], frame["fim"])
+    series = engine.series("month", end=end, cumulative=True)
+    valid = frame[frame["inicio"].notna()]
+    periods = engine.periods("month", end=end)
+    for row, period in zip(series, periods):
+        edge = (period + 1).start_time
+        if end is not None:
+            edge = min(edge, pd.Timestamp(end) + pd.Timedelta(1, "ns"))
+        expected = ((valid["inicio"] < edge) & ~(valid["fim"] < edge)).sum()
+        assert row["ativos"] == expected
+
+
+def test_window_and_empty_periods():
+    dates = pd.Series(pd.to_datetime(["2024-01-05", "2024-01-06", "2024-03-01"]))
+    engine = TimeSeriesEngine(dates)
+    series = engine.series("month", window=2)
+    assert [row["quantidade"] for row in series] == [2, 0, 1]
+    assert [row["media_movel"] for row in series] == [2.0, 1.0, 0.5]
+    assert [row["date"] for row in engine.series("month", include_empty=False)] == ["2024-01", "2024-03"]
+
+
+def test_invalid_arguments():
+    engine = TimeSeriesEngine(pd.Series(pd.to_datetime(["2024-01-05"])))
+    with pytest.raises(ValueError):
+        engine.series("hour")
+    with pytest.raises(ValueError):
+        engine.series("day", start="2024-02-01", end="2024-01-01")